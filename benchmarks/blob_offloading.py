@@ -0,0 +1,100 @@
+"""
+Checkpoint size and serialization time with large tool results, inline vs offloaded.
+
+Each turn of the financial_advisor graph calls fetch_stock_data_raw, which
+here returns a payload of the given size, then answers. With blob_threshold=0
+every checkpoint of the thread serializes all tool results seen so far; with
+the default threshold they go to the blob store and the messages keep a
+reference, resolved when the assistant builds its prompt.
+
+    python benchmarks/blob_offloading.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "studio"))
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+os.environ.setdefault("BLOB_STORE", os.path.join(tempfile.mkdtemp(), "blobs"))
+
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.tools import StructuredTool
+from langgraph.checkpoint.memory import MemorySaver
+
+import blob_store
+import financial_advisor
+from fake_llm import ScriptedChatModel
+
+
+class TimedSaver(MemorySaver):
+    """MemorySaver that times serialization (put, put_writes) and counts the bytes stored."""
+
+    def __init__(self):
+        super().__init__()
+        self.seconds = 0.0
+
+    def put(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().put(*args, **kwargs)
+        finally:
+            self.seconds += time.perf_counter() - started
+
+    def put_writes(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().put_writes(*args, **kwargs)
+        finally:
+            self.seconds += time.perf_counter() - started
+
+    def stored_bytes(self) -> int:
+        checkpoints = sum(len(c[1]) + len(m[1]) for ns in self.storage.values() for s in ns.values() for c, m, _ in s.values())
+        writes = sum(len(w[2][1]) for ws in self.writes.values() for w in ws.values())
+        return checkpoints + writes + sum(len(b[1]) for b in self.blobs.values())
+
+
+def respond(messages) -> AIMessage:
+    # a tool call for every new question, an answer once the result is in
+    if isinstance(messages[-1], ToolMessage):
+        return AIMessage(content=f"Hold. The data has {len(messages[-1].content)} characters.")
+    return AIMessage(content="", tool_calls=[{"name": "fetch_stock_data_raw", "args": {"stock_symbol": "ACME"}, "id": f"call-{len(messages)}"}])
+
+
+def run(payload_size: int, threshold: int, turns: int) -> dict:
+    payload = iter(f"{i:08d}" + "x" * (payload_size - 8) for i in range(turns))
+    financial_advisor.tools_by_name["fetch_stock_data_raw"] = StructuredTool.from_function(
+        func=lambda stock_symbol: next(payload), name="fetch_stock_data_raw", description="Fake market data"
+    )
+    financial_advisor.llm_with_tools = ScriptedChatModel(respond=respond)
+
+    saver = TimedSaver()
+    graph = financial_advisor.builder.compile(checkpointer=saver)
+    config = {"configurable": {"thread_id": "blobs", "blob_threshold": threshold}}
+
+    started = time.perf_counter()
+    for turn in range(turns):
+        asyncio.run(graph.ainvoke({"messages": [("user", f"Should I buy ACME? ({turn})")]}, config))
+    elapsed = time.perf_counter() - started
+
+    answer = graph.get_state(config).values["messages"][-1].content
+    assert answer.endswith(f"{payload_size} characters."), answer
+    return {"bytes_per_turn": saver.stored_bytes() / turns, "serialize_ms": saver.seconds / turns * 1e3,
+            "turn_ms": elapsed / turns * 1e3}
+
+
+def main():
+    turns = 10
+    print(f"{turns} turns, one tool call each; per turn averages")
+    print(f"{'payload':>9} {'mode':>9} {'stored_KB':>10} {'serialize_ms':>13} {'turn_ms':>8}")
+    for payload_size in (10_000, 100_000, 1_000_000):
+        for mode, threshold in (("inline", 0), ("offload", 4096)):
+            r = run(payload_size, threshold, turns)
+            print(f"{payload_size:>9,} {mode:>9} {r['bytes_per_turn'] / 1e3:>10,.1f} {r['serialize_ms']:>13.2f} {r['turn_ms']:>8.1f}")
+    print(f"\nblob store: {blob_store.default_store.stats()}")
+
+
+if __name__ == "__main__":
+    main()
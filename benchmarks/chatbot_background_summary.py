@@ -0,0 +1,60 @@
+"""
+Per-turn latency of the chatbot graph with inline and background summarization.
+
+Every LLM call takes a fixed latency. Inline, a turn that summarizes waits for two
+calls; in background mode the run ends after the answer and the summary is
+applied at the start of a later turn.
+
+    python benchmarks/chatbot_background_summary.py
+"""
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "studio"))
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+from langgraph.checkpoint.memory import MemorySaver
+
+import chatbot
+from fake_llm import ScriptedChatModel, scripted_questions
+
+
+def run(mode: str, turns: int, latency: float, think_time: float) -> dict:
+    chatbot.llm = ScriptedChatModel(response_words=120, latency=latency)
+    graph = chatbot.compile_graph(MemorySaver())
+    config = {"configurable": {"thread_id": mode, "summarize_mode": mode}}
+
+    latencies = []
+    for question in scripted_questions(turns):
+        started = time.perf_counter()
+        graph.invoke({"question": question}, config)
+        latencies.append(time.perf_counter() - started)
+        # the user reading the answer before asking again
+        time.sleep(think_time)
+
+    state = graph.get_state(config).values
+    return {
+        "mean": statistics.mean(latencies),
+        "p95": sorted(latencies)[int(0.95 * (len(latencies) - 1))],
+        "max": max(latencies),
+        "calls": chatbot.llm.calls,
+        "history_messages": len(state["messages"]),
+        "summarized": bool(state.get("summary")),
+    }
+
+
+def main():
+    turns, latency = 30, 0.2
+    print(f"{turns} turns, {latency:.1f}s per LLM call")
+    print(f"{'mode':>11} {'think_s':>8} {'mean_s':>7} {'p95_s':>6} {'max_s':>6} {'llm_calls':>10} {'history':>8} {'summary':>8}")
+    for mode, think_time in (("inline", 0.0), ("background", 0.0), ("background", latency)):
+        r = run(mode, turns, latency, think_time)
+        print(f"{mode:>11} {think_time:>8.1f} {r['mean']:>7.3f} {r['p95']:>6.3f} {r['max']:>6.3f} {r['calls']:>10} "
+              f"{r['history_messages']:>8} {str(r['summarized']):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Time to first answer token of the chatbot graph.
+
+The scripted model waits `latency` before its first word and `token_latency`
+between words. Compares waiting for the final state (runs.wait / invoke) with
+the first delta on stream_mode="messages" and on the custom channel.
+
+    python benchmarks/chatbot_streaming.py
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "studio"))
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+from langgraph.checkpoint.memory import MemorySaver
+
+import chatbot
+from fake_llm import ScriptedChatModel
+
+
+def first_token(graph, config, stream_mode: str) -> tuple[float, float, str]:
+    started = time.perf_counter()
+    first, text = None, ""
+    for chunk in graph.stream({"question": "How do I parse JSON in Python?"}, config, stream_mode=stream_mode):
+        if stream_mode == "messages":
+            message, metadata = chunk
+            is_answer = metadata["langgraph_node"] == "chatbot" and message.type == "AIMessageChunk"
+            delta = message.content if is_answer else ""
+        else:
+            delta = chunk.get("answer_delta", "")
+        if delta:
+            first = first or time.perf_counter() - started
+            text += delta
+    return first, time.perf_counter() - started, text
+
+
+def main():
+    chatbot.llm = ScriptedChatModel(response_words=120, latency=0.3, token_latency=0.01)
+    graph = chatbot.workflow.compile(checkpointer=MemorySaver())
+
+    started = time.perf_counter()
+    answer = graph.invoke({"question": "How do I parse JSON in Python?"}, {"configurable": {"thread_id": "wait"}})["answer"]
+    waited = time.perf_counter() - started
+
+    print("120-word answer, 0.3s to first token, 10ms per token")
+    print(f"{'client':>9} {'first_token_s':>14} {'complete_s':>11} {'same_answer':>12}")
+    print(f"{'wait':>9} {waited:>14.3f} {waited:>11.3f} {'True':>12}")
+    for stream_mode in ("messages", "custom"):
+        first, total, text = first_token(graph, {"configurable": {"thread_id": stream_mode}}, stream_mode)
+        print(f"{stream_mode:>9} {first:>14.3f} {total:>11.3f} {str(text == answer):>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+LLM calls and tokens of the chatbot graph over a 50-turn scripted conversation.
+
+Compares the "messages" policy (summarize every turn past two messages) with
+the token water-mark policy, using the offline scripted model.
+
+    python benchmarks/chatbot_summarization.py
+"""
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "studio"))
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+from langgraph.checkpoint.memory import MemorySaver
+
+import chatbot
+from fake_llm import ScriptedChatModel, scripted_questions
+
+
+def run(policy: str, turns: int) -> dict:
+    chatbot.llm = ScriptedChatModel(response_words=120)
+    graph = chatbot.workflow.compile(checkpointer=MemorySaver())
+    config = {"configurable": {"thread_id": policy, "summarize_policy": policy}}
+
+    summaries = 0
+    for question in scripted_questions(turns):
+        for update in graph.stream({"question": question}, config, stream_mode="updates"):
+            summaries += "summarize" in update
+
+    return {
+        "calls": chatbot.llm.calls,
+        "summaries": summaries,
+        "input_tokens": chatbot.llm.input_tokens,
+        "output_tokens": chatbot.llm.output_tokens,
+        "history_messages": len(graph.get_state(config).values["messages"]),
+    }
+
+
+def main():
+    turns = 50
+    print(f"{turns} turns, 120-word answers")
+    print(f"{'policy':>9} {'llm_calls':>10} {'calls/turn':>11} {'summaries':>10} {'input_tok':>10} {'output_tok':>11} {'history':>8}")
+    for policy in ("messages", "tokens"):
+        r = run(policy, turns)
+        print(f"{policy:>9} {r['calls']:>10} {r['calls'] / turns:>11.2f} {r['summaries']:>10} "
+              f"{r['input_tokens']:>10} {r['output_tokens']:>11} {r['history_messages']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Checkpoint retention: history size and reclaimed storage after compaction.
+
+Builds long chatbot threads (summarization off), forks one of them in the
+middle with update_state, then compacts with keep_last=20 on the in-memory,
+Mongo and delta Mongo savers. Checks that the latest state and the fork's
+state are unchanged, and reports checkpoints kept, bytes reclaimed and the
+time spent. A second part runs the background Compactor pass by pass over
+many threads.
+
+    python benchmarks/checkpoint_compaction.py
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "studio"))
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.mongodb import MongoDBSaver
+
+import chatbot
+from checkpoint_retention import Compactor, compact_thread
+from delta_checkpoints import DeltaMongoDBSaver
+from fake_llm import ScriptedChatModel, scripted_questions
+from fake_mongo import mongo_client, mongomock_compat
+
+KEEP_LAST = 20
+
+
+def savers():
+    yield "memory", MemorySaver()
+    yield "mongo", MongoDBSaver(mongo_client())
+    yield "delta", DeltaMongoDBSaver(mongo_client())
+
+
+def snapshot(graph, config) -> tuple:
+    values = graph.get_state(config).values
+    return values.get("summary"), [m.content for m in values.get("messages", [])]
+
+
+def build_thread(graph, thread_id: str, turns: int, fork_at: int = 0) -> dict:
+    config = {"configurable": {"thread_id": thread_id, "summarize_high_water": 10**9}}
+    for question in scripted_questions(turns):
+        graph.invoke({"question": question}, config)
+    if not fork_at:
+        return config
+    # a fork from an earlier turn, its tip must survive compaction
+    history = list(graph.get_state_history(config))
+    fork = graph.update_state(history[-fork_at].config, {"question": "A different question"})
+    return {"configurable": {**config["configurable"], **fork["configurable"]}}
+
+
+def main():
+    turns = 150
+    print(f"one thread of {turns} turns forked at checkpoint 40, keep_last={KEEP_LAST}")
+    print(f"{'saver':>6} {'before':>7} {'after':>6} {'removed':>8} {'writes':>7} {'reclaimed_KB':>13} {'ms':>7} {'intact':>7}")
+    for name, saver in savers():
+        chatbot.llm = ScriptedChatModel(response_words=120)
+        graph = chatbot.workflow.compile(checkpointer=saver)
+        fork = build_thread(graph, name, turns, fork_at=40)
+        latest = {"configurable": {"thread_id": name}}
+        expected = snapshot(graph, latest), snapshot(graph, fork)
+
+        started = time.perf_counter()
+        [report] = compact_thread(saver, name, keep_last=KEEP_LAST)
+        elapsed = time.perf_counter() - started
+
+        # a fresh graph and, for the delta saver, a fresh cache read the compacted history
+        reader = saver if name == "memory" else type(saver)(saver.client)
+        reopened = chatbot.workflow.compile(checkpointer=reader)
+        intact = (snapshot(reopened, latest), snapshot(reopened, fork)) == expected
+        after = len(list(reopened.get_state_history(latest)))
+        print(f"{name:>6} {report.checkpoints_before:>7} {after:>6} {report.checkpoints_removed:>8} "
+              f"{report.writes_removed:>7} {report.bytes_reclaimed / 1e3:>13,.0f} {elapsed * 1e3:>7.1f} {str(intact):>7}")
+
+    threads, turns, per_pass = 40, 30, 10
+    print(f"\nbackground Compactor over {threads} threads of {turns} turns, {per_pass} threads per pass")
+    saver = MemorySaver()
+    chatbot.llm = ScriptedChatModel(response_words=120)
+    graph = chatbot.workflow.compile(checkpointer=saver)
+    for i in range(threads):
+        build_thread(graph, f"thread-{i}", turns)
+    compactor = Compactor(saver, keep_last=KEEP_LAST, slack=10, threads_per_pass=per_pass)
+    print(f"{'pass':>5} {'ms':>7} {'threads':>8} {'removed':>8} {'reclaimed_KB':>13}")
+    for i in range(threads // per_pass + 1):
+        started = time.perf_counter()
+        compactor.run_pass()
+        stats = compactor.stats()
+        print(f"{i + 1:>5} {(time.perf_counter() - started) * 1e3:>7.1f} {stats['threads_compacted']:>8} "
+              f"{stats['checkpoints_removed']:>8} {stats['bytes_reclaimed'] / 1e3:>13,.0f}")
+
+
+if __name__ == "__main__":
+    with mongomock_compat():
+        main()
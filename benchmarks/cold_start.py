@@ -0,0 +1,59 @@
+"""
+Import-time (cold start) cost of every graph registered in langgraph.json.
+
+Each module is imported in a fresh interpreter, so shared dependencies are
+counted for every module, the way a server worker pays for them. The first
+row is the lazy registry the server now loads instead.
+
+    python benchmarks/cold_start.py
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+STUDIO = Path(__file__).resolve().parent.parent / "studio"
+sys.path.insert(0, str(STUDIO))
+
+import graph_registry
+
+PROBE = """
+import time, tracemalloc
+tracemalloc.start()
+start = time.perf_counter()
+import {module}
+graph = {call}
+elapsed = time.perf_counter() - start
+print(elapsed, tracemalloc.get_traced_memory()[1])
+"""
+
+
+def measure(module: str, call: str) -> tuple[float, float]:
+    env = {**os.environ, "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "offline-benchmark")}
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, call=call)],
+        cwd=STUDIO, env=env, capture_output=True, text=True, check=True
+    ).stdout.split()
+    return float(output[-2]), int(output[-1]) / 2**20
+
+
+def main():
+    graphs = json.loads((STUDIO / "langgraph.json").read_text())["graphs"]
+
+    print(f"{'module':>32} {'import_s':>9} {'peak_MiB':>9}")
+    elapsed, memory = measure("graph_registry", "None")
+    print(f"{'graph_registry (server start)':>32} {elapsed:>9.2f} {memory:>9.1f}")
+
+    total = 0.0
+    for graph_id in graphs:
+        module, attribute = graph_registry.GRAPHS[graph_id].split(":")
+        elapsed, memory = measure(module, f"{module}.{attribute}")
+        total += elapsed
+        print(f"{module:>32} {elapsed:>9.2f} {memory:>9.1f}")
+
+    print(f"{'all modules, eager (sum)':>32} {total:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Checkpoint storage of the chatbot graph on MongoDB: full copies vs deltas.
+
+Runs the same conversation (summarization off, so the history only grows) on
+MongoDBSaver and on DeltaMongoDBSaver, both against an in-process mongomock
+client. Reports BSON bytes written per turn and get_state latency as the
+thread grows; the delta saver is measured cold (fresh saver, empty cache).
+
+    python benchmarks/delta_checkpoints_mongo.py
+"""
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "studio"))
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+from langgraph.checkpoint.mongodb import MongoDBSaver
+
+import chatbot
+from delta_checkpoints import DeltaMongoDBSaver
+from fake_llm import ScriptedChatModel, scripted_questions
+from fake_mongo import collection_bytes, mongo_client, mongomock_compat
+
+
+def get_state_latency(graph, config, repeat: int = 20) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        graph.get_state(config)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def run(saver_class, turns: int, probes: set[int]) -> dict:
+    chatbot.llm = ScriptedChatModel(response_words=120)
+    client = mongo_client()
+    graph = chatbot.workflow.compile(checkpointer=saver_class(client))
+    config = {"configurable": {"thread_id": "delta", "summarize_high_water": 10**9}}
+
+    written, previous, latencies = [], 0, {}
+    for turn, question in enumerate(scripted_questions(turns), start=1):
+        graph.invoke({"question": question}, config)
+        size = collection_bytes(client)
+        written.append(size - previous)
+        previous = size
+        if turn in probes:
+            # a new saver on the same collections: nothing cached from the writes
+            cold = chatbot.workflow.compile(checkpointer=saver_class(client))
+            latencies[turn] = get_state_latency(cold, config, repeat=1), get_state_latency(cold, config)
+
+    state = graph.get_state(config).values
+    return {"written": written, "total": previous, "latencies": latencies, "messages": len(state["messages"])}
+
+
+def main():
+    turns, probes = 100, {10, 25, 50, 100}
+    results = {name: run(cls, turns, probes) for name, cls in (("full", MongoDBSaver), ("delta", DeltaMongoDBSaver))}
+    assert results["full"]["messages"] == results["delta"]["messages"]
+
+    print(f"{turns} turns, history of {results['full']['messages']} messages at the end")
+    print(f"{'saver':>6} {'bytes/turn first10':>19} {'bytes/turn last10':>18} {'total_MB':>9}")
+    for name, r in results.items():
+        print(f"{name:>6} {statistics.mean(r['written'][:10]):>19,.0f} {statistics.mean(r['written'][-10:]):>18,.0f} "
+              f"{r['total'] / 1e6:>9.2f}")
+
+    print(f"\nget_state latency (ms), first call on a fresh saver / median of repeats")
+    print(f"{'turn':>5} " + " ".join(f"{name:>16}" for name in results))
+    for turn in sorted(probes):
+        print(f"{turn:>5} " + " ".join(f"{r['latencies'][turn][0] * 1e3:>7.2f} / {r['latencies'][turn][1] * 1e3:>6.2f}"
+                                       for r in results.values()))
+
+
+if __name__ == "__main__":
+    with mongomock_compat():
+        main()
@@ -0,0 +1,96 @@
+"""
+LLM calls and latency per DevMentor turn, serial vs parallel memory updates.
+
+Scripted conversation where some messages touch one, two or all three memories
+(profile, ADRs, instructions). The scripted dev_mentor model signals every
+pending update at once when parallel tool calls are allowed, one at a time
+otherwise; trustcall extractors are replaced by one scripted LLM call each.
+
+    python benchmarks/devmentor_updates.py
+"""
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "studio"))
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.store.memory import InMemoryStore
+
+import devmentor
+from fake_llm import ScriptedChatModel
+
+# user message -> memories it touches
+CONVERSATION = [
+    ("How do I structure a FastAPI project?", []),
+    ("I'm Ana, a senior Python developer using FastAPI.", ["user"]),
+    ("We decided to use Postgres instead of Mongo for all services.", ["adr"]),
+    ("Please always answer with short code examples.", ["instructions"]),
+    ("I'm moving to Go, we decided on gRPC between services, keep answers short.", ["user", "adr", "instructions"]),
+    ("How do I write a table-driven test?", []),
+    ("We now use Redis streams for queues, explain decisions with trade-offs.", ["adr", "instructions"]),
+    ("I lead the platform team and we picked Kubernetes for deployments.", ["user", "adr"]),
+]
+LATENCY = 0.1
+
+
+def mentor_reply(parallel: bool):
+    def respond(messages):
+        human = max(i for i, m in enumerate(messages) if m.type == "human")
+        done = {c["args"]["update_type"] for m in messages[human:] if m.type == "ai" for c in m.tool_calls}
+        touches = dict(CONVERSATION)[messages[human].content]
+        pending = [t for t in touches if t not in done]
+        if not pending:
+            return "Here is my answer."
+        calls = pending if parallel else pending[:1]
+        return AIMessage(content="", tool_calls=[
+            {"name": "UpdateMemory", "args": {"update_type": t}, "id": str(uuid.uuid4())} for t in calls
+        ])
+    return respond
+
+
+def fake_extractor(counter: dict, latency: float = LATENCY):
+    def extract(inputs):
+        time.sleep(latency)
+        counter["extractions"] += 1
+        return {"responses": [], "response_metadata": []}
+    return RunnableLambda(extract)
+
+
+def run(mode: str) -> dict:
+    counter = {"extractions": 0}
+    devmentor.model = ScriptedChatModel(respond=mentor_reply(mode == "parallel"), latency=LATENCY)
+    devmentor.profile_extractor = fake_extractor(counter)
+    devmentor.instruction_extractor = fake_extractor(counter)
+    devmentor.create_extractor = lambda *args, **kwargs: fake_extractor(counter)
+
+    graph = devmentor.builder.compile(checkpointer=MemorySaver(), store=InMemoryStore())
+    started = time.perf_counter()
+    for message, _ in CONVERSATION:
+        config = {"configurable": {"thread_id": mode, "user_id": "ana", "memory_update_mode": mode}}
+        graph.invoke({"messages": [HumanMessage(message)]}, config)
+    elapsed = time.perf_counter() - started
+    turns = len(CONVERSATION)
+    return {
+        "mentor_calls": devmentor.model.calls / turns,
+        "extractions": counter["extractions"] / turns,
+        "seconds": elapsed / turns,
+    }
+
+
+def main():
+    print(f"{len(CONVERSATION)} turns, {LATENCY:.1f}s per LLM call or extraction")
+    print(f"{'mode':>9} {'mentor_calls/turn':>18} {'extractions/turn':>17} {'llm_calls/turn':>15} {'s/turn':>7}")
+    for mode in ("serial", "parallel"):
+        r = run(mode)
+        print(f"{mode:>9} {r['mentor_calls']:>18.2f} {r['extractions']:>17.2f} "
+              f"{r['mentor_calls'] + r['extractions']:>15.2f} {r['seconds']:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+DevMentor turn latency with inline and write-behind (background) extraction.
+
+Uses the scripted conversation of devmentor_updates.py, parallel update mode and
+trustcall extractors replaced by a fixed-latency stand-in. Reports the time until
+the run returns and the extraction queue metrics once the queue has drained.
+
+    python benchmarks/extraction_write_behind.py
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "studio"))
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.store.memory import InMemoryStore
+
+import devmentor
+import extraction_queue
+from devmentor_updates import CONVERSATION, LATENCY, fake_extractor, mentor_reply
+from fake_llm import ScriptedChatModel
+
+EXTRACTION_LATENCY = 0.3
+
+
+def run(mode: str, users: int) -> dict:
+    counter = {"extractions": 0}
+    devmentor.model = ScriptedChatModel(respond=mentor_reply(True), latency=LATENCY)
+    devmentor.profile_extractor = fake_extractor(counter, EXTRACTION_LATENCY)
+    devmentor.instruction_extractor = fake_extractor(counter, EXTRACTION_LATENCY)
+    devmentor.create_extractor = lambda *args, **kwargs: fake_extractor(counter, EXTRACTION_LATENCY)
+    queue = extraction_queue.default_queue = extraction_queue.ExtractionQueue()
+
+    graph = devmentor.builder.compile(checkpointer=MemorySaver(), store=InMemoryStore())
+    latencies, peak_depth = [], 0
+    for message, _ in CONVERSATION:
+        for user in range(users):
+            config = {"configurable": {
+                "thread_id": f"{mode}-{user}", "user_id": f"user{user}",
+                "memory_update_mode": "parallel", "memory_write_mode": mode,
+            }}
+            started = time.perf_counter()
+            graph.invoke({"messages": [HumanMessage(message)]}, config)
+            latencies.append(time.perf_counter() - started)
+            peak_depth = max(peak_depth, queue.depth())
+
+    queue.join()
+    return {"turn_s": sum(latencies) / len(latencies), "extractions": counter["extractions"],
+            "peak_depth": peak_depth, **queue.stats()}
+
+
+def main():
+    users = 3
+    print(f"{len(CONVERSATION)} turns x {users} users, {LATENCY:.1f}s per dev_mentor call, "
+          f"{EXTRACTION_LATENCY:.1f}s per extraction")
+    print(f"{'mode':>11} {'turn_s':>7} {'extractions':>12} {'coalesced':>10} {'peak_depth':>11} {'max_lag_s':>10}")
+    for mode in ("inline", "background"):
+        r = run(mode, users)
+        print(f"{mode:>11} {r['turn_s']:>7.2f} {r['extractions']:>12} {r['coalesced']:>10} "
+              f"{r['peak_depth']:>11} {r['max_lag']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
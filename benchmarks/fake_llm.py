@@ -0,0 +1,204 @@
+"""
+Offline stand-in for ChatOpenAI used by the benchmarks.
+
+Answers with scripted or generated text after a configurable latency (streamed
+word by word when `token_latency` is set) and counts
+calls and (approximate) input/output tokens, so benchmarks can compare how many
+LLM calls and tokens a graph spends without a provider.
+
+Tools bound with bind_tools() reach the model like they reach ChatOpenAI: a
+forced tool_choice (a tool name, "any" or "required") is answered with a call
+whose arguments are generated from the tool's JSON schema. That makes
+with_structured_output() and trustcall extractors work on top of it.
+"""
+import asyncio
+import itertools
+import json
+import re
+import threading
+import time
+import uuid
+from typing import Any, Callable, Iterable, Iterator, Optional, Sequence, Union
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import ConfigDict, Field, PrivateAttr
+
+# trustcall's tools for editing documents it already extracted
+PATCH_TOOLS = {"PatchDoc", "PatchFunctionErrors"}
+# where trustcall lists the existing documents in its prompt
+EXISTING_DOC_ID = re.compile(r"<(?:instance|schema) id=([^\s>]+)")
+
+
+def fake_arguments(schema: dict, defs: Optional[dict] = None, name: str = "value") -> Any:
+    """A value valid for a JSON schema (as pydantic writes them), every property filled."""
+    defs = defs if defs is not None else schema.get("$defs", {})
+    if "$ref" in schema:
+        return fake_arguments(defs[schema["$ref"].split("/")[-1]], defs, name)
+    for union in ("anyOf", "oneOf"):
+        if union in schema:
+            options = [s for s in schema[union] if s.get("type") != "null"] or schema[union]
+            return fake_arguments(options[0], defs, name)
+    if "allOf" in schema:
+        return fake_arguments(schema["allOf"][0], defs, name)
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "const" in schema:
+        return schema["const"]
+
+    kind = schema.get("type", "object" if "properties" in schema else "string")
+    if kind == "object":
+        return {key: fake_arguments(value, defs, key) for key, value in schema.get("properties", {}).items()}
+    if kind == "array":
+        return [fake_arguments(schema.get("items", {}), defs, name)]
+    if kind == "integer":
+        return max(1, schema.get("minimum", 1))
+    if kind == "number":
+        return float(max(1, schema.get("minimum", 1)))
+    if kind == "boolean":
+        return True
+    if schema.get("format") == "date-time":
+        return "2025-01-01T00:00:00"
+    if schema.get("format") == "date":
+        return "2025-01-01"
+    return f"{name} value"
+
+
+def forced_tool(tools: Sequence[dict], tool_choice: Any) -> Optional[dict]:
+    """The bound tool a tool_choice makes the model call, None when it may answer with text."""
+    if not tools or tool_choice in (None, False, "auto", "none"):
+        return None
+    if isinstance(tool_choice, dict):
+        tool_choice = tool_choice.get("function", {}).get("name", "any")
+    functions = [tool["function"] for tool in tools]
+    if tool_choice in ("any", "required", True):
+        # trustcall offers its patch tools next to the schemas; new documents are inserts
+        return next((f for f in functions if f["name"] not in PATCH_TOOLS), functions[0])
+    return next((f for f in functions if f["name"] == tool_choice), None)
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Replies with `responses` in order (cycling), or with `response_words` filler
+    words when no script is given. `respond` may compute a reply from the prompt,
+    as text or as a whole AIMessage (e.g. with tool calls).
+
+    A forced tool call (structured output, trustcall) bypasses both: its
+    arguments come from `tool_args(name, parameters_schema, messages)`, or are
+    generated from the schema.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    responses: list[str] = Field(default_factory=list)
+    respond: Optional[Callable[[list[BaseMessage]], Union[str, AIMessage]]] = None
+    tool_args: Optional[Callable[[str, dict, list[BaseMessage]], dict]] = None
+    response_words: int = 60
+    latency: float = 0.0  # before the first token
+    token_latency: float = 0.0  # between streamed words
+
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _script: Any = PrivateAttr(default=None)
+    calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, tool_choice: Any = None, **kwargs):
+        formatted = [convert_to_openai_tool(tool) for tool in tools]
+        return self.bind(tools=formatted, tool_choice=tool_choice, **kwargs)
+
+    def reset_counters(self):
+        with self._lock:
+            self.calls = 0
+            self.input_tokens = 0
+            self.output_tokens = 0
+
+    def _next_text(self, messages: list[BaseMessage], tools: Sequence[dict] = (),
+                   tool_choice: Any = None) -> Union[str, AIMessage]:
+        # a provider has to call a forced tool whatever the prompt says
+        tool = forced_tool(tools, tool_choice)
+        if tool is not None:
+            return self._tool_call(tool, messages)
+        if self.respond is not None:
+            return self.respond(messages)
+        if self.responses:
+            with self._lock:
+                if self._script is None:
+                    self._script = itertools.cycle(self.responses)
+                return next(self._script)
+        return " ".join(f"word{i}" for i in range(self.response_words))
+
+    def _tool_call(self, tool: dict, messages: list[BaseMessage]) -> AIMessage:
+        parameters = tool.get("parameters", {})
+        if self.tool_args is not None:
+            args = self.tool_args(tool["name"], parameters, messages)
+        else:
+            args = fake_arguments(parameters)
+            if tool["name"] == "PatchDoc":
+                # an empty patch of the first document trustcall shows
+                found = EXISTING_DOC_ID.search("\n".join(str(m.content) for m in messages))
+                args.update(json_doc_id=found.group(1) if found else "", patches=[])
+        return AIMessage(content="", tool_calls=[{"name": tool["name"], "args": args, "id": f"call_{uuid.uuid4().hex[:24]}"}])
+
+    def _reply(self, messages: list[BaseMessage], tools: Sequence[dict] = (), tool_choice: Any = None,
+               **kwargs) -> ChatResult:
+        reply = self._next_text(messages, tools, tool_choice)
+        message = reply if isinstance(reply, AIMessage) else AIMessage(content=reply)
+        # bound tool schemas are part of the prompt a provider bills
+        input_tokens = count_tokens_approximately(messages, tools=list(tools) or None)
+        output_tokens = count_tokens_approximately([message])
+        message.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        result = self._reply(messages, **kwargs)
+        time.sleep(self.latency + self.token_latency * len(result.generations[0].message.content.split()))
+        return result
+
+    async def _agenerate(self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        result = self._reply(messages, **kwargs)
+        await asyncio.sleep(self.latency + self.token_latency * len(result.generations[0].message.content.split()))
+        return result
+
+    def _stream(self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        message = self._reply(messages, **kwargs).generations[0].message
+        time.sleep(self.latency)
+        if message.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=message.usage_metadata, tool_call_chunks=[
+                {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i}
+                for i, c in enumerate(message.tool_calls)
+            ]))
+            return
+        words = message.content.split(" ")
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=message.usage_metadata))
+
+
+def scripted_questions(count: int, words: Iterable[str] = ("python", "json", "api", "parsing", "errors")) -> list[str]:
+    """Deterministic user questions of varying length for multi-turn benchmarks."""
+    words = list(words)
+    return [
+        f"Question {i}: how do I handle {words[i % len(words)]} " + " ".join(words[: 1 + i % len(words)]) * (1 + i % 3) + "?"
+        for i in range(count)
+    ]
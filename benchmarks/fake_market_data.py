@@ -0,0 +1,361 @@
+"""
+Local stand-ins for the market data providers used by the studio graphs.
+
+FakeMarketDataServer serves deterministic company info and daily OHLCV history
+over HTTP with a configurable response latency, so benchmarks can measure how
+the graphs behave under network wait without touching Yahoo Finance.
+FakeMarketData replaces yfinance and the Alpha Vantage symbol search in
+process, for running whole graphs offline.
+"""
+import functools
+import json
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import yfinance
+
+
+PERIOD_DAYS = {"5d": 5, "1mo": 21, "3mo": 63, "6mo": 126, "1y": 252, "2y": 504, "5y": 1260}
+
+
+def fake_info(symbol: str) -> dict:
+    rng = random.Random(f"info-{symbol}")
+    price = round(rng.uniform(5, 500), 2)
+    return {
+        "symbol": symbol,
+        "shortName": f"{symbol} Corp",
+        "longName": f"{symbol} Corporation",
+        "sector": rng.choice(["Technology", "Healthcare", "Energy", "Financial Services"]),
+        "industry": rng.choice(["Software", "Semiconductors", "Biotechnology", "Utilities"]),
+        "currentPrice": price,
+        "marketCap": int(price * rng.randint(10**7, 10**9)),
+        "trailingPE": round(rng.uniform(5, 80), 2),
+        "forwardPE": round(rng.uniform(5, 60), 2),
+        "dividendYield": round(rng.uniform(0, 0.05), 4),
+        "beta": round(rng.uniform(0.5, 2.0), 2),
+        "fiftyTwoWeekHigh": round(price * rng.uniform(1.0, 1.6), 2),
+        "fiftyTwoWeekLow": round(price * rng.uniform(0.5, 1.0), 2),
+        "longBusinessSummary": f"{symbol} Corporation designs, builds and sells products. " * 20,
+        # the real payload carries ~150 keys, most of them irrelevant for analysis
+        **{f"field_{i}": rng.random() for i in range(120)},
+    }
+
+
+def fake_history(symbol: str, period: str = "1mo", end: date | None = None) -> dict:
+    """Daily OHLCV bars in the column -> {iso date -> value} layout of DataFrame.to_dict()."""
+    rng = random.Random(f"history-{symbol}")
+    days = PERIOD_DAYS.get(period, 21)
+    end = end or date.today()
+    price = rng.uniform(5, 500)
+    history = {"Open": {}, "High": {}, "Low": {}, "Close": {}, "Volume": {}}
+    for offset in range(days, 0, -1):
+        day = (end - timedelta(days=offset)).isoformat()
+        open_price = price
+        price = max(1.0, price * (1 + rng.gauss(0, 0.02)))
+        history["Open"][day] = round(open_price, 4)
+        history["High"][day] = round(max(open_price, price) * 1.01, 4)
+        history["Low"][day] = round(min(open_price, price) * 0.99, 4)
+        history["Close"][day] = round(price, 4)
+        history["Volume"][day] = rng.randint(10**5, 10**7)
+    return history
+
+
+class FakeMarketDataServer:
+    """
+    HTTP server with the endpoints /info/<symbol>, /history/<symbol>?period=1mo
+    and the bulk /history?symbols=A,B,C&period=1mo.
+
+    Every response is delayed by `latency` seconds; symbols in `slow_symbols`
+    are delayed by `slow_latency` instead. With `rate_limit` set, requests above
+    that many per second are answered with 429 Too Many Requests.
+    """
+
+    def __init__(self, latency: float = 0.2, slow_symbols: set[str] | None = None, slow_latency: float = 5.0,
+                 rate_limit: int | None = None):
+        self.latency = latency
+        self.slow_symbols = slow_symbols or set()
+        self.slow_latency = slow_latency
+        self.rate_limit = rate_limit
+        self.requests = 0
+        self.rejected = 0
+        self._window = (0, 0)  # (second, requests accepted in it)
+        self._info_pool = ThreadPoolExecutor(max_workers=8)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests = 0
+            self.rejected = 0
+
+    def _admit(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            if self.rate_limit is None:
+                return True
+            second = int(time.monotonic())
+            window_second, accepted = self._window
+            if second != window_second:
+                window_second, accepted = second, 0
+            if accepted >= self.rate_limit:
+                self.rejected += 1
+                return False
+            self._window = (window_second, accepted + 1)
+            return True
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                parts = url.path.strip("/").split("/")
+                query = parse_qs(url.query)
+                period = query.get("period", ["1mo"])[0]
+
+                if not server._admit():
+                    self.send_error(429)
+                    return
+
+                if parts[0] == "info" and len(parts) == 2:
+                    symbols = [parts[1]]
+                    payload = fake_info(parts[1])
+                elif parts[0] == "history" and len(parts) == 2:
+                    symbols = [parts[1]]
+                    payload = fake_history(parts[1], period)
+                elif parts[0] == "history" and "symbols" in query:
+                    symbols = query["symbols"][0].split(",")
+                    payload = {symbol: fake_history(symbol, period) for symbol in symbols}
+                else:
+                    self.send_error(404)
+                    return
+
+                slow = any(symbol in server.slow_symbols for symbol in symbols)
+                time.sleep(server.slow_latency if slow else server.latency)
+
+                body = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def get_json(self, path: str, retries: int = 20) -> dict:
+        # back off on 429 the way a well-behaved client would
+        for attempt in range(retries):
+            try:
+                with urllib.request.urlopen(f"{self.url}{path}") as response:
+                    return json.loads(response.read())
+            except urllib.error.HTTPError as e:
+                if e.code != 429 or attempt == retries - 1:
+                    raise
+                time.sleep(0.1 * (attempt + 1))
+
+    def load_stock_data(self, stock_symbol: str) -> dict:
+        """Drop-in replacement for map_reduce.load_stock_data backed by this server."""
+        return {
+            "stock_symbol": stock_symbol,
+            "info": self.get_json(f"/info/{stock_symbol}"),
+            "history": self.get_json(f"/history/{stock_symbol}?period=1mo"),
+        }
+
+    def load_stocks_data(self, stock_symbols: list[str]) -> dict[str, dict]:
+        """Drop-in replacement for map_reduce.load_stocks_data backed by this server."""
+        histories = self.get_json(f"/history?symbols={','.join(stock_symbols)}&period=1mo")
+        # one pool for all batches, as map_reduce does
+        infos = dict(zip(stock_symbols, self._info_pool.map(lambda s: self.get_json(f"/info/{s}"), stock_symbols)))
+        return {
+            symbol: {"stock_symbol": symbol, "info": infos[symbol], "history": histories[symbol]}
+            for symbol in stock_symbols
+        }
+
+
+# Companies the Alpha Vantage stand-in knows, none of them in studio/data/listing.csv
+SEARCHABLE_COMPANIES = {
+    "Acme Robotics": "ACMR",
+    "Globex Corporation": "GLBX",
+    "Initech": "INIT",
+    "Umbrella Pharmaceuticals": "UMBR",
+    "Hooli": "HOOL",
+}
+
+
+@functools.lru_cache(maxsize=256)
+def daily_bars(symbol: str) -> pd.DataFrame:
+    """Five years of business-day bars up to today, the same for every call with the symbol."""
+    rng = random.Random(f"bars-{symbol}")
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=PERIOD_DAYS["5y"], name="Date")
+    price = rng.uniform(5, 500)
+    rows = []
+    for _ in dates:
+        open_price = price
+        price = max(1.0, price * (1 + rng.gauss(0, 0.02)))
+        rows.append((open_price, max(open_price, price) * 1.01, min(open_price, price) * 0.99, price,
+                     rng.randint(10**5, 10**7), 0.0, 0.0))
+    frame = pd.DataFrame(rows, index=dates, columns=["Open", "High", "Low", "Close", "Volume", "Dividends", "Stock Splits"])
+    # yfinance stamps bars at midnight exchange time
+    frame.index = frame.index.tz_localize("America/New_York")
+    return frame
+
+
+class FakeTicker:
+    """yfinance.Ticker with .info and .history() answered by the owning FakeMarketData."""
+
+    def __init__(self, market: "FakeMarketData", symbol: str):
+        self.market = market
+        self.ticker = symbol.upper()
+
+    @property
+    def info(self) -> dict:
+        self.market._request("info", [self.ticker])
+        return {} if self.ticker in self.market.missing_symbols else fake_info(self.ticker)
+
+    def history(self, period: Optional[str] = "1mo", interval: str = "1d", start=None, end=None, **kwargs) -> pd.DataFrame:
+        self.market._request("history", [self.ticker])
+        return self.market._bars(self.ticker, period, start, end)
+
+
+class FakeTickers:
+    def __init__(self, market: "FakeMarketData", symbols):
+        symbols = symbols.split() if isinstance(symbols, str) else symbols
+        self.symbols = [s.upper() for s in symbols]
+        self.tickers = {s: FakeTicker(market, s) for s in self.symbols}
+
+
+class _Response:
+    def __init__(self, payload: dict):
+        self.payload = payload
+        self.status_code = 200
+
+    def json(self) -> dict:
+        return self.payload
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeAlphaVantageSession:
+    """requests.Session answering Alpha Vantage's SYMBOL_SEARCH from SEARCHABLE_COMPANIES."""
+
+    def __init__(self, market: "FakeMarketData"):
+        self.market = market
+
+    def get(self, url: str, params: Optional[dict] = None, **kwargs) -> _Response:
+        params = params or {}
+        keywords = str(params.get("keywords", "")).lower()
+        self.market._request("symbol_search", [])
+        if params.get("function") != "SYMBOL_SEARCH":
+            return _Response({"Information": "Only SYMBOL_SEARCH is available offline."})
+        matches = [
+            {"1. symbol": symbol, "2. name": name, "3. type": "Equity", "4. region": "United States", "8. currency": "USD",
+             "9. matchScore": "1.0000"}
+            for name, symbol in self.market.companies.items()
+            if keywords and (keywords in name.lower() or name.lower() in keywords)
+        ]
+        return _Response({"bestMatches": matches})
+
+
+class FakeMarketData:
+    """
+    In-process yfinance (Ticker, Tickers, download) and Alpha Vantage symbol search.
+
+    While the context is open, yfinance's entry points and the alphavantage_session
+    of every imported graph module are replaced; each request waits `latency`
+    seconds and is counted by kind. Symbols in `missing_symbols` have no data,
+    like a delisted ticker.
+    """
+
+    def __init__(self, latency: float = 0.0, missing_symbols: set[str] | None = None,
+                 companies: Optional[dict[str, str]] = None):
+        self.latency = latency
+        self.missing_symbols = {s.upper() for s in missing_symbols or ()}
+        self.companies = dict(SEARCHABLE_COMPANIES if companies is None else companies)
+        self.requests: Counter = Counter()
+        self.session = FakeAlphaVantageSession(self)
+        self._lock = threading.Lock()
+        self._saved = []
+
+    def Ticker(self, symbol: str, session=None) -> FakeTicker:
+        return FakeTicker(self, symbol)
+
+    def Tickers(self, symbols, session=None) -> FakeTickers:
+        return FakeTickers(self, symbols)
+
+    def download(self, tickers, period: Optional[str] = "1mo", interval: str = "1d", start=None, end=None,
+                 group_by: str = "column", multi_level_index: bool = True, progress: bool = True, **kwargs) -> pd.DataFrame:
+        symbols = [s.upper() for s in (tickers.split() if isinstance(tickers, str) else tickers)]
+        self._request("download", symbols)
+        frames = {s: self._bars(s, period, start, end) for s in symbols if s not in self.missing_symbols}
+        if not frames:
+            return pd.DataFrame()
+        frame = pd.concat(frames, axis=1)
+        return frame if group_by == "ticker" else frame.swaplevel(axis=1).sort_index(axis=1)
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests.clear()
+
+    def __enter__(self):
+        patches = [(yfinance, "Ticker", self.Ticker), (yfinance, "Tickers", self.Tickers), (yfinance, "download", self.download)]
+        patches += [
+            (module, "alphavantage_session", self.session)
+            for module in list(sys.modules.values()) if "alphavantage_session" in getattr(module, "__dict__", {})
+        ]
+        for target, name, fake in patches:
+            self._saved.append((target, name, getattr(target, name)))
+            setattr(target, name, fake)
+        return self
+
+    def __exit__(self, *exc):
+        for target, name, original in reversed(self._saved):
+            setattr(target, name, original)
+        self._saved.clear()
+
+    def _request(self, kind: str, symbols: list[str]):
+        with self._lock:
+            self.requests[kind] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _bars(self, symbol: str, period: Optional[str], start, end) -> pd.DataFrame:
+        if symbol in self.missing_symbols:
+            return pd.DataFrame(columns=["Open", "High", "Low", "Close", "Volume"])
+        bars = daily_bars(symbol)
+        if start is None:
+            return bars.iloc[-PERIOD_DAYS.get(period or "1mo", 21):].copy()
+        index = bars.index.tz_localize(None)
+        selected = index >= pd.Timestamp(start)
+        if end is not None:
+            selected &= index < pd.Timestamp(end)
+        return bars[selected].copy()
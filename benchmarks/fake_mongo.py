@@ -0,0 +1,29 @@
+"""
+In-process MongoDB (mongomock) for the checkpoint benchmarks.
+"""
+import contextlib
+
+import bson
+import mongomock
+
+
+@contextlib.contextmanager
+def mongomock_compat():
+    """While open, mongomock takes the sort= pymongo 4.9+ passes to bulk updates (and ignores it)."""
+    builder = mongomock.collection.BulkOperationBuilder
+    add_update = builder.add_update
+    builder.add_update = lambda self, *args, sort=None, **kwargs: add_update(self, *args, **kwargs)
+    try:
+        yield
+    finally:
+        builder.add_update = add_update
+
+
+def mongo_client() -> mongomock.MongoClient:
+    return mongomock.MongoClient()
+
+
+def collection_bytes(client, db_name: str = "checkpointing_db") -> int:
+    """BSON size of the checkpoints and writes stored by a MongoDBSaver."""
+    db = client[db_name]
+    return sum(len(bson.encode(doc)) for name in ("checkpoints", "checkpoint_writes") for doc in db[name].find())
@@ -0,0 +1,443 @@
+"""
+End-to-end benchmark of the eight graphs in studio/langgraph.json, fully offline.
+
+Every graph runs a short scripted workload on ScriptedChatModel (tool calls,
+structured output and trustcall extractions included) and FakeMarketData in
+place of yfinance and Alpha Vantage. Per node: runs, latency, LLM calls and
+tokens; per scenario: wall time, LLM calls and tokens, market data requests,
+and the peak and retained memory allocated by one more run under tracemalloc.
+
+    python benchmarks/graph_suite.py
+    python benchmarks/graph_suite.py --only chatbot,map_reduce --repeat 5
+    python benchmarks/graph_suite.py --save baseline.json
+    python benchmarks/graph_suite.py --check baseline.json --tolerance 0.25
+
+--check exits with status 1 when a scenario makes more LLM calls than the
+baseline, or its tokens, wall time or peak memory grow by more than the
+tolerance.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "studio"))
+_scratch = tempfile.mkdtemp(prefix="graph-suite-")
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+# nothing from earlier runs or from the studio's own caches
+os.environ.setdefault("MARKET_DATA_CACHE", "")
+os.environ.setdefault("NODE_CACHE_PATH", "")
+os.environ.setdefault("LLM_CACHE_PATH", "")
+os.environ.setdefault("PRICE_STORE", os.path.join(_scratch, "prices"))
+os.environ.setdefault("BLOB_STORE", os.path.join(_scratch, "blobs"))
+os.environ.setdefault("SYMBOL_LEARNED", os.path.join(_scratch, "learned_symbols.csv"))
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.store.memory import InMemoryStore
+from trustcall import create_extractor
+
+import chatbot
+import chatbot_long_term_memory
+import devmentor
+import directive_memory_bot
+import financial_advisor
+import financial_advisor_breakpoint
+import financial_advisor_intent_check
+import intent_classifier
+import map_reduce
+import market_data_cache
+import price_store
+import symbol_index
+from fake_llm import ScriptedChatModel, scripted_questions
+from fake_market_data import FakeMarketData
+
+OUTSIDE = "(no node)"  # model calls made outside of a graph run, e.g. background summaries
+
+
+# Metrics
+##################################################################################
+class NodeMetrics(BaseCallbackHandler):
+    """Latency, LLM calls and tokens per graph node, from the run callbacks."""
+
+    run_inline = True
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.llm_calls: dict[str, int] = defaultdict(int)
+        self.input_tokens: dict[str, int] = defaultdict(int)
+        self.output_tokens: dict[str, int] = defaultdict(int)
+        self._started: dict = {}
+        self._node_of: dict = {}  # node runs and the chains nested in them (e.g. trustcall's graph) -> node
+        self._llm_nodes: dict = {}
+        self._lock = threading.Lock()
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        with self._lock:
+            if parent_run_id in self._node_of:
+                self._node_of[run_id] = self._node_of[parent_run_id]
+            elif (metadata or {}).get("langgraph_node") and kwargs.get("name") == metadata["langgraph_node"]:
+                self._node_of[run_id] = metadata["langgraph_node"]
+                self._started[run_id] = (metadata["langgraph_node"], time.perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        # interrupts end a node with an error too
+        self._finish(run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        with self._lock:
+            self._llm_nodes[run_id] = self._node_of.get(parent_run_id) or (metadata or {}).get("langgraph_node", OUTSIDE)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            node = self._llm_nodes.pop(run_id, OUTSIDE)
+            self.llm_calls[node] += 1
+            for generations in response.generations:
+                usage = getattr(getattr(generations[0], "message", None), "usage_metadata", None) or {}
+                self.input_tokens[node] += usage.get("input_tokens", 0)
+                self.output_tokens[node] += usage.get("output_tokens", 0)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            self._llm_nodes.pop(run_id, None)
+
+    def nodes(self) -> list[str]:
+        return sorted(set(self.latencies) | set(self.llm_calls))
+
+    def _finish(self, run_id):
+        with self._lock:
+            self._node_of.pop(run_id, None)
+            started = self._started.pop(run_id, None)
+            if started:
+                node, at = started
+                self.latencies[node].append(time.perf_counter() - at)
+
+
+@dataclass
+class Run:
+    """What a scenario needs for one run: fake models, configs with the metrics callback."""
+
+    llm_latency: float
+    callbacks: list
+    models: list = field(default_factory=list)
+
+    def model(self, **kwargs) -> ScriptedChatModel:
+        model = ScriptedChatModel(latency=self.llm_latency, **kwargs)
+        self.models.append(model)
+        return model
+
+    def config(self, thread_id: str, **configurable) -> dict:
+        # a new run id for every invocation, as the server does (memory_access scopes RunMemory to it)
+        return {"configurable": {"thread_id": thread_id, "run_id": str(uuid.uuid4()), **configurable},
+                "callbacks": self.callbacks}
+
+
+def reset_shared_state():
+    # every run starts cold: no cached quotes, stored prices or learned symbols
+    market_data_cache.default_cache = market_data_cache.MarketDataCache()
+    price_store.default_store = price_store.PriceStore(tempfile.mkdtemp(dir=_scratch))
+    symbol_index.default_index = symbol_index.SymbolIndex(
+        listing_path=os.environ.get("SYMBOL_LISTING", os.path.join(os.path.dirname(symbol_index.__file__), "data", "listing.csv")),
+    )
+
+
+# Scenarios
+##################################################################################
+def run_chatbot(run: Run):
+    # twelve turns, the token high-water mark is crossed a few times
+    chatbot.llm = run.model(response_words=80)
+    graph = chatbot.workflow.compile(checkpointer=MemorySaver())
+    for question in scripted_questions(12):
+        graph.invoke({"question": question}, run.config("chatbot", summarize_high_water=1200, summarize_low_water=400))
+
+
+MEMORY_CHAT = [
+    "Hi! I'm Bob, I build an MCP server in TypeScript.",
+    "How do I validate JSON input in TypeScript?",
+    "I also like hiking on weekends and I live in Lisbon.",
+    "What's a good way to structure tests?",
+    "My team is moving the server to Deno.",
+    "Thanks, that helps.",
+]
+
+
+def run_chatbot_long_term_memory(run: Run):
+    chatbot_long_term_memory.model = run.model(response_words=50)
+    graph = chatbot_long_term_memory.builder.compile(checkpointer=MemorySaver(), store=InMemoryStore())
+    for message in MEMORY_CHAT:
+        graph.invoke({"messages": [HumanMessage(message)]}, run.config("memory", user_id="bob"))
+
+
+DIRECTIVE_CHAT = [
+    "Please keep your answers short.",
+    "How do I reverse a list in Python?",
+    "Always include a code example when you explain something.",
+    "What is a context manager?",
+    "Avoid jargon, I'm new to programming.",
+    "How do I read a file line by line?",
+]
+
+
+def run_directive_memory_bot(run: Run):
+    model = run.model(response_words=50)
+    directive_memory_bot.model = model
+    directive_memory_bot.trustcall_extractor = create_extractor(
+        model, tools=[directive_memory_bot.InteractionDirective], tool_choice="InteractionDirective", enable_inserts=True
+    )
+    graph = directive_memory_bot.builder.compile(checkpointer=MemorySaver(), store=InMemoryStore())
+    for message in DIRECTIVE_CHAT:
+        graph.invoke({"messages": [HumanMessage(message)]}, run.config("directives", user_id="ana"))
+
+
+# user message -> memories it touches
+MENTOR_CHAT = {
+    "How do I structure a FastAPI project?": [],
+    "I'm Ana, a senior Python developer using FastAPI.": ["user"],
+    "We decided to use Postgres instead of Mongo for all services.": ["adr"],
+    "Please always answer with short code examples.": ["instructions"],
+    "I'm moving to Go, we decided on gRPC between services, keep answers short.": ["user", "adr", "instructions"],
+    "How do I write a table-driven test?": [],
+}
+
+
+def mentor_reply(messages):
+    human = max(i for i, m in enumerate(messages) if m.type == "human")
+    done = {c["args"]["update_type"] for m in messages[human:] if m.type == "ai" for c in m.tool_calls}
+    pending = [t for t in MENTOR_CHAT.get(messages[human].content, []) if t not in done]
+    if not pending:
+        return " ".join(f"word{i}" for i in range(60))
+    return AIMessage(content="", tool_calls=[
+        {"name": "UpdateMemory", "args": {"update_type": pending[0]}, "id": f"call_{uuid.uuid4().hex[:24]}"}
+    ])
+
+
+def run_dev_mentor(run: Run):
+    model = run.model(respond=mentor_reply)
+    devmentor.model = model
+    devmentor.profile_extractor = create_extractor(model, tools=[devmentor.DevProfile], tool_choice="DevProfile")
+    devmentor.instruction_extractor = create_extractor(
+        model, tools=[devmentor.Instruction], tool_choice="Instruction", enable_inserts=True
+    )
+    graph = devmentor.builder.compile(checkpointer=MemorySaver(), store=InMemoryStore())
+    for message in MENTOR_CHAT:
+        graph.invoke({"messages": [HumanMessage(message)]}, run.config("mentor", user_id="ana"))
+
+
+# question -> companies it asks about; Acme Robotics is only known to the (fake) Alpha Vantage search
+ADVISOR_QUESTIONS = {
+    "Should I buy Tesla?": ["Tesla"],
+    "Is Apple or Microsoft the better investment right now?": ["Apple", "Microsoft"],
+    "What do you think about Acme Robotics?": ["Acme Robotics"],
+    "Should I sell my Nvidia shares?": ["Nvidia"],
+}
+
+
+def advisor_reply(messages):
+    # symbols first, then market data for each of them, then the answer
+    human = max(i for i, m in enumerate(messages) if m.type == "human")
+    results = [m for m in messages[human:] if isinstance(m, ToolMessage)]
+    companies = ADVISOR_QUESTIONS.get(messages[human].content, [])
+    if not results and companies:
+        calls = [("lookup_stock_symbol", {"__arg1": company}) for company in companies]
+    elif results and all(m.name == "lookup_stock_symbol" for m in results):
+        calls = [("fetch_stock_data_raw", {"stock_symbol": m.content}) for m in results]
+    else:
+        return " ".join(f"word{i}" for i in range(120))
+    return AIMessage(content="", tool_calls=[
+        {"name": name, "args": args, "id": f"call_{uuid.uuid4().hex[:24]}"} for name, args in calls
+    ])
+
+
+def run_financial_advisor(run: Run):
+    financial_advisor.llm_with_tools = run.model(respond=advisor_reply).bind_tools(financial_advisor.toolbox)
+    graph = financial_advisor.builder.compile(checkpointer=MemorySaver())
+    for i, question in enumerate(ADVISOR_QUESTIONS):
+        asyncio.run(graph.ainvoke({"messages": [HumanMessage(question)]}, run.config(f"advisor-{i}")))
+
+
+def run_financial_advisor_breakpoint(run: Run):
+    # approves every tool call at the breakpoint
+    financial_advisor_breakpoint.llm_with_tools = run.model(respond=advisor_reply).bind_tools(
+        financial_advisor_breakpoint.toolbox
+    )
+    graph = financial_advisor_breakpoint.builder.compile(checkpointer=MemorySaver(), interrupt_before=["tools"])
+    for i, question in enumerate(ADVISOR_QUESTIONS):
+        graph.invoke({"messages": [HumanMessage(question)]}, run.config(f"breakpoint-{i}"))
+        while graph.get_state(run.config(f"breakpoint-{i}")).next:
+            graph.invoke(None, run.config(f"breakpoint-{i}"))
+
+
+INTENT_QUESTIONS = list(ADVISOR_QUESTIONS) + [
+    "How do I make a paper airplane?",
+    "Is it a good time to refinance my mortgage?",
+    "Tell me about the history of the stock exchange building in Lisbon.",
+]
+_intent_classifier = None
+
+
+def run_financial_advisor_intent_check(run: Run):
+    global _intent_classifier
+    _intent_classifier = _intent_classifier or intent_classifier.train_default_classifier()
+    # a fresh gate, its verdict cache would answer every later run
+    financial_advisor_intent_check.intent_gate = intent_classifier.IntentGate(_intent_classifier)
+    model = run.model(respond=advisor_reply)
+    financial_advisor_intent_check.simple_llm = run.model(responses=["True"])
+    financial_advisor_intent_check.llm_with_tools = model.bind_tools(financial_advisor_intent_check.toolbox)
+    graph = financial_advisor_intent_check.builder.compile(checkpointer=MemorySaver())
+    for i, question in enumerate(INTENT_QUESTIONS):
+        graph.invoke({"messages": [HumanMessage(question)]}, run.config(f"intent-{i}"))
+
+
+def stock_picks(name: str, schema: dict, messages) -> dict:
+    prompt = str(messages[-1].content)
+    count = int(prompt.split("suggest the top ")[1].split()[0])
+    listed = ["AAPL", "MSFT", "NVDA", "GOOGL", "AMZN", "META", "TSLA", "AVGO", "ORCL", "CRM", "ADBE", "AMD", "INTC",
+              "QCOM", "TXN", "IBM"]
+    return {"stock_tickers": listed[:count]}
+
+
+def run_map_reduce(run: Run):
+    # one flat and one tree reduce, twelve companies each
+    map_reduce.llm = run.model(response_words=80, tool_args=stock_picks)
+    graph = map_reduce.builder.compile(checkpointer=MemorySaver())
+    for reduce_mode in ("flat", "tree"):
+        config = run.config(f"map-reduce-{reduce_mode}", reduce_mode=reduce_mode)
+        asyncio.run(graph.ainvoke({"financial_area": "semiconductors", "stock_number": 12}, config))
+
+
+# graph id in langgraph.json -> workload
+SCENARIOS: dict[str, Callable[[Run], None]] = {
+    "chatbot": run_chatbot,
+    "financial_advisor": run_financial_advisor,
+    "financial_advisor_breakpoint": run_financial_advisor_breakpoint,
+    "financial_advisor_intent_check": run_financial_advisor_intent_check,
+    "map_reduce": run_map_reduce,
+    "chatbot_long_term_memory": run_chatbot_long_term_memory,
+    "directive_memory_bot": run_directive_memory_bot,
+    "dev_mentor": run_dev_mentor,
+}
+
+
+# Runner
+##################################################################################
+def run_scenario(name: str, repeat: int, llm_latency: float, market_latency: float) -> dict:
+    metrics = NodeMetrics()
+    walls, calls, input_tokens, output_tokens, requests = [], [], [], [], []
+    for _ in range(repeat):
+        reset_shared_state()
+        run = Run(llm_latency, [metrics])
+        # some nodes print their prompts
+        with FakeMarketData(latency=market_latency) as market, contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            SCENARIOS[name](run)
+            walls.append(time.perf_counter() - started)
+        calls.append(sum(m.calls for m in run.models))
+        input_tokens.append(sum(m.input_tokens for m in run.models))
+        output_tokens.append(sum(m.output_tokens for m in run.models))
+        requests.append(sum(market.requests.values()))
+
+    # allocations of one more run, without latencies (tracemalloc slows everything down)
+    reset_shared_state()
+    with FakeMarketData() as market, contextlib.redirect_stdout(io.StringIO()):
+        tracemalloc.start()
+        SCENARIOS[name](Run(0.0, []))
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        "wall_s": statistics.median(walls),
+        "llm_calls": statistics.median(calls),
+        "input_tokens": statistics.median(input_tokens),
+        "output_tokens": statistics.median(output_tokens),
+        "market_requests": statistics.median(requests),
+        "peak_kb": peak / 1024,
+        "retained_kb": retained / 1024,
+        "nodes": {
+            node: {
+                "runs": len(metrics.latencies[node]) / repeat,
+                "mean_ms": statistics.mean(metrics.latencies[node]) * 1e3 if metrics.latencies[node] else 0.0,
+                "max_ms": max(metrics.latencies[node], default=0.0) * 1e3,
+                "llm_calls": metrics.llm_calls[node] / repeat,
+                "input_tokens": metrics.input_tokens[node] / repeat,
+                "output_tokens": metrics.output_tokens[node] / repeat,
+            }
+            for node in metrics.nodes()
+        },
+    }
+
+
+def print_report(name: str, result: dict):
+    print(f"\n{name}: {result['wall_s']:.2f}s, {result['llm_calls']:.0f} LLM calls, "
+          f"{result['input_tokens']:,.0f} in / {result['output_tokens']:,.0f} out tokens, "
+          f"{result['market_requests']:.0f} market requests, peak {result['peak_kb']:,.0f} KB, "
+          f"retained {result['retained_kb']:,.0f} KB")
+    print(f"  {'node':<32} {'runs':>6} {'mean_ms':>9} {'max_ms':>9} {'llm_calls':>10} {'in_tok':>9} {'out_tok':>8}")
+    for node, n in result["nodes"].items():
+        print(f"  {node:<32} {n['runs']:>6.1f} {n['mean_ms']:>9.1f} {n['max_ms']:>9.1f} {n['llm_calls']:>10.1f} "
+              f"{n['input_tokens']:>9,.0f} {n['output_tokens']:>8,.0f}")
+
+
+def regressions(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    found = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if result["llm_calls"] > before["llm_calls"]:
+            found.append(f"{name}: llm_calls {before['llm_calls']:.0f} -> {result['llm_calls']:.0f}")
+        for metric in ("input_tokens", "output_tokens", "wall_s", "peak_kb"):
+            if result[metric] > before[metric] * (1 + tolerance):
+                found.append(f"{name}: {metric} {before[metric]:,.2f} -> {result[metric]:,.2f}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--only", help="comma separated graph ids (default: all)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per model call")
+    parser.add_argument("--market-latency", type=float, default=0.02, help="seconds per market data request")
+    parser.add_argument("--save", help="write the results as JSON")
+    parser.add_argument("--check", help="compare with results saved earlier")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(SCENARIOS)
+    print(f"{args.repeat} runs per graph, {args.llm_latency * 1e3:.0f} ms per LLM call, "
+          f"{args.market_latency * 1e3:.0f} ms per market data request; medians, node figures per run")
+    results = {}
+    for name in names:
+        results[name] = run_scenario(name, args.repeat, args.llm_latency, args.market_latency)
+        print_report(name, results[name])
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.check:
+        with open(args.check) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        print("\nregressions:" if found else "\nno regressions")
+        for line in found:
+            print(f"  {line}")
+        sys.exit(1 if found else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Picking a checkpoint for replay/fork: full history scan vs the history index.
+
+Notebook 12 picks the checkpoint with list(graph.get_state_history(thread))[-k],
+which deserializes every checkpoint of the thread. state_history.state_at finds
+it in the index (metadata and pending-write rows only) and loads just that one.
+Reports the latency of both, by step, by node and by message id, as the chatbot
+thread grows (summarization off), on the in-memory, SQLite and Mongo savers.
+
+    python benchmarks/history_lookup.py
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "studio"))
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.mongodb import MongoDBSaver
+
+import chatbot
+import sqlite_persistence
+from fake_llm import ScriptedChatModel, scripted_questions
+from fake_mongo import mongo_client, mongomock_compat
+from state_history import state_at, thread_history
+
+
+def timed(fn, repeat: int = 5) -> tuple[float, object]:
+    timings, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), result
+
+
+def savers(directory: str):
+    yield "memory", MemorySaver()
+    yield "sqlite", sqlite_persistence.sqlite_saver(os.path.join(directory, "history.sqlite"))
+    yield "mongo", MongoDBSaver(mongo_client())
+
+
+def main():
+    probes = [25, 100, 250]
+    print("ms per lookup: scan = list(get_state_history)[i] then values, index = state_at (warm index)")
+    print(f"{'saver':>6} {'turns':>6} {'ckpts':>6} {'scan':>8} {'by_step':>8} {'by_node':>8} {'by_msg':>8} {'index_build':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name, saver in savers(directory):
+            chatbot.llm = ScriptedChatModel(response_words=120)
+            graph = chatbot.workflow.compile(checkpointer=saver)
+            config = {"configurable": {"thread_id": name, "summarize_high_water": 10**9}}
+            questions = iter(scripted_questions(max(probes)))
+            turns = 0
+            for probe in probes:
+                while turns < probe:
+                    graph.invoke({"question": next(questions)}, config)
+                    turns += 1
+
+                # the state after the 10th answer, three ways
+                target_step = 3 * 10 - 2
+                scan, expected = timed(lambda: next(
+                    s for s in list(graph.get_state_history(config)) if s.metadata["step"] == target_step
+                ).values)
+                build, history = timed(lambda: thread_history(saver, config), repeat=1)
+                message_id = history.at_step(target_step).message_ids[-1]
+                by_step, state = timed(lambda: state_at(graph, config, step=target_step).values)
+                by_node, _ = timed(lambda: state_at(graph, config, node="chatbot", occurrence=9).values)
+                by_message, found = timed(lambda: state_at(graph, config, message_id=message_id).values)
+                assert state == expected == found
+                checkpoints = len(history.descriptors)
+                print(f"{name:>6} {turns:>6} {checkpoints:>6} {scan * 1e3:>8.1f} {by_step * 1e3:>8.2f} "
+                      f"{by_node * 1e3:>8.2f} {by_message * 1e3:>8.2f} {build * 1e3:>12.1f}")
+
+
+if __name__ == "__main__":
+    with mongomock_compat():
+        main()
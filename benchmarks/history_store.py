@@ -0,0 +1,66 @@
+"""
+Repeated history lookups through the local price store vs the provider.
+
+The provider is a fake ticker that answers like stock.history() after a fixed
+latency. The first store lookup downloads the period, later ones only refresh
+the latest bar (refresh_interval=0 here, the worst case) or read from disk.
+
+    python benchmarks/history_store.py
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "studio"))
+
+import price_store
+from fake_market_data import fake_history
+
+
+class FakeTicker:
+    def __init__(self, symbol: str, latency: float):
+        self.symbol = symbol
+        self.latency = latency
+        frame = pd.DataFrame(fake_history(symbol, "5y"))
+        frame.index = pd.to_datetime(frame.index).tz_localize("America/New_York")
+        self.frame = frame
+
+    def history(self, period=None, start=None, end=None, interval="1d"):
+        time.sleep(self.latency)
+        if period is not None:
+            start = price_store.period_start(period)
+        days = self.frame.index.tz_localize(None)
+        mask = (days >= start) & ((days < end) if end is not None else True)
+        return self.frame[mask]
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main():
+    latency, repeat = 0.2, 10
+    ticker = FakeTicker("AAA", latency)
+
+    print(f"provider latency={latency}s, {repeat} lookups per row, ms per lookup")
+    print(f"{'period':>7} {'provider':>9} {'store_refresh':>14} {'store_cached':>13}")
+    for period in ("1mo", "1y", "5y"):
+        with tempfile.TemporaryDirectory() as root:
+            refreshing = price_store.PriceStore(root, refresh_interval=0)
+            refreshing.history("AAA", period, ticker)  # initial download
+            cached = price_store.PriceStore(root, refresh_interval=3600)
+
+            provider_ms = timed(lambda: ticker.history(period=period), repeat)
+            refresh_ms = timed(lambda: refreshing.history("AAA", period, ticker), repeat)
+            cached_ms = timed(lambda: cached.history("AAA", period, ticker), repeat)
+            print(f"{period:>7} {provider_ms:>9.1f} {refresh_ms:>14.1f} {cached_ms:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Escalation rate, accuracy and latency of the tiered intent gate.
+
+Classifies held-out messages (not in studio/data/intent_examples.csv). The
+LLM tier is simulated by an oracle that returns the true label after a fixed
+latency, so accuracy measures the local classifier's confident decisions.
+
+    python benchmarks/intent_gate.py
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "studio"))
+
+import intent_classifier
+
+HELD_OUT = [
+    ("Is Salesforce stock overvalued?", True),
+    ("What's the forecast for oil prices and energy stocks?", True),
+    ("Should I buy Microsoft before earnings?", True),
+    ("How much cash should I keep in my emergency fund?", True),
+    ("What is a good price to buy Uber shares?", True),
+    ("Is Netflix a buy or a sell?", True),
+    ("What's the ticker symbol for Nvidia?", True),
+    ("Should I invest in green energy ETFs?", True),
+    ("How are my tech stocks likely to do next quarter?", True),
+    ("Explain what a stock split means for shareholders", True),
+    ("What's the yield on 10 year treasuries?", True),
+    ("Can you recommend some growth stocks?", True),
+    ("How do I make a paper airplane?", False),
+    ("What's the best hiking trail near Denver?", False),
+    ("Tell me a fun fact about octopuses", False),
+    ("How do I install Node.js on Ubuntu?", False),
+    ("What should I cook for dinner tonight?", False),
+    ("Who is the president of France?", False),
+    ("How do I write a haiku?", False),
+    ("What is the distance to the moon?", False),
+    ("How do I fix a leaking faucet?", False),
+    ("Recommend a fantasy book series", False),
+    ("What's the weather going to be like tomorrow?", False),
+    ("How do I improve my chess openings?", False),
+]
+
+
+def main():
+    llm_latency = 0.5
+    start = time.perf_counter()
+    gate = intent_classifier.IntentGate(intent_classifier.train_default_classifier())
+    train_ms = (time.perf_counter() - start) * 1000
+
+    labels = dict(HELD_OUT)
+    def oracle(text: str) -> bool:
+        time.sleep(llm_latency)
+        return labels[text]
+
+    local_errors = 0
+    start = time.perf_counter()
+    for text, expected in HELD_OUT:
+        escalations = gate.escalations
+        verdict = gate.is_financial(text, escalate=oracle)
+        if gate.escalations == escalations and verdict != expected:
+            local_errors += 1
+    first_pass_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for text, _ in HELD_OUT:
+        gate.is_financial(text.upper() + "  ", escalate=oracle)  # normalized repeats hit the cache
+    second_pass_ms = (time.perf_counter() - start) * 1000
+
+    scoring_us = min(
+        _timed(lambda: gate.classifier.predict_proba(text)) for text, _ in HELD_OUT
+    )
+
+    stats = gate.stats()
+    local = stats["local_decisions"]
+    print(f"training: {train_ms:.1f} ms, local scoring: {scoring_us:.1f} us per message")
+    print(f"messages={len(HELD_OUT)} local={local} escalated={stats['escalations']} "
+          f"local_accuracy={(local - local_errors) / local if local else 0:.2f}")
+    print(f"first pass: {first_pass_s:.2f}s (vs {len(HELD_OUT) * llm_latency:.1f}s with every message on the LLM)")
+    print(f"repeat pass: {second_pass_ms:.2f} ms, {stats['cache_hits']} cache hits")
+    print(f"escalation_rate={stats['escalation_rate']:.2f} over {stats['requests']} requests")
+
+
+def _timed(fn, repeat: int = 1000) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) * 1e6 / repeat
+
+
+if __name__ == "__main__":
+    main()
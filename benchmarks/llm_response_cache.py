@@ -0,0 +1,109 @@
+"""
+LLM calls and latency of financial_advisor_breakpoint with the response cache.
+
+Users on separate threads ask questions drawn from a small pool, as a studio
+deployment sees them (a few questions are asked over and over). Each answer
+takes two model calls around one tool call. Runs without the cache, with it,
+and with it but without prompt normalization (tool call ids are random, so the
+second call of a turn only matches when the first was a hit). Then records a
+run to a SQLite file and replays it with a model that must not be called, the
+way an offline test would.
+
+    python benchmarks/llm_response_cache.py
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "studio"))
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.tools import StructuredTool
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.prebuilt import ToolNode
+
+import financial_advisor_breakpoint
+import llm_cache
+from fake_llm import ScriptedChatModel
+
+LLM_LATENCY = 0.05
+QUESTIONS = [
+    "Should I buy Tesla?", "Is Apple a good long term investment?", "What do you think of Nvidia?",
+    "Should I sell my Amazon shares?", "Is Microsoft overvalued?", "Is Netflix a buy?",
+    "Should I buy Intel at this price?", "What about Ford for dividends?",
+]
+
+
+def respond(messages) -> AIMessage:
+    if isinstance(messages[-1], ToolMessage):
+        return AIMessage(content=f"Based on {messages[-1].content}: hold.")
+    company = messages[-1].content.split()[-1].strip("?")
+    return AIMessage(content="", tool_calls=[
+        {"name": "fetch_stock_data_raw", "args": {"arg": company}, "id": f"call_{uuid.uuid4().hex[:12]}"}
+    ])
+
+
+def offline(messages) -> AIMessage:
+    raise AssertionError("the model was called during a replay")
+
+
+def run(model: ScriptedChatModel, turns: int, seed: int = 7) -> dict:
+    financial_advisor_breakpoint.llm_with_tools = model
+    financial_advisor_breakpoint.tool_node = ToolNode([StructuredTool.from_function(
+        func=lambda arg: f"{{'stock': '{arg}', 'last_close': {len(arg) * 11.5}}}", name="fetch_stock_data_raw",
+        description="Fake market data", args_schema={"type": "object", "properties": {"arg": {"type": "string"}}},
+    )])
+    graph = financial_advisor_breakpoint.builder.compile(checkpointer=MemorySaver())
+    questions = random.Random(seed)
+
+    answers, started = [], time.perf_counter()
+    for turn in range(turns):
+        # skewed towards the first questions of the pool
+        question = QUESTIONS[min(int(questions.expovariate(0.5)), len(QUESTIONS) - 1)]
+        config = {"configurable": {"thread_id": f"user-{turn}"}}
+        result = graph.invoke({"messages": [HumanMessage(content=question)]}, config)
+        answers.append(result["messages"][-1].content)
+    return {"turn_ms": (time.perf_counter() - started) / turns * 1e3, "calls": model.calls, "answers": answers}
+
+
+def main():
+    turns = 60
+    store = llm_cache.ResponseStore()
+    print(f"{turns} turns over {len(QUESTIONS)} questions, {LLM_LATENCY * 1e3:.0f} ms per model call")
+    print(f"{'cache':>14} {'turn_ms':>8} {'llm_calls':>10} {'hit_rate':>9}")
+
+    baseline = run(ScriptedChatModel(respond=respond, latency=LLM_LATENCY), turns)
+    print(f"{'off':>14} {baseline['turn_ms']:>8.1f} {baseline['calls']:>10} {'-':>9}")
+
+    normalize_prompt = llm_cache.normalize_prompt
+    for name in ("unnormalized", "on"):
+        store.clear()
+        if name == "unnormalized":
+            llm_cache.normalize_prompt = lambda prompt: prompt
+        cache = llm_cache.GraphCache("financial_advisor_breakpoint", store)
+        r = run(ScriptedChatModel(respond=respond, latency=LLM_LATENCY, cache=cache), turns)
+        llm_cache.normalize_prompt = normalize_prompt
+        assert r["answers"] == baseline["answers"]
+        print(f"{name:>14} {r['turn_ms']:>8.1f} {r['calls']:>10} {cache.stats()['hit_rate']:>9.2f}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "fixture.sqlite")
+        recorder = llm_cache.GraphCache("financial_advisor_breakpoint", llm_cache.ResponseStore(path), mode="record")
+        recorded = run(ScriptedChatModel(respond=respond, latency=LLM_LATENCY, cache=recorder), turns)
+        # a fresh store, as in another process, with entries long past their ttl
+        fixture = llm_cache.ResponseStore(path)
+        fixture._db.execute("UPDATE llm_cache SET expires_at = 0")
+        player = llm_cache.GraphCache("financial_advisor_breakpoint", fixture, mode="replay")
+        replayed = run(ScriptedChatModel(respond=offline, cache=player), turns)
+        assert replayed["answers"] == recorded["answers"] and replayed["calls"] == 0
+        print(f"\nrecord: {recorded['calls']} calls, {len(fixture)} entries, {recorded['turn_ms']:.1f} ms/turn")
+        print(f"replay: {replayed['calls']} calls, {player.stats()['hits']} hits, {replayed['turn_ms']:.1f} ms/turn")
+
+
+if __name__ == "__main__":
+    main()
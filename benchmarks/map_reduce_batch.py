@@ -0,0 +1,67 @@
+"""
+Per-ticker fan-out vs the batched fetch mode of the map_reduce graph.
+
+Runs the real map step (continue_to_details routing plus the fetch nodes)
+against a rate-limited local fake market-data server and reports wall-clock
+time, requests sent and requests rejected with 429.
+
+    python benchmarks/map_reduce_batch.py
+"""
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "studio"))
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+from langgraph.graph import END, START, StateGraph
+
+import map_reduce
+from fake_market_data import FakeMarketDataServer
+
+
+def build_map_step():
+    builder = StateGraph(map_reduce.InvestmentAdvisorState)
+    # stands in for the LLM that picks the tickers
+    builder.add_node("generate_list_of_stocks", lambda state: {"stock_tickers": state["stock_tickers"]})
+    builder.add_node("fetch_stock_details", map_reduce.afetch_stock_details)
+    builder.add_node("fetch_stock_details_batch", map_reduce.afetch_stock_details_batch)
+    builder.add_edge(START, "generate_list_of_stocks")
+    builder.add_conditional_edges(
+        "generate_list_of_stocks", map_reduce.continue_to_details, ["fetch_stock_details", "fetch_stock_details_batch"]
+    )
+    builder.add_edge("fetch_stock_details", END)
+    builder.add_edge("fetch_stock_details_batch", END)
+    return builder.compile()
+
+
+async def timed(coro):
+    start = time.perf_counter()
+    result = await coro
+    return time.perf_counter() - start, result
+
+
+def main():
+    latency, rate_limit = 0.2, 20
+    tickers = [f"T{i:03d}" for i in range(64)]
+    graph = build_map_step()
+
+    with FakeMarketDataServer(latency=latency, rate_limit=rate_limit) as server:
+        map_reduce.load_stock_data = server.load_stock_data
+        map_reduce.load_stocks_data = server.load_stocks_data
+
+        print(f"latency={latency}s rate_limit={rate_limit} req/s")
+        print(f"{'tickers':>8} {'mode':>11} {'wall_s':>7} {'requests':>9} {'429s':>5} {'fetched':>8}")
+        for count in (4, 16, 32, 64):
+            for mode in ("per_ticker", "batch"):
+                config = {"configurable": {"fetch_mode": mode, "fetch_concurrency": 16, "fetch_timeout": 60}}
+                server.reset_counters()
+                elapsed, result = asyncio.run(timed(graph.ainvoke({"stock_tickers": tickers[:count]}, config)))
+                print(f"{count:>8} {mode:>11} {elapsed:>7.2f} {server.requests:>9} {server.rejected:>5} "
+                      f"{len(result['stock_details']):>8}")
+
+
+if __name__ == "__main__":
+    main()
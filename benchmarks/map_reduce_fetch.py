@@ -0,0 +1,86 @@
+"""
+Wall-clock time of the map_reduce fan-out as the number of tickers grows.
+
+Compares the original blocking map step with the async one against a local
+fake market-data server. One ticker in ten is slow and exceeds the deadline.
+
+    python benchmarks/map_reduce_fetch.py
+"""
+import asyncio
+import operator
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Annotated
+
+from typing_extensions import TypedDict
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "studio"))
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+from langgraph.graph import END, START, StateGraph
+from langgraph.types import Send
+
+import map_reduce
+from fake_market_data import FakeMarketDataServer
+
+
+class FanOutState(TypedDict):
+    stock_tickers: list[str]
+    stock_details: Annotated[list, operator.add]
+    failed_tickers: Annotated[list, operator.add]
+
+
+def blocking_fetch_stock_details(state: map_reduce.StockState) -> dict:
+    # the map step as it was before the async version
+    return {"stock_details": [str(map_reduce.load_stock_data(state["ticker"]))]}
+
+
+def build_fan_out(fetch_node):
+    builder = StateGraph(FanOutState)
+    builder.add_node("fetch_stock_details", fetch_node)
+    builder.add_conditional_edges(
+        START,
+        lambda state: [Send("fetch_stock_details", {"ticker": t}) for t in state["stock_tickers"]],
+        ["fetch_stock_details"]
+    )
+    builder.add_edge("fetch_stock_details", END)
+    return builder.compile()
+
+
+async def timed(coro):
+    start = time.perf_counter()
+    result = await coro
+    return time.perf_counter() - start, result
+
+
+def main():
+    latency, slow_latency, timeout, concurrency = 0.2, 3.0, 1.0, 8
+    tickers = [f"T{i:03d}" for i in range(64)]
+    slow = set(tickers[9::10])
+
+    blocking_graph = build_fan_out(blocking_fetch_stock_details)
+    async_graph = build_fan_out(map_reduce.afetch_stock_details)
+    config = {"configurable": {"fetch_concurrency": concurrency, "fetch_timeout": timeout}}
+
+    with FakeMarketDataServer(latency=latency, slow_symbols=slow, slow_latency=slow_latency) as server:
+        map_reduce.load_stock_data = server.load_stock_data
+
+        print(f"latency={latency}s slow_latency={slow_latency}s deadline={timeout}s concurrency={concurrency}")
+        print(f"{'tickers':>8} {'blocking_s':>11} {'async_s':>8} {'fetched':>8} {'timed_out':>10}")
+        for count in (1, 4, 8, 16, 32, 64):
+            state = {"stock_tickers": tickers[:count]}
+
+            start = time.perf_counter()
+            blocking_graph.invoke(state)
+            blocking_elapsed = time.perf_counter() - start
+
+            async_elapsed, result = asyncio.run(timed(async_graph.ainvoke(state, config)))
+
+            print(f"{count:>8} {blocking_elapsed:>11.2f} {async_elapsed:>8.2f} "
+                  f"{len(result['stock_details']):>8} {len(result['failed_tickers']):>10}")
+
+
+if __name__ == "__main__":
+    main()
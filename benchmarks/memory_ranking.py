@@ -0,0 +1,94 @@
+"""
+Directive/ADR retrieval as a user's memories grow to 10k.
+
+For each size, one directive and one active ADR match the question. Compares:
+  default  - store.search(namespace), the store's first page (the old behaviour)
+  all      - every item dumped into the prompt
+  ranked   - memory_retrieval.retrieve, top-k within the token budget
+reporting prompt tokens, whether the matching memory made it into the prompt and
+the retrieval time on the first (index build) and following turns.
+
+    python benchmarks/memory_ranking.py
+"""
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "studio"))
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+from langgraph.store.memory import InMemoryStore
+
+import memory_access
+import memory_retrieval
+
+TOPICS = ["logging", "testing", "docker", "caching", "typing", "css", "sql", "auth", "queues", "metrics",
+          "graphql", "kafka", "terraform", "react", "pandas", "regex", "celery", "nginx", "oauth", "grpc"]
+STYLES = ["Use short examples", "Explain step by step", "Prefer standard library tools", "Add inline comments",
+          "Mention trade-offs", "Avoid long explanations", "Show tests first", "Link the docs"]
+QUESTION = "How should I handle retries when the payments webhook times out?"
+
+
+def fill(store: InMemoryStore, user_id: str, size: int):
+    rng = random.Random(size)
+    start = datetime(2024, 1, 1)
+    for i in range(size):
+        if i == size // 2:
+            add_targets(store, user_id, start)
+        topic = rng.choice(TOPICS)
+        store.put((user_id, "directives"), f"d{i}", {"directive": f"{rng.choice(STYLES)} when discussing {topic} {i}."})
+        store.put(("adrs", user_id), f"a{i}", {
+            "decision": f"Use {topic} library number {i} for {rng.choice(TOPICS)}",
+            "date": (start + timedelta(hours=i)).isoformat(),
+            "rationale": f"Team familiarity with {topic}",
+            "consequences": f"Do not introduce another {topic} tool",
+            "status": rng.choice(["active", "obsolete", "rejected", "archived"]),
+        })
+
+
+def add_targets(store: InMemoryStore, user_id: str, start: datetime):
+    # the memories that matter for QUESTION, neither the oldest nor the newest
+    store.put((user_id, "directives"), "target", {"directive": "Always show retries with exponential backoff for webhook handlers."})
+    store.put(("adrs", user_id), "target", {
+        "decision": "Payments webhook retries go through the outbox queue",
+        "date": start.isoformat(), "rationale": "Webhook timeouts must not lose payments",
+        "consequences": "Never retry the payments webhook inline", "status": "active",
+    })
+
+
+def tokens(texts) -> int:
+    return sum(memory_retrieval.approximate_tokens(t) for t in texts)
+
+
+def main():
+    print(f"{'items':>6} {'memory':>10} {'mode':>8} {'prompt_tok':>11} {'found':>6} {'first_ms':>9} {'next_ms':>8}")
+    for size in (100, 1_000, 10_000):
+        store = InMemoryStore()
+        fill(store, "u", size)
+        for name, namespace, text_of, key, where in (
+            ("directives", ("u", "directives"), lambda v: v["directive"], "target", None),
+            ("adrs", ("adrs", "u"), str, "target", lambda v: v.get("status", "active") == "active"),
+        ):
+            default = store.search(namespace)
+            print(f"{size:>6} {name:>10} {'default':>8} {tokens(text_of(i.value) for i in default):>11} "
+                  f"{str(any(i.key == key for i in default)):>6} {'':>9} {'':>8}")
+            everything = store.search(namespace, limit=size + 1)
+            print(f"{size:>6} {name:>10} {'all':>8} {tokens(text_of(i.value) for i in everything):>11} "
+                  f"{str(True):>6} {'':>9} {'':>8}")
+
+            timings = []
+            for _ in range(3):
+                # a fresh run each turn, only the first one reads the namespace (the index stays current)
+                memory = memory_access.RunMemory(store)
+                started = time.perf_counter()
+                found = memory_retrieval.retrieve(memory, namespace, QUESTION, text_of, k=8, token_budget=800, where=where)
+                timings.append((time.perf_counter() - started) * 1000)
+            print(f"{size:>6} {name:>10} {'ranked':>8} {tokens(text_of(i.value) for i in found):>11} "
+                  f"{str(any(i.key == key for i in found)):>6} {timings[0]:>9.1f} {min(timings[1:]):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Cost of update_memory in chatbot_long_term_memory over a long scripted thread.
+
+Reports the tokens sent to the memory LLM per turn as the thread grows, next to
+what sending the whole history (the previous behaviour) would have cost, and
+how many updates the local self-disclosure gate skipped.
+
+    python benchmarks/memory_updates.py
+"""
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "studio"))
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+from langchain_core.messages import HumanMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.store.memory import InMemoryStore
+
+import chatbot_long_term_memory as ltm
+from fake_llm import ScriptedChatModel
+
+QUESTIONS = [
+    "Hi, my name is Bob and I live in Berlin.",
+    "How do I parse JSON in Python?",
+    "What is the difference between a list and a tuple?",
+    "I mostly work on a TypeScript MCP server.",
+    "How do async generators work?",
+    "Can you explain dependency injection?",
+    "What does the GIL do?",
+    "I prefer short answers with code examples.",
+    "How are Python dicts ordered?",
+    "What is a context manager?",
+]
+
+
+memory_calls = []
+
+
+def reply(messages) -> str:
+    if "updating and maintaining accurate user memory" in str(messages[0].content):
+        memory_calls.append(count_tokens_approximately(messages))
+        return "- Name: Bob\n- Lives in Berlin\n- Works on a TypeScript MCP server\n- Prefers short answers"
+    return " ".join(f"word{i}" for i in range(120))
+
+
+def main():
+    turns, window = 40, 10
+    model = ScriptedChatModel(respond=reply)
+    ltm.model = model
+    graph = ltm.builder.compile(checkpointer=MemorySaver(), store=InMemoryStore())
+    config = {"configurable": {"thread_id": "benchmark", "user_id": "bob"}}
+
+    print(f"{'turns':>7} {'memory_calls':>13} {'tok/call':>9} {'full_history_tok':>17}")
+    seen = 0
+    for turn in range(turns):
+        graph.invoke({"messages": [HumanMessage(QUESTIONS[turn % len(QUESTIONS)])]}, config)
+        if turn % window == window - 1:
+            calls, seen = memory_calls[seen:], len(memory_calls)
+            tokens = sum(calls) / len(calls) if calls else 0
+            # what a single update sending the whole thread would have cost at this point
+            full = count_tokens_approximately(graph.get_state(config).values["messages"])
+            print(f"{turn - window + 2:>3}-{turn + 1:<3} {len(calls):>13} {tokens:>9.0f} {full:>17}")
+
+    print(f"\n{turns} turns, updates {ltm.memory_update_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Forks and replays of financial_advisor_breakpoint with and without node_cache.
+
+A question is answered with two tool rounds (symbol lookup, then market data),
+each tool call taking TOOL_LATENCY. The thread is then forked the way notebook
+12 does (update_state on the human message, rephrased) and replayed from the
+checkpoint before the first tools step. The fake model asks for the same tools
+with new call ids, like a real one; with node_cache on, the tools node reuses
+its earlier output.
+
+    python benchmarks/node_memoization.py
+"""
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "studio"))
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+os.environ.setdefault("NODE_CACHE_PATH", "")
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.tools import StructuredTool
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.prebuilt import ToolNode
+
+import financial_advisor_breakpoint
+import node_cache
+from fake_llm import ScriptedChatModel
+
+TOOL_LATENCY = 0.3
+tool_runs = 0
+
+
+def fake_tool(name: str, result):
+    def run(**kwargs):
+        global tool_runs
+        tool_runs += 1
+        time.sleep(TOOL_LATENCY)
+        return result(**kwargs)
+    return StructuredTool.from_function(func=run, name=name, description=name,
+                                        args_schema={"type": "object", "properties": {"arg": {"type": "string"}}})
+
+
+def respond(messages) -> AIMessage:
+    tool_results = [m for m in messages if isinstance(m, ToolMessage)]
+    if len(tool_results) == 0:
+        call = {"name": "lookup_stock_symbol", "args": {"arg": "Tesla"}}
+    elif len(tool_results) == 1:
+        call = {"name": "fetch_stock_data_raw", "args": {"arg": "TSLA"}}
+    else:
+        return AIMessage(content="Hold: " + " | ".join(m.content[:20] for m in tool_results))
+    return AIMessage(content="", tool_calls=[{**call, "id": f"call_{uuid.uuid4().hex[:12]}"}])
+
+
+def run(cached: bool, forks: int) -> dict:
+    global tool_runs
+    tool_runs = 0
+    financial_advisor_breakpoint.llm_with_tools = ScriptedChatModel(respond=respond)
+    financial_advisor_breakpoint.tool_node = ToolNode([
+        fake_tool("lookup_stock_symbol", lambda arg: "TSLA"),
+        fake_tool("fetch_stock_data_raw", lambda arg: f"{{'stock_symbol': '{arg}', 'last_close': 251.3}}"),
+    ])
+    node_cache.default_cache = node_cache.InMemoryCache()
+    graph = financial_advisor_breakpoint.builder.compile(checkpointer=MemorySaver())
+    config = {"configurable": {"thread_id": f"cached-{cached}", "node_cache": cached}}
+
+    graph.invoke({"messages": [HumanMessage(content="Should I buy Tesla?", id="question")]}, config)
+    history = list(graph.get_state_history(config))
+    question = next(s for s in history if s.next == ("assistant",) and len(s.values["messages"]) == 1)
+    before_tools = next(s for s in history if s.next == ("tools",) and len(s.values["messages"]) == 2)
+
+    timings = {"fork": [], "replay": []}
+    for i in range(forks):
+        started = time.perf_counter()
+        fork = graph.update_state(question.config, {"messages": [HumanMessage(content=f"Is Tesla a buy? ({i})", id="question")]})
+        graph.invoke(None, {"configurable": {**config["configurable"], **fork["configurable"]}})
+        timings["fork"].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        graph.invoke(None, {"configurable": {**config["configurable"], **before_tools.config["configurable"]}})
+        timings["replay"].append(time.perf_counter() - started)
+
+    answer = graph.get_state(config).values["messages"][-1].content
+    return {"fork": sum(timings["fork"]) / forks, "replay": sum(timings["replay"]) / forks, "tool_runs": tool_runs,
+            "answer": answer}
+
+
+def main():
+    forks = 5
+    print(f"1 run + {forks} forks + {forks} replays, {TOOL_LATENCY}s per tool call")
+    print(f"{'node_cache':>10} {'fork_s':>7} {'replay_s':>9} {'tool_runs':>10}")
+    answers = set()
+    for cached in (False, True):
+        r = run(cached, forks)
+        answers.add(r["answer"])
+        print(f"{str(cached):>10} {r['fork']:>7.3f} {r['replay']:>9.3f} {r['tool_runs']:>10}")
+    assert len(answers) == 1, answers
+    print(f"\ncache stats: {node_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
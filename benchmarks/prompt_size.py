@@ -0,0 +1,49 @@
+"""
+Prompt size of the raw info/OHLCV dump vs the stock_features summary.
+
+Estimates tokens (~4 characters each, so the benchmark needs no tokenizer
+download) of the reduce prompt input as the number of tickers grows, plus the
+time spent summarizing.
+
+    python benchmarks/prompt_size.py
+"""
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "studio"))
+
+import stock_features
+from fake_market_data import fake_history, fake_info
+
+
+def main():
+    tickers = [f"T{i:03d}" for i in range(50)]
+    stocks = {
+        t: {"stock_symbol": t, "info": fake_info(t), "history": pd.DataFrame(fake_history(t, "1mo"))}
+        for t in tickers
+    }
+    for stock in stocks.values():
+        stock["history"].index = pd.to_datetime(stock["history"].index)
+
+    start = time.perf_counter()
+    summaries = {t: str(stock_features.summarize_stock(**stock)) for t, stock in stocks.items()}
+    summarize_ms = (time.perf_counter() - start) * 1000 / len(stocks)
+
+    raw = {
+        t: str({"stock_symbol": t, "info": s["info"], "history": s["history"].to_dict()})
+        for t, s in stocks.items()
+    }
+
+    print(f"summarize: {summarize_ms:.3f} ms per ticker")
+    print(f"{'tickers':>8} {'raw_tokens':>11} {'summary_tokens':>15} {'ratio':>6}")
+    for count in (1, 5, 10, 20, 50):
+        raw_tokens = len("\n\n\n".join(raw[t] for t in tickers[:count])) // 4
+        summary_tokens = len("\n\n\n".join(summaries[t] for t in tickers[:count])) // 4
+        print(f"{count:>8} {raw_tokens:>11} {summary_tokens:>15} {raw_tokens / summary_tokens:>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
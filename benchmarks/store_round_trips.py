@@ -0,0 +1,69 @@
+"""
+Store round-trips per turn of the memory-backed graphs.
+
+The store adds a fixed latency to every batch() call (what each get/search/put
+turns into), standing in for a network hop to Mongo or Postgres. Plain invoke,
+no server: nodes of one run share their reads all the same.
+
+    python benchmarks/store_round_trips.py
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "studio"))
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.store.memory import InMemoryStore
+
+import chatbot_long_term_memory
+import devmentor
+import directive_memory_bot
+from fake_llm import ScriptedChatModel
+
+
+class RemoteStore(InMemoryStore):
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+        self.round_trips = 0
+
+    def batch(self, ops):
+        self.round_trips += 1
+        time.sleep(self.latency)
+        return super().batch(ops)
+
+
+def run(module, builder, turns: int, latency: float) -> tuple[float, float]:
+    module.model = ScriptedChatModel(respond=lambda messages: "- Name: Bob")
+    store = RemoteStore(latency)
+    graph = builder.compile(checkpointer=MemorySaver(), store=store)
+    started = time.perf_counter()
+    for turn in range(turns):
+        config = {"configurable": {"thread_id": "t", "user_id": "bob"}}
+        graph.invoke({"messages": [HumanMessage(f"My name is Bob, question {turn}")]}, config)
+    return store.round_trips / turns, (time.perf_counter() - started) / turns
+
+
+def main():
+    turns, latency = 20, 0.005
+    print(f"{latency * 1000:.0f}ms per store round-trip, {turns} turns")
+    print(f"{'graph':>26} {'round_trips/turn':>17} {'ms/turn':>8}")
+    # trustcall extraction needs tool calls, so directive_memory_bot only runs its chat node
+    directive_chat = directive_memory_bot.StateGraph(directive_memory_bot.MessagesState)
+    directive_chat.add_node("chat", directive_memory_bot.chat)
+    directive_chat.add_edge(directive_memory_bot.START, "chat")
+    for name, module, builder in (
+        ("chatbot_long_term_memory", chatbot_long_term_memory, chatbot_long_term_memory.builder),
+        ("dev_mentor (no updates)", devmentor, devmentor.builder),
+        ("directive_memory_bot.chat", directive_memory_bot, directive_chat),
+    ):
+        round_trips, seconds = run(module, builder, turns, latency)
+        print(f"{name:>26} {round_trips:>17.1f} {seconds * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
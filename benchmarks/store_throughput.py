@@ -0,0 +1,81 @@
+"""
+Throughput of SQLiteStore against InMemoryStore at 1k, 100k and 1M items.
+
+Items are spread over the namespace layouts the studio graphs use,
+("adrs", user), (user, "directives") and ("memory", user), 100 items per
+namespace. Measures batched puts (1000 per batch() call), single gets and
+namespace-prefix searches (limit 10) of one user's namespace.
+
+    python benchmarks/store_throughput.py [sizes, default 1000,100000,1000000]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "studio"))
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+from langgraph.store.base import PutOp
+from langgraph.store.memory import InMemoryStore
+
+from sqlite_persistence import SQLiteStore
+
+PER_NAMESPACE = 100
+BATCH = 1000
+
+
+def namespace(i: int) -> tuple:
+    user = f"user{i // (3 * PER_NAMESPACE)}"
+    return (("adrs", user), (user, "directives"), ("memory", user))[(i // PER_NAMESPACE) % 3]
+
+
+def value(i: int) -> dict:
+    return {"decision": f"Decision {i} about service {i % 97}", "status": "active" if i % 4 else "obsolete",
+            "rationale": "Keeps the deployment simple " * 3}
+
+
+def measure(store, size: int, reads: int, searches: int) -> dict:
+    started = time.perf_counter()
+    for start in range(0, size, BATCH):
+        store.batch([PutOp(namespace(i), f"k{i}", value(i)) for i in range(start, min(start + BATCH, size))])
+    put_seconds = time.perf_counter() - started
+
+    rng = random.Random(0)
+    keys = [rng.randrange(size) for _ in range(reads)]
+    started = time.perf_counter()
+    for i in keys:
+        assert store.get(namespace(i), f"k{i}") is not None
+    get_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for i in keys[:searches]:
+        assert store.search(namespace(i), limit=10)
+    search_seconds = time.perf_counter() - started
+
+    return {
+        "puts/s": size / put_seconds,
+        "gets/s": reads / get_seconds,
+        "searches/s": searches / search_seconds,
+    }
+
+
+def main():
+    sizes = [int(s) for s in sys.argv[1].split(",")] if len(sys.argv) > 1 else [1_000, 100_000, 1_000_000]
+    print(f"{'items':>9} {'store':>8} {'puts/s':>10} {'gets/s':>10} {'searches/s':>11}")
+    for size in sizes:
+        searches = 20 if size >= 1_000_000 else 200
+        with tempfile.TemporaryDirectory() as directory:
+            for name, make in (("memory", InMemoryStore), ("sqlite", lambda: SQLiteStore(os.path.join(directory, "store.db")))):
+                store = make()
+                r = measure(store, size, reads=2000, searches=searches)
+                print(f"{size:>9} {name:>8} {r['puts/s']:>10.0f} {r['gets/s']:>10.0f} {r['searches/s']:>11.0f}")
+                if isinstance(store, SQLiteStore):
+                    store.close()
+                del store
+
+
+if __name__ == "__main__":
+    main()
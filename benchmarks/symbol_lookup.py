@@ -0,0 +1,56 @@
+"""
+Latency of the local company name -> symbol index.
+
+Resolves exact, prefix, misspelled and unknown names against the bundled
+listing padded with synthetic companies up to 10k entries. Names close to a
+listed one but of another company (or too vague) must miss, so the remote
+lookup gets them instead of the wrong ticker.
+
+    python benchmarks/symbol_lookup.py
+"""
+import os
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "studio"))
+os.environ.setdefault("SYMBOL_LEARNED", "")
+
+import symbol_index
+
+
+def main():
+    index = symbol_index.SymbolIndex(
+        listing_path=str(Path(symbol_index.__file__).parent / "data" / "listing.csv")
+    )
+    rng = random.Random(0)
+    while len(index) < 10_000:
+        word = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10))).capitalize()
+        symbol = "".join(rng.choices(string.ascii_uppercase, k=4)) + str(len(index))
+        index.add(symbol, f"{word} {rng.choice(['Systems', 'Labs', 'Energy', 'Bio'])} Inc", "NYSE")
+
+    queries = {
+        "exact": ["Tesla", "Apple Inc.", "NVIDIA", "Coca-Cola"],
+        "symbol": ["TSLA", "amd", "JPM"],
+        "prefix": ["JPMorgan", "Berkshire", "Taiwan Semiconductor"],
+        "fuzzy": ["Microsft", "Nvidai", "Palantr Technologies"],
+        "miss": ["Acme Rockets", "Unknown Company", "General Mills", "Coca Cola Europacific", "Bank", "General"],
+    }
+    repeat = 2000
+
+    print(f"index size={len(index)}, {repeat} lookups per query")
+    print(f"{'kind':>7} {'query':>22} {'symbol':>7} {'us':>8}")
+    for kind, names in queries.items():
+        for name in names:
+            start = time.perf_counter()
+            for _ in range(repeat):
+                symbol = index.resolve(name)
+            elapsed_us = (time.perf_counter() - start) * 1e6 / repeat
+            print(f"{kind:>7} {name:>22} {str(symbol):>7} {elapsed_us:>8.1f}")
+            assert kind != "miss" or symbol is None, f"{name!r} resolved to {symbol}"
+
+
+if __name__ == "__main__":
+    main()
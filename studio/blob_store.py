@@ -0,0 +1,115 @@
+import hashlib
+import mmap
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any
+
+from langchain_core.messages import BaseMessage
+
+# What a state field or message holds instead of an offloaded value
+REF_PREFIX = "blob:sha256:"
+REF_PATTERN = re.compile(r"blob:sha256:([0-9a-f]{64})")
+
+
+def is_ref(value: Any) -> bool:
+    return isinstance(value, str) and REF_PATTERN.fullmatch(value) is not None
+
+
+class BlobStore:
+    """
+    Content-addressed files for large state values.
+
+    offload() writes a string above the threshold to <root>/<2 hex>/<sha256> (once:
+    equal payloads share a file) and returns a short reference that is what the
+    state and its checkpoints carry. Nodes call resolve() on the fields they read,
+    which maps the file and keeps recently used values in memory.
+    """
+
+    def __init__(self, root: str, cache_bytes: int = 64 * 1024 * 1024):
+        self.root = root
+        self.cache_bytes = cache_bytes
+        self.offloaded = 0
+        self.resolved = 0
+        self._cache: OrderedDict[str, str] = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, text: str) -> str:
+        data = text.encode()
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # readers never see a partial file
+            with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), delete=False) as f:
+                f.write(data)
+            os.replace(f.name, path)
+        self._remember(digest, text)
+        with self._lock:
+            self.offloaded += 1
+        return REF_PREFIX + digest
+
+    def get(self, ref: str) -> str:
+        digest = ref[len(REF_PREFIX):]
+        with self._lock:
+            text = self._cache.get(digest)
+            if text is not None:
+                self._cache.move_to_end(digest)
+                self.resolved += 1
+                return text
+
+        with open(self._path(digest), "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    text = mapped[:].decode()
+            else:
+                text = ""
+        self._remember(digest, text)
+        with self._lock:
+            self.resolved += 1
+        return text
+
+    def offload(self, value: Any, threshold: int) -> Any:
+        """A reference for strings longer than threshold (0 disables), other values unchanged."""
+        if threshold and isinstance(value, str) and len(value) > threshold and not is_ref(value):
+            return self.put(value)
+        return value
+
+    def resolve(self, value: Any) -> Any:
+        return self.get(value) if is_ref(value) else value
+
+    def offload_messages(self, messages: list[BaseMessage], threshold: int) -> list[BaseMessage]:
+        offloaded = []
+        for message in messages:
+            content = self.offload(message.content, threshold)
+            offloaded.append(message if content is message.content else message.model_copy(update={"content": content}))
+        return offloaded
+
+    def resolve_messages(self, messages: list[BaseMessage]) -> list[BaseMessage]:
+        """Copies of the messages with offloaded contents read back, e.g. to build a prompt."""
+        return [m.model_copy(update={"content": self.get(m.content)}) if is_ref(m.content) else m for m in messages]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"offloaded": self.offloaded, "resolved": self.resolved, "cached_bytes": self._cached_bytes}
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def _remember(self, digest: str, text: str):
+        with self._lock:
+            if digest in self._cache or len(text) > self.cache_bytes:
+                return
+            self._cache[digest] = text
+            self._cached_bytes += len(text)
+            while self._cached_bytes > self.cache_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cached_bytes -= len(evicted)
+
+
+# Shared by every studio graph running in this process
+default_store = BlobStore(os.environ.get("BLOB_STORE", os.path.join(os.path.dirname(__file__), ".cache", "blobs")))
@@ -1,10 +1,29 @@
+import functools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
 from langchain_openai import ChatOpenAI
+from langgraph.config import get_stream_writer
 from langgraph.graph import MessagesState, StateGraph, START, END
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.messages import HumanMessage, SystemMessage, RemoveMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import merge_configs
+import configuration
+import llm_cache
+import sqlite_persistence
+
+logger = logging.getLogger(__name__)
 
 # Define LLM
 # OpenAI API key configured in .env file
-llm = ChatOpenAI(model="gpt-4o-mini")
+llm = ChatOpenAI(model="gpt-4o-mini", cache=llm_cache.for_graph("chatbot"))
 
 # Defining Schema
 ##################################################################################
@@ -14,6 +33,126 @@ class SummaryState(MessagesState):
     summary: str
 
 
+# Summaries computed in the background, written to their thread through the graph's checkpointer
+##################################################################################
+PENDING_TTL = 60 * 60  # seconds a summary waits for its thread's next turn
+MAX_PENDING = 1024
+
+
+@dataclass
+class PendingSummary:
+    base_summary: str  # summary the new one extends
+    summary: str
+    covered_ids: set  # ids of the messages folded into the summary
+    covered: tuple  # (id, content) of those messages, a branch with other content doesn't match
+    created_at: float = field(default_factory=time.monotonic)
+
+    def applies_to(self, summary: str, history: list) -> bool:
+        # the summary moved on meanwhile (e.g. an inline summarize), or the history differs (a fork)
+        return (self.base_summary or "") == (summary or "") and covered_messages(history, self.covered_ids) == self.covered
+
+
+def covered_messages(history: list, ids: set) -> tuple:
+    return tuple((m.id, str(m.content)) for m in history if m.id in ids)
+
+
+_summary_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="summarize")
+# (thread_id, checkpoint_ns) -> summary not known to be in the thread's state yet
+_pending_summaries: OrderedDict[tuple, PendingSummary] = OrderedDict()
+_running_summaries: set = set()
+_pending_lock = threading.Lock()
+
+
+def _remember_pending(key: tuple, pending: PendingSummary):
+    with _pending_lock:
+        _pending_summaries[key] = pending
+        _pending_summaries.move_to_end(key)
+        expired = time.monotonic() - PENDING_TTL
+        while _pending_summaries and (
+            len(_pending_summaries) > MAX_PENDING or next(iter(_pending_summaries.values())).created_at < expired
+        ):
+            _pending_summaries.popitem(last=False)
+
+
+class SummaryWriter:
+    """
+    Writes background summaries to the threads of one compiled chatbot graph
+    (see compile_graph), as the summarize node would have.
+    """
+
+    def __init__(self, stripes: int = 64):
+        self.graph = None
+        # one lock per thread, striped so they don't pile up
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+    def write(self, key: tuple, pending: PendingSummary) -> bool:
+        """
+        Write a finished summary to the thread's latest checkpoint. Skipped while a
+        turn is running on the thread (its next checkpoint would not include it),
+        that turn applies the pending summary.
+        """
+        thread_id, checkpoint_ns = key
+        thread_config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}}
+        with self._locks[hash(key) % len(self._locks)]:
+            state = self.graph.get_state(thread_config)
+            if state.next:
+                return False
+            if not pending.applies_to(state.values.get("summary", ""), state.values.get("messages", [])):
+                logger.info("Discarding background summary for thread %s: the thread moved on", thread_id)
+                _forget_pending(key, pending)
+                return False
+            # a turn that committed since the state was read wins, it applies the pending summary itself
+            head = self.graph.checkpointer.get_tuple(thread_config)
+            if head is None or head.config["configurable"]["checkpoint_id"] != state.config["configurable"]["checkpoint_id"]:
+                return False
+            self.graph.update_state(state.config, {
+                "messages": [RemoveMessage(id=id_) for id_ in pending.covered_ids],
+                "summary": pending.summary,
+            }, as_node="summarize")
+        _forget_pending(key, pending)
+        return True
+
+
+def _forget_pending(key: tuple, pending: PendingSummary):
+    with _pending_lock:
+        if _pending_summaries.get(key) is pending:
+            del _pending_summaries[key]
+
+
+def _summarize_in_background(summary_writer: Optional[SummaryWriter], key: tuple, base_summary: str, messages: list,
+                             covered: tuple):
+    try:
+        response = llm.invoke(messages)
+        pending = PendingSummary(base_summary, response.content, {id_ for id_, _ in covered}, covered)
+        # kept until written, and for a turn that started before the write lands
+        _remember_pending(key, pending)
+        if summary_writer is not None:
+            summary_writer.write(key, pending)
+    except Exception:
+        logger.exception("Background summary for thread %s failed", key[0])
+    finally:
+        with _pending_lock:
+            _running_summaries.discard(key)
+
+
+def take_pending_summary(key: tuple, summary: str, history: list) -> Optional[PendingSummary]:
+    """Finished background summary for the thread, if it still applies to this state."""
+    with _pending_lock:
+        pending = _pending_summaries.get(key)
+        if pending is None or not pending.applies_to(summary, history):
+            return None
+        del _pending_summaries[key]
+    return pending
+
+
+def _thread_key(config: RunnableConfig) -> Optional[tuple]:
+    configurable = config.get("configurable", {})
+    if not configurable.get("thread_id"):
+        return None
+    # a node's checkpoint_ns ends with its own task, the graph's state is one level up
+    return configurable["thread_id"], configurable.get("checkpoint_ns", "").rpartition("|")[0]
+
+
 # System message
 chatbot_system_message = SystemMessage(content=("""
 You are a helpful and knowledgeable chatbot assistant. 
@@ -23,9 +162,34 @@ If you don’t have enough information, ask for clarification.”
 """))
 
 
+class AnswerDeltas(BaseCallbackHandler):
+    """Answer tokens on the custom stream channel, as {"answer_delta": ...}."""
+
+    run_inline = True
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.written = False
+
+    def on_llm_new_token(self, token: str, **kwargs):
+        if token:
+            self.writer({"answer_delta": token})
+            self.written = True
+
+
 # Nodes
-def chatbot(state: SummaryState) -> SummaryState:
+def chatbot(state: SummaryState, config: RunnableConfig) -> SummaryState:
     summary = state.get("summary", "") # getting summary if it exists
+    history = state["messages"]
+
+    # Apply a summary finished in the background since the previous turn
+    delete_messages = []
+    key = _thread_key(config)
+    pending = take_pending_summary(key, summary, history) if key else None
+    if pending:
+        summary = pending.summary
+        delete_messages = [RemoveMessage(id=m.id) for m in history if m.id in pending.covered_ids]
+        history = [m for m in history if m.id not in pending.covered_ids]
 
     # If there is summary, then we add it
     if summary:
@@ -36,25 +200,57 @@ def chatbot(state: SummaryState) -> SummaryState:
         {summary}
         """))
 
-        messages_with_summary = [summary_message] + state["messages"]
+        messages_with_summary = [summary_message] + history
     
     else:
-        messages_with_summary = state["messages"]
+        messages_with_summary = history
 
 
     question = HumanMessage(content=state.get("question", ""))
 
-    response = llm.invoke([chatbot_system_message] + messages_with_summary + [question]);
+    # invoke goes through the response cache; stream=True still streams a miss token by token, to
+    # stream_mode="messages" through the callbacks and to API-only clients on the custom channel
+    writer = get_stream_writer()
+    deltas = AnswerDeltas(writer)
+    response = llm.invoke(
+        [chatbot_system_message] + messages_with_summary + [question],
+        config=merge_configs(config, {"callbacks": [deltas]}), stream=True,
+    )
+    if not deltas.written and response.content:
+        # a cached answer arrives whole
+        writer({"answer_delta": response.content})
 
     return SummaryState(
-        messages = [question, response],
+        messages = delete_messages + [question, response],
         question = state.get("question", None),
         answer = response.content,
-        summary = state.get("summary", None)
+        summary = summary or state.get("summary", None)
     )
 
 
-def summarize(state: SummaryState) -> SummaryState:
+def messages_to_keep(messages: list, configurable: configuration.Configuration) -> list:
+    if configurable.summarize_policy == "messages":
+        return messages[-2:]
+
+    # The last exchange always stays, even over the low-water mark; earlier exchanges
+    # are added back while they fit under it, so what's kept starts on a question
+    humans = [i for i, message in enumerate(messages) if message.type == "human"]
+    if not humans:
+        return messages[-1:]
+    start = humans[-1]
+    kept_tokens = count_tokens_approximately(messages[start:])
+    for i in reversed(humans[:-1]):
+        kept_tokens += count_tokens_approximately(messages[i:start])
+        if kept_tokens > configurable.summarize_low_water:
+            break
+        start = i
+
+    return messages[start:]
+
+
+def summarize(state: SummaryState, config: RunnableConfig,
+              summary_writer: Optional[SummaryWriter] = None) -> SummaryState:
+    configurable = configuration.Configuration.from_runnable_config(config)
     summary = state.get("summary", "")
     # no system message
     # the order of components is important
@@ -83,12 +279,31 @@ def summarize(state: SummaryState) -> SummaryState:
         Only return the summarized content. Do not add explanations, section headers, or extra commentary.
         """)
 
-    # Add prompt to our history
-    messages = state["messages"] + [summary_message]
-    response = llm.invoke(messages)
+    kept_messages = messages_to_keep(state["messages"], configurable)
+    dropped_messages = state["messages"][:len(state["messages"]) - len(kept_messages)]
+
+    # Add prompt to our history, with the token policy only the messages about to be deleted are summarized
+    if configurable.summarize_policy == "messages":
+        messages = state["messages"] + [summary_message]
+    else:
+        messages = dropped_messages + [summary_message]
+
+    # In background mode the run ends here, the summary is written to the thread when ready
+    key = _thread_key(config)
+    if configurable.summarize_mode == "background" and key:
+        with _pending_lock:
+            if key in _running_summaries:
+                return {}
+            _running_summaries.add(key)
+        covered = covered_messages(dropped_messages, {m.id for m in dropped_messages})
+        _summary_executor.submit(_summarize_in_background, summary_writer, key, summary, messages, covered)
+        return {}
+
+    # kept out of stream_mode="messages", which carries the answer tokens only
+    response = llm.invoke(messages, config={"tags": ["nostream"]})
     
-    # Delete all but the 2 most recent messages
-    delete_messages = [RemoveMessage(id=m.id) for m in state["messages"][:-2]]
+    # Delete all but the most recent messages
+    delete_messages = [RemoveMessage(id=m.id) for m in dropped_messages]
     
     return SummaryState(
         messages = delete_messages,
@@ -101,22 +316,46 @@ def summarize(state: SummaryState) -> SummaryState:
 # Edges
 
 # Determine whether to end or summarize the conversation
-def should_summarize(state: SummaryState):
+def should_summarize(state: SummaryState, config: RunnableConfig):
+    configurable = configuration.Configuration.from_runnable_config(config)
     messages = state["messages"]
-    
-    if len(messages) > 2:
+
+    if configurable.summarize_policy == "messages":
+        return "summarize" if len(messages) > 2 else END
+
+    # Only when the history crosses the high-water mark
+    if count_tokens_approximately(messages) > configurable.summarize_high_water:
         return "summarize"
     
     return END
 
 
 # Graph
-workflow = StateGraph(SummaryState)
-workflow.add_node(chatbot)
-workflow.add_node(summarize)
+def build_workflow(summary_writer: Optional[SummaryWriter] = None) -> StateGraph:
+    builder = StateGraph(SummaryState)
+    builder.add_node("chatbot", chatbot)
+    builder.add_node("summarize", functools.partial(summarize, summary_writer=summary_writer))
+
+    builder.add_edge(START, "chatbot")
+    builder.add_conditional_edges("chatbot", should_summarize)
+    builder.add_edge("summarize", END)
+    return builder
+
+
+def compile_graph(checkpointer=None):
+    """
+    The chatbot graph on checkpointer. Background summaries are written to the
+    thread through it; without one (e.g. workflow compiled by the server) they
+    are applied by the thread's next turn.
+    """
+    if checkpointer is None:
+        return workflow.compile()
+    summary_writer = SummaryWriter()
+    summary_writer.graph = build_workflow(summary_writer).compile(checkpointer=checkpointer)
+    return summary_writer.graph
+
 
-workflow.add_edge(START, "chatbot")
-workflow.add_conditional_edges("chatbot", should_summarize)
-workflow.add_edge("summarize", END)
+workflow = build_workflow()
 
-graph = workflow.compile()
\ No newline at end of file
+# SQLite checkpointer when STUDIO_SQLITE is set, the server's otherwise
+graph = compile_graph(sqlite_persistence.local_persistence().get("checkpointer"))
@@ -1,25 +1,67 @@
+import re
+import threading
+from collections import Counter
+from typing import Optional
+
 from langchain_openai import ChatOpenAI
 
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import StateGraph, MessagesState, START, END
 from langchain_core.runnables.config import RunnableConfig
 from langgraph.store.base import BaseStore
 from langchain_core.messages import SystemMessage
-from langgraph.store.memory import InMemoryStore
-import configuration
+import llm_cache
+import memory_access
+import sqlite_persistence
+
+
+model = ChatOpenAI(model="gpt-4o-mini", cache=llm_cache.for_graph("chatbot_long_term_memory"))
+
+# Cheap check for messages that may tell something about the user, anything else skips the memory LLM call
+SELF_DISCLOSURE = re.compile(
+    r"\b(i|i'm|i’m|im|i've|i’ve|i'd|i’d|i'll|i’ll|me|my|mine|myself|we|we're|our|ours|call me)\b",
+    re.IGNORECASE,
+)
+
+# Outcomes of update_memory in this process: skipped (no new or no self-disclosing messages),
+# unchanged (the LLM found nothing new) or updated
+_update_stats = Counter()
+_update_stats_lock = threading.Lock()
+
+
+def _count_update(outcome: str):
+    with _update_stats_lock:
+        _update_stats[outcome] += 1
+
+
+def memory_update_stats() -> dict:
+    with _update_stats_lock:
+        stats = {outcome: _update_stats[outcome] for outcome in ("skipped", "unchanged", "updated")}
+    runs = sum(stats.values())
+    stats["skip_rate"] = stats["skipped"] / runs if runs else 0.0
+    return stats
+
+
+def has_self_disclosure(messages: list) -> bool:
+    return any(m.type == "human" and SELF_DISCLOSURE.search(str(m.content)) for m in messages)
 
 
-model = ChatOpenAI(model="gpt-4o-mini")
+def messages_since(messages: list, message_id) -> list:
+    """Messages after the one with the given id, all of them if it is not in this history."""
+    for i in range(len(messages) - 1, -1, -1):
+        if messages[i].id == message_id:
+            return messages[i + 1:]
+    return messages
 
 ### Nodes
 
 def chat(state: MessagesState, config: RunnableConfig, store: BaseStore):
     # Get the user ID from the config
-    configurable = configuration.Configuration.from_runnable_config(config)
-    user_id = configurable.user_id
+    memory = memory_access.run_memory(config, store)
+    user_id = memory.configurable.user_id
 
-    # Retrieve memory from the store
-    user_details = store.get(("memory", user_id), "user_details")
+    # Retrieve memory from the store, with the watermark update_memory needs next
+    memory.prefetch(gets=[(("memory", user_id), "user_details"), _watermark_key(config, user_id)])
+    user_details = memory.get(("memory", user_id), "user_details")
 
     # Extract the actual memory content if it exists and add a prefix
     if user_details:
@@ -61,12 +103,24 @@ def chat(state: MessagesState, config: RunnableConfig, store: BaseStore):
 
 def update_memory(state: MessagesState, config: RunnableConfig, store: BaseStore):
     # Get the user ID from the config
-    configurable = configuration.Configuration.from_runnable_config(config)
-    user_id = configurable.user_id
+    memory = memory_access.run_memory(config, store)
+    user_id = memory.configurable.user_id
 
     namespace = ("memory", user_id)
     key = "user_details"
-    user_details = store.get(namespace, key)
+
+    # Only the messages since the last update of this user's memory from this thread
+    watermark_key = _watermark_key(config, user_id)
+    watermark = memory.get(*watermark_key)
+    last_seen = watermark.value["message_id"] if watermark else None
+    new_messages = messages_since(state["messages"], last_seen)
+
+    if not new_messages or not has_self_disclosure(new_messages):
+        _count_update("skipped")
+        _advance_watermark(memory, watermark_key, last_seen, state["messages"])
+        return
+
+    user_details = memory.get(namespace, key)
         
     if user_details:
         user_details_content = user_details.value.get('memory')
@@ -81,7 +135,7 @@ def update_memory(state: MessagesState, config: RunnableConfig, store: BaseStore
     {user_details_content}
 
     INSTRUCTIONS:
-    1. Carefully review the chat history below.
+    1. Carefully review the latest chat messages below.
     2. Identify any new, explicitly stated user information, such as:
         - Personal details (e.g., name, location)
         - Preferences (likes, dislikes)
@@ -102,10 +156,28 @@ def update_memory(state: MessagesState, config: RunnableConfig, store: BaseStore
     Your final output should either be a clean, updated bulleted list — or nothing at all.
     """
     
-    new_memory = model.invoke([SystemMessage(content=system_msg)] + state['messages'])
+    new_memory = model.invoke([SystemMessage(content=system_msg)] + new_messages)
 
     if new_memory.content.strip():
-        store.put(namespace, key, {"memory": new_memory.content})
+        memory.put(namespace, key, {"memory": new_memory.content})
+        _count_update("updated")
+    else:
+        _count_update("unchanged")
+
+    _advance_watermark(memory, watermark_key, last_seen, state["messages"])
+
+
+def _watermark_key(config: RunnableConfig, user_id: str) -> tuple[tuple, str]:
+    # one item per thread: threads of the same user don't overwrite each other's, and a
+    # deleted thread's can go with it; kept out of the user's memory namespace
+    thread_id = config.get("configurable", {}).get("thread_id") or "default"
+    return ("memory_watermark", user_id), str(thread_id)
+
+
+def _advance_watermark(memory: memory_access.RunMemory, watermark_key: tuple[tuple, str], last_seen: Optional[str],
+                       messages: list):
+    if messages and last_seen != messages[-1].id:
+        memory.put(*watermark_key, {"message_id": messages[-1].id})
 
 
 # Define the graph
@@ -116,7 +188,5 @@ builder.add_edge(START, "chat")
 builder.add_edge("chat", "update_memory")
 builder.add_edge("update_memory", END)
 
-long_term_memory = InMemoryStore()
-short_term_memory = MemorySaver()
-
-graph = builder.compile()
\ No newline at end of file
+# SQLite checkpointer and store when STUDIO_SQLITE is set, the server's otherwise
+graph = builder.compile(**sqlite_persistence.local_persistence())
\ No newline at end of file
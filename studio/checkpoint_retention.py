@@ -0,0 +1,264 @@
+import threading
+import traceback
+from dataclasses import dataclass
+from typing import Optional
+
+import bson
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.mongodb import MongoDBSaver
+from langgraph.checkpoint.serde.types import INTERRUPT, RESUME
+
+import state_history
+from delta_checkpoints import DeltaMongoDBSaver
+
+
+@dataclass
+class CompactionReport:
+    thread_id: str
+    checkpoint_ns: str
+    checkpoints_before: int
+    checkpoints_removed: int = 0
+    writes_removed: int = 0
+    bytes_reclaimed: int = 0
+    snapshot_id: Optional[str] = None  # checkpoint that now stands for the removed history
+
+
+def plan_compaction(entries: dict[str, tuple[Optional[str], bool]], keep_last: int) -> tuple[Optional[str], set, dict]:
+    """
+    Which checkpoints of one thread/namespace to drop, given id -> (parent id, waiting on an interrupt).
+
+    Kept: the `keep_last` newest, fork points and the tip of every branch, and
+    checkpoints with an interrupt that hasn't been resumed. Of the rest, the newest becomes the
+    snapshot standing for everything before it and the others are removed.
+    Returns (snapshot id, removed ids, {survivor id: new parent id}) with only
+    the survivors whose parent changes in the mapping.
+    """
+    ids = sorted(entries)  # uuid6 checkpoint ids sort by creation time
+    children: dict[str, int] = {}
+    for parent, _ in entries.values():
+        if parent is not None:
+            children[parent] = children.get(parent, 0) + 1
+
+    keep = set(ids[-keep_last:]) if keep_last > 0 else set()
+    keep |= {i for i in ids if children.get(i, 0) != 1}  # fork points (>1 child) and branch tips (none)
+    keep |= {i for i in ids if entries[i][1]}
+    removable = [i for i in ids if i not in keep]
+    if len(removable) < 2:
+        return None, set(), {}
+
+    snapshot, removed = removable[-1], set(removable[:-1])
+    survivors = set(ids) - removed
+
+    def surviving_ancestor(checkpoint_id: str) -> Optional[str]:
+        parent = entries[checkpoint_id][0]
+        while parent is not None and parent not in survivors:
+            parent = entries[parent][0] if parent in entries else None
+        return parent
+
+    reparent = {}
+    for checkpoint_id in survivors:
+        parent = surviving_ancestor(checkpoint_id)
+        if parent != entries[checkpoint_id][0]:
+            reparent[checkpoint_id] = parent
+    return snapshot, removed, reparent
+
+
+# Storage access per saver type
+##################################################################################
+class _InMemoryCheckpoints:
+    def __init__(self, saver: InMemorySaver):
+        self.saver = saver
+
+    def threads(self) -> list[str]:
+        return list(self.saver.storage)
+
+    def namespaces(self, thread_id: str) -> list[str]:
+        return list(self.saver.storage.get(thread_id, {}))
+
+    def entries(self, thread_id: str, checkpoint_ns: str) -> dict[str, tuple[Optional[str], bool]]:
+        entries = {}
+        for checkpoint_id, (_, _, parent) in list(self.saver.storage[thread_id][checkpoint_ns].items()):
+            channels = {w[1] for w in self.saver.writes.get((thread_id, checkpoint_ns, checkpoint_id), {}).values()}
+            entries[checkpoint_id] = (parent, INTERRUPT in channels and RESUME not in channels)
+        return entries
+
+    def reparent(self, thread_id: str, checkpoint_ns: str, reparent: dict[str, Optional[str]]) -> int:
+        stored = self.saver.storage[thread_id][checkpoint_ns]
+        for checkpoint_id, parent in reparent.items():
+            checkpoint, metadata, _ = stored[checkpoint_id]
+            stored[checkpoint_id] = (checkpoint, metadata, parent)
+        return 0
+
+    def delete(self, thread_id: str, checkpoint_ns: str, removed: set) -> tuple[int, int]:
+        stored = self.saver.storage[thread_id][checkpoint_ns]
+        reclaimed = writes_removed = 0
+        for checkpoint_id in removed:
+            checkpoint, metadata, _ = stored.pop(checkpoint_id)
+            reclaimed += len(checkpoint[1]) + len(metadata[1])
+            writes = self.saver.writes.pop((thread_id, checkpoint_ns, checkpoint_id), {})
+            writes_removed += len(writes)
+            reclaimed += sum(len(w[2][1]) for w in writes.values())
+
+        # channel values are stored once per version, drop the versions no survivor points to
+        referenced = set()
+        for checkpoint, _, _ in list(stored.values()):
+            referenced.update(self.saver.serde.loads_typed(checkpoint)["channel_versions"].items())
+        for key in [k for k in list(self.saver.blobs) if k[:2] == (thread_id, checkpoint_ns) and k[2:] not in referenced]:
+            reclaimed += len(self.saver.blobs.pop(key)[1])
+        return writes_removed, reclaimed
+
+
+class _MongoCheckpoints:
+    def __init__(self, saver: MongoDBSaver):
+        self.saver = saver
+
+    def threads(self) -> list[str]:
+        return self.saver.checkpoint_collection.distinct("thread_id")
+
+    def namespaces(self, thread_id: str) -> list[str]:
+        return self.saver.checkpoint_collection.distinct("checkpoint_ns", {"thread_id": thread_id})
+
+    def entries(self, thread_id: str, checkpoint_ns: str) -> dict[str, tuple[Optional[str], bool]]:
+        scope = {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}
+        interrupted = set(self.saver.writes_collection.distinct("checkpoint_id", {**scope, "channel": INTERRUPT}))
+        interrupted -= set(self.saver.writes_collection.distinct("checkpoint_id", {**scope, "channel": RESUME}))
+        docs = self.saver.checkpoint_collection.find(scope, projection={"checkpoint_id": 1, "parent_checkpoint_id": 1})
+        return {d["checkpoint_id"]: (d.get("parent_checkpoint_id"), d["checkpoint_id"] in interrupted) for d in docs}
+
+    def reparent(self, thread_id: str, checkpoint_ns: str, reparent: dict[str, Optional[str]]) -> int:
+        scope = {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}
+        if not isinstance(self.saver, DeltaMongoDBSaver):
+            for checkpoint_id, parent in reparent.items():
+                self.saver.checkpoint_collection.update_one(
+                    {**scope, "checkpoint_id": checkpoint_id}, {"$set": {"parent_checkpoint_id": parent}}
+                )
+            return 0
+
+        # deltas of a survivor are relative to its old parent, rewrite it as a full snapshot
+        before = self._size(scope, reparent)
+        for checkpoint_id, parent in reparent.items():
+            self.saver.reroot({"configurable": {**scope, "checkpoint_id": checkpoint_id}}, parent)
+        return before - self._size(scope, reparent)
+
+    def delete(self, thread_id: str, checkpoint_ns: str, removed: set) -> tuple[int, int]:
+        query = {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": {"$in": list(removed)}}
+        reclaimed = sum(len(bson.encode(d)) for d in self.saver.checkpoint_collection.find(query))
+        reclaimed += sum(len(bson.encode(d)) for d in self.saver.writes_collection.find(query))
+        self.saver.checkpoint_collection.delete_many(query)
+        writes_removed = self.saver.writes_collection.delete_many(query).deleted_count
+        return writes_removed, reclaimed
+
+    def _size(self, scope: dict, ids) -> int:
+        docs = self.saver.checkpoint_collection.find({**scope, "checkpoint_id": {"$in": list(ids)}})
+        return sum(len(bson.encode(d)) for d in docs)
+
+
+def checkpoints_of(saver: BaseCheckpointSaver):
+    if isinstance(saver, InMemorySaver):
+        return _InMemoryCheckpoints(saver)
+    if isinstance(saver, MongoDBSaver):
+        return _MongoCheckpoints(saver)
+    raise TypeError(f"Checkpoint compaction is not supported for {type(saver).__name__}")
+
+
+def compact_thread(saver: BaseCheckpointSaver, thread_id: str, keep_last: int = 20) -> list[CompactionReport]:
+    """Apply the retention policy (plan_compaction) to every namespace of a thread."""
+    checkpoints = checkpoints_of(saver)
+    reports = []
+    for checkpoint_ns in checkpoints.namespaces(thread_id):
+        entries = checkpoints.entries(thread_id, checkpoint_ns)
+        report = CompactionReport(thread_id, checkpoint_ns, len(entries))
+        snapshot, removed, reparent = plan_compaction(entries, keep_last)
+        if removed:
+            # survivors first, so a failure in between never leaves a dangling parent
+            report.bytes_reclaimed += checkpoints.reparent(thread_id, checkpoint_ns, reparent)
+            writes_removed, reclaimed = checkpoints.delete(thread_id, checkpoint_ns, removed)
+            report.checkpoints_removed = len(removed)
+            report.writes_removed = writes_removed
+            report.bytes_reclaimed += reclaimed
+            report.snapshot_id = snapshot
+        reports.append(report)
+    state_history.forget(saver, thread_id)
+    return reports
+
+
+class Compactor:
+    """
+    Background checkpoint compaction.
+
+    Every `interval` seconds compacts the next `threads_per_pass` threads of the
+    saver (round robin), so a large deployment is covered incrementally without
+    long pauses. Threads within `keep_last` + `slack` checkpoints are skipped.
+    """
+
+    def __init__(self, saver: BaseCheckpointSaver, keep_last: int = 20, slack: int = 20, interval: float = 60.0,
+                 threads_per_pass: int = 50):
+        self.saver = saver
+        self.keep_last = keep_last
+        self.slack = slack
+        self.interval = interval
+        self.threads_per_pass = threads_per_pass
+        self.passes = 0
+        self.threads_compacted = 0
+        self.checkpoints_removed = 0
+        self.writes_removed = 0
+        self.bytes_reclaimed = 0
+        self._checkpoints = checkpoints_of(saver)
+        self._cursor = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_pass(self) -> list[CompactionReport]:
+        """Compact the next slice of threads, returns the reports of the threads that shrank."""
+        threads = sorted(self._checkpoints.threads())
+        if not threads:
+            return []
+        start = self._cursor % len(threads)
+        batch = (threads[start:] + threads[:start])[:self.threads_per_pass]
+        self._cursor = start + len(batch)
+
+        reports = []
+        for thread_id in batch:
+            namespaces = self._checkpoints.namespaces(thread_id)
+            if all(len(self._checkpoints.entries(thread_id, ns)) <= self.keep_last + self.slack for ns in namespaces):
+                continue
+            reports += [r for r in compact_thread(self.saver, thread_id, self.keep_last) if r.checkpoints_removed]
+
+        with self._lock:
+            self.passes += 1
+            self.threads_compacted += len({r.thread_id for r in reports})
+            self.checkpoints_removed += sum(r.checkpoints_removed for r in reports)
+            self.writes_removed += sum(r.writes_removed for r in reports)
+            self.bytes_reclaimed += sum(r.bytes_reclaimed for r in reports)
+        return reports
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="checkpoint-compaction", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_pass()
+            except Exception:
+                traceback.print_exc()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "passes": self.passes,
+                "threads_compacted": self.threads_compacted,
+                "checkpoints_removed": self.checkpoints_removed,
+                "writes_removed": self.writes_removed,
+                "bytes_reclaimed": self.bytes_reclaimed,
+            }
@@ -11,6 +11,56 @@ class Configuration:
     """The configurable fields for the chatbot."""
     user_id: str = "default-user"
 
+    # Map step of the map_reduce graph
+    fetch_concurrency: int = 5  # max tickers fetched at the same time
+    fetch_timeout: float = 10.0  # per-ticker deadline in seconds
+    fetch_mode: str = "per_ticker"  # "per_ticker" fans out one fetch per ticker, "batch" downloads all at once
+    fetch_batch_size: int = 20  # tickers per bulk download in batch mode, each batch has its own fetch_timeout
+
+    # Reduce step of the map_reduce graph
+    reduce_mode: str = "single"  # "single" ranks everything in one prompt, "tree" ranks in groups and merges
+    reduce_group_size: int = 5  # companies (or group rankings) per ranking call in tree mode
+    reduce_concurrency: int = 5  # max per-ticker analyses running at the same time in tree mode
+
+    # Conversation summarization in chatbot
+    summarize_policy: str = "tokens"  # "tokens" uses the water marks below, "messages" summarizes every turn past two messages
+    summarize_high_water: int = 1200  # summarize once the history grows past this many tokens
+    summarize_low_water: int = 400  # then keep the most recent messages that fit in this many tokens
+    summarize_mode: str = "inline"  # "background" returns the answer right away and applies the summary on the next turn
+
+    # Directives and ADRs put in the system prompt, ranked against the user's message
+    memory_top_k: int = 8  # at most this many
+    memory_token_budget: int = 800  # and no more tokens than this
+
+    # DevMentor memory updates
+    memory_update_mode: str = "serial"  # "parallel" lets one turn update several memories in a single superstep
+    memory_write_mode: str = "inline"  # "background" queues trustcall extractions (also in directive_memory_bot) and returns right away
+
+    # Tool calls of one assistant turn in financial_advisor
+    tool_concurrency: int = 4  # max tool calls running at the same time
+    tool_timeout: float = 30.0  # per-call deadline in seconds
+
+    # Tool results and stock_details longer than this many characters are kept in the blob store,
+    # the state holds a reference (0 keeps everything inline)
+    blob_threshold: int = 4096
+
+    # Memoized nodes (node_cache.memoize) reuse their output when they run again on the same input,
+    # e.g. on a replay or fork
+    node_cache: bool = False
+
+    def __post_init__(self):
+        # a zero limit would deadlock the semaphores and pools sized from it
+        minimums = {
+            "fetch_concurrency": 1, "fetch_batch_size": 1, "reduce_group_size": 2, "reduce_concurrency": 1,
+            "tool_concurrency": 1,
+        }
+        for name, minimum in minimums.items():
+            if getattr(self, name) < minimum:
+                raise ValueError(f"{name} must be at least {minimum}, got {getattr(self, name)}")
+        for name in ("fetch_timeout", "tool_timeout"):
+            if getattr(self, name) <= 0:
+                raise ValueError(f"{name} must be positive, got {getattr(self, name)}")
+
     @classmethod
     def from_runnable_config(
         cls, config: Optional[RunnableConfig] = None
@@ -24,4 +74,20 @@ class Configuration:
             for f in fields(cls)
             if f.init
         }
-        return cls(**{k: v for k, v in values.items() if v})
\ No newline at end of file
+        # environment variables always come in as strings
+        values = {
+            f.name: _coerce(f.type, values[f.name])
+            for f in fields(cls)
+            if f.init
+        }
+        return cls(**{k: v for k, v in values.items() if v is not None and v != ""})
+
+
+def _coerce(field_type: Any, value: Any) -> Any:
+    if not isinstance(value, str) or field_type is str:
+        return value
+    if field_type is bool:
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    if field_type in (int, float):
+        return field_type(value)
+    return value
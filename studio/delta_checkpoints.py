@@ -0,0 +1,232 @@
+import threading
+from collections import OrderedDict
+from datetime import UTC, datetime
+from typing import Any, Iterator, Optional
+
+import zstandard
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.mongodb import MongoDBSaver
+from langgraph.checkpoint.mongodb.utils import _validate_identifier, dumps_metadata
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+# doc["type"] of checkpoints written by DeltaMongoDBSaver, followed by the inner serde type
+ENCODED_PREFIX = "delta+zstd+"
+
+
+class _Encoded:
+    """A stored snapshot/delta record, before the chain it belongs to is applied."""
+
+    def __init__(self, record: dict):
+        self.record = record
+
+
+class _DeltaSerializer(SerializerProtocol):
+    # Wraps the saver's serde: delta records are zstd-compressed msgpack, everything else passes through
+    def __init__(self, serde: SerializerProtocol, level: int):
+        self.serde = serde
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def dumps_typed(self, obj: Any) -> tuple[str, bytes]:
+        return self.serde.dumps_typed(obj)
+
+    def loads_typed(self, data: tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_.startswith(ENCODED_PREFIX):
+            return _Encoded(self.serde.loads_typed((type_[len(ENCODED_PREFIX):], self._decompressor.decompress(payload))))
+        return self.serde.loads_typed(data)
+
+    def encode(self, record: dict) -> tuple[str, bytes]:
+        type_, payload = self.serde.dumps_typed(record)
+        return ENCODED_PREFIX + type_, self._compressor.compress(payload)
+
+    # aliases some serde versions call
+    def dumps(self, obj: Any) -> bytes:
+        return self.serde.dumps(obj)
+
+    def loads(self, data: bytes) -> Any:
+        return self.serde.loads(data)
+
+
+class DeltaMongoDBSaver(MongoDBSaver):
+    """
+    MongoDBSaver that stores what changed in each checkpoint instead of a full copy.
+
+    Every `snapshot_every`-th checkpoint along a branch is a full snapshot. The
+    ones in between keep only the channels updated in that step (new_versions),
+    and for list channels that grew by appending (messages) only the appended
+    items. Records are msgpack (the saver's serde) compressed with zstd.
+    Reads fetch the records back to the nearest snapshot in one query and apply
+    them in order; recently used states are kept in memory.
+    """
+
+    def __init__(self, *args: Any, snapshot_every: int = 10, compression_level: int = 3, cache_size: int = 256,
+                 serde: Optional[SerializerProtocol] = None, **kwargs: Any):
+        super().__init__(*args, serde=_DeltaSerializer(serde or JsonPlusSerializer(), compression_level), **kwargs)
+        self.snapshot_every = snapshot_every
+        self.cache_size = cache_size
+        # (thread_id, checkpoint_ns, checkpoint_id) -> (channel values, deltas since the snapshot, snapshot id)
+        self._states: OrderedDict[tuple, tuple[dict, int, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        # identifiers go straight into the update filter: plain strings only, as MongoDBSaver.put checks
+        thread_id = _validate_identifier(config["configurable"]["thread_id"], "thread_id")
+        checkpoint_ns = _validate_identifier(config["configurable"]["checkpoint_ns"], "checkpoint_ns")
+        checkpoint_id = _validate_identifier(checkpoint["id"], "checkpoint id")
+        parent_id = _validate_identifier(config["configurable"].get("checkpoint_id"), "checkpoint_id", optional=True)
+        values = checkpoint["channel_values"]
+
+        parent = self._cached((thread_id, checkpoint_ns, parent_id)) if parent_id else None
+        if parent is None or parent[1] + 1 >= self.snapshot_every:
+            record = {"kind": "snapshot", "values": values, "appends": {}}
+            chain, snapshot_id = 0, checkpoint_id
+        else:
+            record = {"kind": "delta", **_diff(parent[0], values, new_versions)}
+            chain, snapshot_id = parent[1] + 1, parent[2]
+
+        doc = {
+            **self._encode(checkpoint, record, snapshot_id),
+            "parent_checkpoint_id": parent_id,
+            "metadata": dumps_metadata(self.serde, get_checkpoint_metadata(config, metadata)),
+        }
+        if self.ttl:
+            doc["created_at"] = datetime.now(tz=UTC)
+        self.checkpoint_collection.update_one(
+            {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id},
+            {"$set": doc},
+            upsert=True,
+        )
+
+        self._remember((thread_id, checkpoint_ns, checkpoint_id), (dict(values), chain, snapshot_id))
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}}
+
+    def reroot(self, config: RunnableConfig, parent_id: Optional[str]):
+        """
+        Rewrite a stored checkpoint as a full snapshot under another parent, so it
+        no longer depends on the records before it (see checkpoint_retention).
+        """
+        parent_id = _validate_identifier(parent_id, "checkpoint_id", optional=True)
+        stored = self.get_tuple(config)
+        configurable = stored.config["configurable"]
+        checkpoint, values = stored.checkpoint, stored.checkpoint["channel_values"]
+        record = {"kind": "snapshot", "values": values, "appends": {}}
+        self.checkpoint_collection.update_one(
+            {key: configurable[key] for key in ("thread_id", "checkpoint_ns", "checkpoint_id")},
+            {"$set": {**self._encode(checkpoint, record, checkpoint["id"]), "parent_checkpoint_id": parent_id}},
+        )
+        self._remember(
+            (configurable["thread_id"], configurable["checkpoint_ns"], checkpoint["id"]), (values, 0, checkpoint["id"])
+        )
+
+    def _encode(self, checkpoint: Checkpoint, record: dict, snapshot_id: str) -> dict:
+        record["checkpoint"] = {**checkpoint, "channel_values": {}}
+        record["present"] = list(checkpoint["channel_values"])
+        record["snapshot_id"] = snapshot_id
+        type_, payload = self.serde.encode(record)
+        return {"type": type_, "checkpoint": payload, "kind": record["kind"], "snapshot_id": snapshot_id}
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        stored = super().get_tuple(config)
+        return self._materialize(stored) if stored else None
+
+    def list(self, config: Optional[RunnableConfig], **kwargs: Any) -> Iterator[CheckpointTuple]:
+        for stored in super().list(config, **kwargs):
+            yield self._materialize(stored)
+
+    def _materialize(self, stored: CheckpointTuple) -> CheckpointTuple:
+        if not isinstance(stored.checkpoint, _Encoded):
+            return stored
+        configurable = stored.config["configurable"]
+        key = (configurable["thread_id"], configurable["checkpoint_ns"], configurable["checkpoint_id"])
+        record = stored.checkpoint.record
+
+        state = self._cached(key)
+        if state is None:
+            parent_id = stored.parent_config["configurable"]["checkpoint_id"] if stored.parent_config else None
+            state = self._rebuild(key, parent_id, record)
+            self._remember(key, state)
+        values = {channel: list(v) if isinstance(v, list) else v for channel, v in state[0].items()}
+        return stored._replace(checkpoint={**record["checkpoint"], "channel_values": values})
+
+    def _rebuild(self, key: tuple, parent_id: Optional[str], record: dict) -> tuple[dict, int, str]:
+        thread_id, checkpoint_ns, checkpoint_id = key
+        if record["kind"] == "snapshot":
+            return _apply({}, record), 0, checkpoint_id
+
+        # every record of this thread since the snapshot, forks included, then follow the parents
+        docs = self.checkpoint_collection.find(
+            {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": {"$gte": record["snapshot_id"], "$lt": checkpoint_id},
+            },
+            projection={"checkpoint_id": 1, "parent_checkpoint_id": 1, "type": 1, "checkpoint": 1},
+        )
+        by_id = {doc["checkpoint_id"]: doc for doc in docs}
+
+        chain, state = [record], None
+        while parent_id is not None:
+            state = self._cached((thread_id, checkpoint_ns, parent_id))
+            if state is not None:
+                break
+            doc = by_id[parent_id]
+            parent = self.serde.loads_typed((doc["type"], doc["checkpoint"])).record
+            chain.append(parent)
+            if parent["kind"] == "snapshot":
+                break
+            parent_id = doc["parent_checkpoint_id"]
+
+        values, depth = (dict(state[0]), state[1]) if state else ({}, -1)
+        for step in reversed(chain):
+            values = _apply(values, step)
+            depth += 1
+        return values, depth, record["snapshot_id"]
+
+    def _cached(self, key: tuple) -> Optional[tuple[dict, int, str]]:
+        with self._lock:
+            state = self._states.get(key)
+            if state is not None:
+                self._states.move_to_end(key)
+            return state
+
+    def _remember(self, key: tuple, state: tuple[dict, int, str]):
+        with self._lock:
+            self._states[key] = state
+            self._states.move_to_end(key)
+            while len(self._states) > self.cache_size:
+                self._states.popitem(last=False)
+
+
+def _diff(previous: dict, values: dict, new_versions: ChannelVersions) -> dict:
+    changed, appends = {}, {}
+    for channel, value in values.items():
+        if channel not in new_versions and channel in previous:
+            continue
+        old = previous.get(channel)
+        if isinstance(value, list) and isinstance(old, list) and len(value) >= len(old) and value[:len(old)] == old:
+            appends[channel] = [len(old), value[len(old):]]
+        else:
+            changed[channel] = value
+    return {"values": changed, "appends": appends}
+
+
+def _apply(values: dict, record: dict) -> dict:
+    values = {**values, **record["values"]}
+    for channel, (base_length, tail) in record["appends"].items():
+        values[channel] = list(values[channel][:base_length]) + list(tail)
+    return {channel: values[channel] for channel in record["present"] if channel in values}
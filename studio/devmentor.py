@@ -5,16 +5,18 @@ from pydantic import BaseModel, Field
 
 from langchain_core.runnables import RunnableConfig
 from langchain_core.messages import merge_message_runs, HumanMessage, SystemMessage
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import StateGraph, MessagesState, END, START
 from langgraph.store.base import BaseStore
-from langgraph.store.memory import InMemoryStore
 from langchain_openai import ChatOpenAI
 from trustcall import create_extractor
-import configuration
+import extraction_queue
+import llm_cache
+import memory_access
+import memory_retrieval
+import sqlite_persistence
 
 # Initialize the model
-model = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+model = ChatOpenAI(model="gpt-4o-mini", temperature=0, cache=llm_cache.for_graph("dev_mentor"))
 
 # Developer Profile
 class DevProfile(BaseModel):
@@ -120,105 +122,146 @@ def extract_tool_info(tool_calls, tool_name):
                 summaries.append(f"- {tool_name} update: {call['args']}")
     return "\n".join(summaries)
 
+def tool_replies(state: MessagesState, update_type: str, content: str) -> list[dict]:
+    # answer every UpdateMemory call of this type, parallel calls may carry several
+    calls = [c for c in state["messages"][-1].tool_calls if c["args"].get("update_type") == update_type]
+    return [{"role": "tool", "content": content, "tool_call_id": c["id"]} for c in calls]
+
 # Node: Main reasoning
 def dev_mentor(state: MessagesState, config: RunnableConfig, store: BaseStore):
     # Get the user ID from the config
-    configurable = configuration.Configuration.from_runnable_config(config)
-    user_id = configurable.user_id
+    memory = memory_access.run_memory(config, store)
+    user_id = memory.configurable.user_id
+
+    # Profile and preferences in one store round-trip, with the ADRs when their ranking index must be rebuilt
+    searches = [("dev_profile", user_id), ("preferences", user_id)]
+    if memory_retrieval.needs_sync(store, ("adrs", user_id)):
+        searches.append(("adrs", user_id))
+    memory.prefetch(searches=searches, limit=None)
 
-    profile = store.search(("dev_profile", user_id))
+    profile = memory.search(("dev_profile", user_id), limit=None)
     dev_profile = profile[0].value if profile else None
 
-    adrs = store.search(("adrs", user_id))
+    # Only the active ADRs most relevant to the latest message
+    question = next((m.content for m in reversed(state["messages"]) if m.type == "human"), "")
+    adrs = memory_retrieval.retrieve(
+        memory, ("adrs", user_id), str(question), text_of=str,
+        k=memory.configurable.memory_top_k, token_budget=memory.configurable.memory_token_budget,
+        where=lambda adr: adr.get("status", "active") == "active",
+    )
     adr_dump = "\n".join(f"{f.value}" for f in adrs)
 
-    prefs = store.search(("preferences", user_id))
+    prefs = memory.search(("preferences", user_id), limit=None)
     preferences = "\n".join(f"- {p.value['instruction']}" for p in prefs) if prefs else ""
 
     system_msg = MODEL_SYSTEM_MESSAGE.format(dev_profile=dev_profile, adrs=adr_dump, preferences=preferences)
-    response = model.bind_tools([UpdateMemory], parallel_tool_calls=False).invoke([SystemMessage(content=system_msg)] + state["messages"])
+    # In parallel mode one answer may signal several memory updates at once
+    parallel = memory.configurable.memory_update_mode == "parallel"
+    response = model.bind_tools([UpdateMemory], parallel_tool_calls=parallel).invoke([SystemMessage(content=system_msg)] + state["messages"])
 
     return {"messages": [response]}
 
-# Node: Update profile
-def update_dev_profile(state: MessagesState, config: RunnableConfig, store: BaseStore):
-    # Get the user ID from the config
-    configurable = configuration.Configuration.from_runnable_config(config)
-    user_id = configurable.user_id
-
+# Extractions: read the existing memories, run trustcall over the conversation, write the results
+def extract_dev_profile(memory: memory_access.RunMemory, user_id: str, messages: list) -> str:
     ns = ("dev_profile", user_id)
-    existing = store.search(ns)
+    existing = memory.search(ns)
     tool_name = "DevProfile"
     existing_mem = [(item.key, tool_name, item.value) for item in existing] if existing else None
 
     sys_msg = TRUSTCALL_INSTRUCTION.format(time=datetime.now().isoformat())
-    updated_messages = merge_message_runs([SystemMessage(content=sys_msg)] + state["messages"][:-1])
+    updated_messages = merge_message_runs([SystemMessage(content=sys_msg)] + messages)
 
     result = profile_extractor.invoke({"messages": updated_messages, "existing": existing_mem})
     for r, meta in zip(result["responses"], result["response_metadata"]):
-        store.put(ns, meta.get("json_doc_id", str(uuid.uuid4())), r.model_dump(mode="json"))
+        memory.put(ns, meta.get("json_doc_id", str(uuid.uuid4())), r.model_dump(mode="json"))
 
-    tool_calls = state["messages"][-1].tool_calls
-    return {"messages": [{"role": "tool", "content": "updated profile", "tool_call_id": tool_calls[0]['id']}]}  
-
-# Node: Update ADRs
-def update_decision_records(state: MessagesState, config: RunnableConfig, store: BaseStore):
-    # Get the user ID from the config
-    configurable = configuration.Configuration.from_runnable_config(config)
-    user_id = configurable.user_id
+    return "updated profile"
 
+def extract_decision_records(memory: memory_access.RunMemory, user_id: str, messages: list) -> str:
     ns = ("adrs", user_id)
-    existing = store.search(ns)
+    # the ADRs closest to the conversation, from the ranking index dev_mentor keeps current
+    conversation = " ".join(str(m.content) for m in messages if m.type == "human")
+    existing = memory_retrieval.retrieve(
+        memory, ns, conversation, text_of=str,
+        k=memory.configurable.memory_top_k, token_budget=memory.configurable.memory_token_budget,
+    )
     existing_mem = [(item.key, "DecisionRecord", item.value) for item in existing] if existing else None
 
     sys_msg = TRUSTCALL_INSTRUCTION.format(time=datetime.now().isoformat())
-    updated_messages = merge_message_runs([SystemMessage(content=sys_msg)] + state["messages"][:-1])
+    updated_messages = merge_message_runs([SystemMessage(content=sys_msg)] + messages)
 
     listener = ToolsListener()
     extractor = create_extractor(model, tools=[DecisionRecord], tool_choice="DecisionRecord", enable_inserts=True).with_listeners(on_end=listener)
     result = extractor.invoke({"messages": updated_messages, "existing": existing_mem})
 
     for r, meta in zip(result["responses"], result["response_metadata"]):
-        store.put(ns, meta.get("json_doc_id", str(uuid.uuid4())), r.model_dump(mode="json"))
+        memory.put(ns, meta.get("json_doc_id", str(uuid.uuid4())), r.model_dump(mode="json"))
 
-    tool_calls = state["messages"][-1].tool_calls
-    summary = extract_tool_info(listener.tools, "DecisionRecord")
-    return {"messages": [{"role": "tool", "content": summary, "tool_call_id": tool_calls[0]['id']}]}  
-
-# Node: Update instructions
-def update_instructions(state: MessagesState, config: RunnableConfig, store: BaseStore):
-    # Get the user ID from the config
-    configurable = configuration.Configuration.from_runnable_config(config)
-    user_id = configurable.user_id
+    return extract_tool_info(listener.tools, "DecisionRecord")
 
+def extract_instructions(memory: memory_access.RunMemory, user_id: str, messages: list) -> str:
     ns = ("preferences", user_id)
-    existing = store.search(ns)
+    existing = memory.search(ns)
     existing_mem = [(item.key, "Instruction", item.value) for item in existing] if existing else None
 
     sys_msg = TRUSTCALL_INSTRUCTION.format(time=datetime.now().isoformat())
-    updated_messages = merge_message_runs([SystemMessage(content=sys_msg)] + state["messages"][:-1])
+    updated_messages = merge_message_runs([SystemMessage(content=sys_msg)] + messages)
 
     result = instruction_extractor.invoke({"messages": updated_messages, "existing": existing_mem})
     for r, meta in zip(result["responses"], result["response_metadata"]):
-        store.put(ns, meta.get("json_doc_id", str(uuid.uuid4())), r.model_dump(mode="json"))
+        memory.put(ns, meta.get("json_doc_id", str(uuid.uuid4())), r.model_dump(mode="json"))
+
+    return "updated instructions"
+
+def run_extraction(state: MessagesState, config: RunnableConfig, store: BaseStore, namespace: str, extract) -> str:
+    # Get the user ID from the config
+    memory = memory_access.run_memory(config, store)
+    user_id = memory.configurable.user_id
+    messages = state["messages"][:-1]
+
+    # Write-behind: the worker reads the existing memories when the job runs, after the user's earlier jobs
+    if memory.configurable.memory_write_mode == "background":
+        extraction_queue.default_queue.submit(
+            user_id, (namespace, user_id), messages,
+            lambda queued: extract(memory_access.RunMemory(store), user_id, queued),
+        )
+        return f"{namespace} update queued"
+
+    return extract(memory, user_id, messages)
 
-    tool_calls = state["messages"][-1].tool_calls
-    return {"messages": [{"role": "tool", "content": "updated instructions", "tool_call_id": tool_calls[0]['id']}]}  
+# Node: Update profile
+def update_dev_profile(state: MessagesState, config: RunnableConfig, store: BaseStore):
+    content = run_extraction(state, config, store, "dev_profile", extract_dev_profile)
+    return {"messages": tool_replies(state, "user", content)}
+
+# Node: Update ADRs
+def update_decision_records(state: MessagesState, config: RunnableConfig, store: BaseStore):
+    content = run_extraction(state, config, store, "adrs", extract_decision_records)
+    return {"messages": tool_replies(state, "adr", content)}
+
+# Node: Update instructions
+def update_instructions(state: MessagesState, config: RunnableConfig, store: BaseStore):
+    content = run_extraction(state, config, store, "preferences", extract_instructions)
+    return {"messages": tool_replies(state, "instructions", content)}
 
 # Router
+UPDATE_NODES = {"user": "update_dev_profile", "adr": "update_decision_records", "instructions": "update_instructions"}
+
 def route(state: MessagesState, config: RunnableConfig, store: BaseStore) -> Literal[END, "update_decision_records", "update_instructions", "update_dev_profile"]:
     calls = state["messages"][-1].tool_calls
     if not calls:
         return END
-    t = calls[0]['args']['update_type']
-    if t == "user":
-        return "update_dev_profile"
-    elif t == "adr":
-        return "update_decision_records"
-    elif t == "instructions":
-        return "update_instructions"
-    else:
-        raise ValueError
+    nodes = []
+    for call in calls:
+        t = call['args']['update_type']
+        if t not in UPDATE_NODES:
+            raise ValueError
+        nodes.append(UPDATE_NODES[t])
+
+    # parallel mode runs every requested update in one superstep, then dev_mentor once
+    if memory_access.run_memory(config, store).configurable.memory_update_mode == "parallel":
+        return list(dict.fromkeys(nodes))
+    return nodes[0]
 
 # Build the graph
 builder = StateGraph(MessagesState)
@@ -232,7 +275,5 @@ builder.add_edge("update_decision_records", "dev_mentor")
 builder.add_edge("update_dev_profile", "dev_mentor")
 builder.add_edge("update_instructions", "dev_mentor")
 
-# Memory
-long_term = InMemoryStore()
-short_term = MemorySaver()
-graph = builder.compile()
\ No newline at end of file
+# SQLite checkpointer and store when STUDIO_SQLITE is set, the server's otherwise
+graph = builder.compile(**sqlite_persistence.local_persistence())
\ No newline at end of file
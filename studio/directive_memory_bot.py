@@ -1,12 +1,14 @@
 from langchain_openai import ChatOpenAI
 from pydantic import BaseModel, Field
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import StateGraph, MessagesState, START, END
 from langchain_core.runnables.config import RunnableConfig
 from langgraph.store.base import BaseStore
 from langchain_core.messages import SystemMessage
-from langgraph.store.memory import InMemoryStore
-import configuration
+import extraction_queue
+import llm_cache
+import memory_access
+import memory_retrieval
+import sqlite_persistence
 from trustcall import create_extractor
 import uuid
 
@@ -27,7 +29,7 @@ class InteractionDirective(BaseModel):
         )
     )
 
-model = ChatOpenAI(model="gpt-4o-mini")
+model = ChatOpenAI(model="gpt-4o-mini", cache=llm_cache.for_graph("directive_memory_bot"))
 
 trustcall_extractor = create_extractor(
     model,
@@ -40,12 +42,16 @@ trustcall_extractor = create_extractor(
 
 def chat(state: MessagesState, config: RunnableConfig, store: BaseStore):
     # Get the user ID from the config
-    configurable = configuration.Configuration.from_runnable_config(config)
-    user_id = configurable.user_id
+    memory = memory_access.run_memory(config, store)
+    user_id = memory.configurable.user_id
     namespace_for_directives = (user_id, "directives")
 
-    # Retrieve directives from the store
-    directives = store.search(namespace_for_directives)
+    # Retrieve the directives most relevant to the latest message
+    question = next((m.content for m in reversed(state["messages"]) if m.type == "human"), "")
+    directives = memory_retrieval.retrieve(
+        memory, namespace_for_directives, str(question), text_of=lambda d: d["directive"],
+        k=memory.configurable.memory_top_k, token_budget=memory.configurable.memory_token_budget,
+    )
     if directives:
         directive_lines = "\n".join(f"– {d.value['directive']}" for d in directives)
         directives_section = f"When answering, use the following guiding directives:\n{directive_lines}"
@@ -65,15 +71,12 @@ def chat(state: MessagesState, config: RunnableConfig, store: BaseStore):
     return {"messages": response}
 
 
-def update_memory(state: MessagesState, config: RunnableConfig, store: BaseStore):
-    # Get the user ID from the config
-    configurable = configuration.Configuration.from_runnable_config(config)
-    user_id = configurable.user_id
+def extract_directives(memory: memory_access.RunMemory, user_id: str, user_messages: list):
     namespace_for_directives = (user_id, "directives")
 
     # prepare existing facts
     schema = "InteractionDirective"
-    existing_directives = store.search(namespace_for_directives)
+    existing_directives = memory.search(namespace_for_directives)
     memories = (
         [(existing_directive.key, schema, existing_directive.value) for existing_directive in existing_directives] 
         if existing_directives else None
@@ -85,8 +88,6 @@ def update_memory(state: MessagesState, config: RunnableConfig, store: BaseStore
     Avoid simple rephrasing of existing directives.
     """
 
-    user_messages = [msg for msg in state["messages"] if msg.type == "human"][-1:]
-
     result = trustcall_extractor.invoke({
         "messages": [system_msg] + user_messages, 
         "existing": memories
@@ -95,13 +96,31 @@ def update_memory(state: MessagesState, config: RunnableConfig, store: BaseStore
 
     # update directives
     for r, rmeta in zip(result["responses"], result["response_metadata"]):
-        store.put(
+        memory.put(
             namespace_for_directives, 
             rmeta.get("json_doc_id", str(uuid.uuid4())), 
             r.model_dump(mode="json")
         )
 
 
+def update_memory(state: MessagesState, config: RunnableConfig, store: BaseStore):
+    # Get the user ID from the config
+    memory = memory_access.run_memory(config, store)
+    user_id = memory.configurable.user_id
+
+    user_messages = [msg for msg in state["messages"] if msg.type == "human"][-1:]
+
+    # Write-behind: queued turns of the same user are merged into one extraction
+    if memory.configurable.memory_write_mode == "background":
+        extraction_queue.default_queue.submit(
+            user_id, (user_id, "directives"), user_messages,
+            lambda queued: extract_directives(memory_access.RunMemory(store), user_id, queued),
+        )
+        return
+
+    extract_directives(memory, user_id, user_messages)
+
+
 # Define the graph
 builder = StateGraph(MessagesState)
 builder.add_node("chat", chat)
@@ -110,7 +129,5 @@ builder.add_edge(START, "chat")
 builder.add_edge("chat", "update_memory")
 builder.add_edge("update_memory", END)
 
-long_term_memory = InMemoryStore()
-short_term_memory = MemorySaver()
-
-graph = builder.compile()
\ No newline at end of file
+# SQLite checkpointer and store when STUDIO_SQLITE is set, the server's otherwise
+graph = builder.compile(**sqlite_persistence.local_persistence())
\ No newline at end of file
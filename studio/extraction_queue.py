@@ -0,0 +1,129 @@
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+
+@dataclass
+class ExtractionJob:
+    user_id: str
+    namespace: tuple
+    messages: list
+    extract: Callable[[list], None]  # runs the extraction on the messages and writes the results
+    enqueued_at: float = field(default_factory=time.monotonic)
+    coalesced: int = 0
+
+
+def merge_messages(earlier: list, later: list) -> list:
+    """Messages of both slices in order, each message once (by id)."""
+    seen = {m.id for m in earlier if getattr(m, "id", None)}
+    return earlier + [m for m in later if not getattr(m, "id", None) or m.id not in seen]
+
+
+class ExtractionQueue:
+    """
+    Write-behind memory extraction.
+
+    Graph nodes submit (user_id, namespace, message slice) and return right away.
+    Jobs of one user run one at a time in submission order, different users run
+    concurrently on the worker threads. A job still waiting for its turn absorbs
+    later submissions for the same user and namespace, so a burst of turns costs
+    one extraction over the merged messages.
+    """
+
+    def __init__(self, workers: int = 4):
+        self.submitted = 0
+        self.coalesced = 0
+        self.completed = 0
+        self.failed = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._queues: dict[str, deque[ExtractionJob]] = {}
+        self._running: set[str] = set()
+        self._lock = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="extraction")
+
+    def submit(self, user_id: str, namespace: tuple, messages: list, extract: Callable[[list], None]):
+        with self._lock:
+            self.submitted += 1
+            queue = self._queues.setdefault(user_id, deque())
+            for job in queue:
+                if job.namespace == tuple(namespace):
+                    # keeps its place in line (and its enqueue time for the lag)
+                    job.messages = merge_messages(job.messages, messages)
+                    job.extract = extract
+                    job.coalesced += 1
+                    self.coalesced += 1
+                    return
+            queue.append(ExtractionJob(user_id, tuple(namespace), list(messages), extract))
+            if user_id not in self._running:
+                self._running.add(user_id)
+                self._executor.submit(self._drain, user_id)
+
+    def _drain(self, user_id: str):
+        while True:
+            with self._lock:
+                queue = self._queues.get(user_id)
+                if not queue:
+                    self._queues.pop(user_id, None)
+                    self._running.discard(user_id)
+                    self._lock.notify_all()
+                    return
+                job = queue.popleft()
+
+            try:
+                job.extract(job.messages)
+                failed = False
+            except Exception:
+                traceback.print_exc()
+                failed = True
+
+            with self._lock:
+                lag = time.monotonic() - job.enqueued_at
+                self.last_lag = lag
+                self.max_lag = max(self.max_lag, lag)
+                if failed:
+                    self.failed += 1
+                else:
+                    self.completed += 1
+
+    def depth(self) -> int:
+        """Jobs waiting to run."""
+        with self._lock:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def lag(self) -> float:
+        """Age in seconds of the oldest job still waiting, 0 when idle."""
+        with self._lock:
+            oldest = min((q[0].enqueued_at for q in self._queues.values() if q), default=None)
+        return time.monotonic() - oldest if oldest is not None else 0.0
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every submitted job has run, False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while self._running:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._lock.wait(remaining)
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth(),
+            "lag": self.lag(),
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "completed": self.completed,
+            "failed": self.failed,
+            "last_lag": self.last_lag,
+            "max_lag": self.max_lag,
+        }
+
+
+# Shared by every studio graph running in this process
+default_queue = ExtractionQueue()
@@ -1,16 +1,30 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import requests
 import yfinance as yf
 from pprint import pformat
-from langchain_core.tools import Tool
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langchain_core.tools import StructuredTool, Tool
 from langchain_openai import ChatOpenAI
-from langchain_core.messages import SystemMessage
+from langchain_core.messages import SystemMessage, ToolMessage
 from langgraph.graph import MessagesState, START, StateGraph
-from langgraph.prebuilt import tools_condition, ToolNode
+from langgraph.prebuilt import tools_condition
+import blob_store
+import configuration
+import llm_cache
+import market_data_cache
+import node_cache
+import price_store
+import symbol_index
+import stock_features
 
 
 # Defining Tools
 ##################################################################################
 
+# Pooled connection for the remote symbol search
+alphavantage_session = requests.Session()
+
 def lookup_stock_symbol(company_name: str) -> str:
     """
     Converts a company name to its stock symbol using a financial API.
@@ -21,6 +35,11 @@ def lookup_stock_symbol(company_name: str) -> str:
     Returns:
         str: The stock symbol (e.g., 'TSLA') or an error message.
     """
+    # Local listing first, the remote API only on a miss
+    symbol = symbol_index.default_index.resolve(company_name)
+    if symbol:
+        return symbol
+
     api_url = "https://www.alphavantage.co/query"
     params = {
         "function": "SYMBOL_SEARCH",
@@ -28,16 +47,18 @@ def lookup_stock_symbol(company_name: str) -> str:
         "apikey": "your_alphavantage_api_key"
     }
     
-    response = requests.get(api_url, params=params)
+    response = alphavantage_session.get(api_url, params=params)
     data = response.json()
     
     if "bestMatches" in data and data["bestMatches"]:
-        return data["bestMatches"][0]["1. symbol"]
+        match = data["bestMatches"][0]
+        symbol_index.default_index.remember(company_name, match["1. symbol"], match["2. name"])
+        return match["1. symbol"]
     else:
         return f"Symbol not found for {company_name}."
 
 
-def fetch_stock_data_raw(stock_symbol: str) -> dict:
+def fetch_stock_data_raw(stock_symbol: str, period: str = "1mo") -> dict:
     """
     Fetches comprehensive stock data for a given symbol and returns it as a combined dictionary.
 
@@ -46,22 +67,17 @@ def fetch_stock_data_raw(stock_symbol: str) -> dict:
         period (str): The period to analyze (e.g., '1mo', '3mo', '1y').
 
     Returns:
-        dict: A dictionary combining general stock info and historical market data.
+        dict: A dictionary combining key company info and indicators computed from historical market data.
     """
-    period = "1mo"
     try:
         stock = yf.Ticker(stock_symbol)
 
         # Retrieve general stock info and historical market data
-        stock_info = stock.info  # Basic company and stock data
-        stock_history = stock.history(period=period).to_dict()  # Historical OHLCV data
+        stock_info = market_data_cache.get_stock_info(stock_symbol, stock)  # Basic company and stock data, cached
+        stock_history = price_store.get_stock_history(stock_symbol, period, stock)  # Historical OHLCV data, stored locally
 
-        # Combine both into a single dictionary
-        combined_data = {
-            "stock_symbol": stock_symbol,
-            "info": stock_info,
-            "history": stock_history
-        }
+        # Reduce both to a compact dictionary of key fields and indicators
+        combined_data = stock_features.summarize_stock(stock_symbol, stock_info, stock_history)
 
         return pformat(combined_data)
 
@@ -69,28 +85,42 @@ def fetch_stock_data_raw(stock_symbol: str) -> dict:
         return {"error": f"Error fetching stock data for {stock_symbol}: {str(e)}"}
 
 
+# Async versions: the providers are blocking, so each call runs in a worker thread
+# and several calls from one assistant turn can wait on the network at the same time
+async def alookup_stock_symbol(company_name: str) -> str:
+    return await asyncio.to_thread(lookup_stock_symbol, company_name)
+
+
+async def afetch_stock_data_raw(stock_symbol: str, period: str = "1mo") -> dict:
+    return await asyncio.to_thread(fetch_stock_data_raw, stock_symbol, period)
+
+
 # Binding tools to the LLM
 ##################################################################################
 
 # Create tool bindings with additional attributes
 lookup_stock = Tool.from_function(
     func=lookup_stock_symbol,
+    coroutine=alookup_stock_symbol,
     name="lookup_stock_symbol",
     description="Converts a company name to its stock symbol using a financial API.",
     return_direct=False  # Return result to be processed by LLM
 )
 
-fetch_stock = Tool.from_function(
+# Structured, so the LLM can ask for longer periods ('3mo', '1y', '5y') than the default month
+fetch_stock = StructuredTool.from_function(
     func=fetch_stock_data_raw,
+    coroutine=afetch_stock_data_raw,
     name="fetch_stock_data_raw",
-    description="Fetches comprehensive stock data including general info and historical market data for a given stock symbol.",
+    description="Fetches key company info and indicators (returns, volatility, drawdown, moving averages, volume trend) computed from market data over a period (default '1mo', e.g. '3mo', '1y', '5y') for a given stock symbol.",
     return_direct=False
 )
 
 toolbox = [lookup_stock, fetch_stock]
+tools_by_name = {tool.name: tool for tool in toolbox}
 
 # OPENAI_API_KEY environment variable must be set
-simple_llm = ChatOpenAI(model="gpt-4o-mini")
+simple_llm = ChatOpenAI(model="gpt-4o-mini", cache=llm_cache.for_graph("financial_advisor"))
 llm_with_tools = simple_llm.bind_tools(toolbox)
 
 
@@ -126,7 +156,81 @@ Your goal is to help users make informed financial decisions quickly and confide
 
 # Node
 def assistant(state: MessagesState):
-   return {"messages": [llm_with_tools.invoke([assistant_system_message] + state["messages"])]}
+   messages = blob_store.default_store.resolve_messages(state["messages"])
+   return {"messages": [llm_with_tools.invoke([assistant_system_message] + messages)]}
+
+
+# Runs every tool call of the last assistant message concurrently, so a turn that asks
+# about several companies takes as long as its slowest call instead of the sum of all.
+# A replay or fork that makes the same calls reuses the results (with node_cache on)
+
+# Tools are blocking, a call that missed its deadline keeps its thread until it returns
+_tool_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="tools")
+
+
+def _tool_message(tool_call: dict, content: str, status: str = "success") -> ToolMessage:
+    return ToolMessage(content=content, name=tool_call["name"], tool_call_id=tool_call["id"], status=status)
+
+
+def _tool_results(results: list, configurable: configuration.Configuration) -> dict:
+    # large results stay out of the checkpoints, the messages keep a reference
+    return {"messages": blob_store.default_store.offload_messages(results, configurable.blob_threshold)}
+
+
+@node_cache.memoize(
+    key=node_cache.tool_calls_of, ttl=5 * 60, should_cache=node_cache.no_tool_errors, on_hit=node_cache.with_tool_call_ids
+)
+def tools(state: MessagesState, config: RunnableConfig):
+    configurable = configuration.Configuration.from_runnable_config(config)
+
+    def run(tool_call: dict) -> ToolMessage:
+        tool = tools_by_name.get(tool_call["name"])
+        if tool is None:
+            return _tool_message(tool_call, f"Error: {tool_call['name']} is not a valid tool.", "error")
+        try:
+            result = _tool_executor.submit(tool.invoke, tool_call["args"]).result(timeout=configurable.tool_timeout)
+            return _tool_message(tool_call, str(result))
+
+        except FutureTimeoutError:
+            content = f"Error: {tool.name} did not finish within {configurable.tool_timeout}s."
+        except Exception as e:
+            content = f"Error: {str(e)}"
+        return _tool_message(tool_call, content, "error")
+
+    tool_calls = state["messages"][-1].tool_calls
+    with ThreadPoolExecutor(max_workers=max(1, configurable.tool_concurrency), thread_name_prefix="tool-calls") as pool:
+        results = list(pool.map(run, tool_calls))
+    return _tool_results(results, configurable)
+
+
+@node_cache.memoize(
+    key=node_cache.tool_calls_of, ttl=5 * 60, should_cache=node_cache.no_tool_errors, on_hit=node_cache.with_tool_call_ids,
+    name="tools"
+)
+async def atools(state: MessagesState, config: RunnableConfig):
+    configurable = configuration.Configuration.from_runnable_config(config)
+    semaphore = asyncio.Semaphore(max(1, configurable.tool_concurrency))
+
+    async def run(tool_call: dict) -> ToolMessage:
+        tool = tools_by_name.get(tool_call["name"])
+        if tool is None:
+            return _tool_message(tool_call, f"Error: {tool_call['name']} is not a valid tool.", "error")
+
+        async with semaphore:
+            try:
+                result = await asyncio.wait_for(tool.ainvoke(tool_call["args"]), timeout=configurable.tool_timeout)
+                return _tool_message(tool_call, str(result))
+
+            except asyncio.TimeoutError:
+                content = f"Error: {tool.name} did not finish within {configurable.tool_timeout}s."
+            except Exception as e:
+                content = f"Error: {str(e)}"
+
+        return _tool_message(tool_call, content, "error")
+
+    tool_calls = state["messages"][-1].tool_calls
+    results = list(await asyncio.gather(*(run(call) for call in tool_calls)))
+    return _tool_results(results, configurable)
 
 
 # Defining Graph
@@ -136,7 +240,7 @@ builder = StateGraph(MessagesState)
 
 # Define nodes: these do the work
 builder.add_node("assistant", assistant)
-builder.add_node("tools", ToolNode(toolbox))
+builder.add_node("tools", RunnableLambda(tools, afunc=atools, name="tools"))
 
 # Define edges: these determine how the control flow moves
 builder.add_edge(START, "assistant")
@@ -1,17 +1,29 @@
 import requests
 import yfinance as yf
 from pprint import pformat
-from langchain_core.tools import Tool
+from langchain_core.tools import StructuredTool, Tool
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import MessagesState, START, StateGraph
 from langgraph.prebuilt import tools_condition, ToolNode
+import intent_classifier
+import blob_store
+import configuration
+import llm_cache
+import market_data_cache
+import node_cache
+import price_store
+import symbol_index
 from langgraph.errors import NodeInterrupt
 
 
 # Defining Tools
 ##################################################################################
 
+# Pooled connection for the remote symbol search
+alphavantage_session = requests.Session()
+
 def lookup_stock_symbol(company_name: str) -> str:
     """
     Converts a company name to its stock symbol using a financial API.
@@ -22,6 +34,11 @@ def lookup_stock_symbol(company_name: str) -> str:
     Returns:
         str: The stock symbol (e.g., 'TSLA') or an error message.
     """
+    # Local listing first, the remote API only on a miss
+    symbol = symbol_index.default_index.resolve(company_name)
+    if symbol:
+        return symbol
+
     api_url = "https://www.alphavantage.co/query"
     params = {
         "function": "SYMBOL_SEARCH",
@@ -29,16 +46,18 @@ def lookup_stock_symbol(company_name: str) -> str:
         "apikey": "your_alphavantage_api_key"
     }
     
-    response = requests.get(api_url, params=params)
+    response = alphavantage_session.get(api_url, params=params)
     data = response.json()
     
     if "bestMatches" in data and data["bestMatches"]:
-        return data["bestMatches"][0]["1. symbol"]
+        match = data["bestMatches"][0]
+        symbol_index.default_index.remember(company_name, match["1. symbol"], match["2. name"])
+        return match["1. symbol"]
     else:
         return f"Symbol not found for {company_name}."
 
 
-def fetch_stock_data_raw(stock_symbol: str) -> dict:
+def fetch_stock_data_raw(stock_symbol: str, period: str = "1mo") -> dict:
     """
     Fetches comprehensive stock data for a given symbol and returns it as a combined dictionary.
 
@@ -49,13 +68,12 @@ def fetch_stock_data_raw(stock_symbol: str) -> dict:
     Returns:
         dict: A dictionary combining general stock info and historical market data.
     """
-    period = "1mo"
     try:
         stock = yf.Ticker(stock_symbol)
 
         # Retrieve general stock info and historical market data
-        stock_info = stock.info  # Basic company and stock data
-        stock_history = stock.history(period=period).to_dict()  # Historical OHLCV data
+        stock_info = market_data_cache.get_stock_info(stock_symbol, stock)  # Basic company and stock data, cached
+        stock_history = price_store.get_stock_history(stock_symbol, period, stock).to_dict()  # Historical OHLCV data, stored locally
 
         # Combine both into a single dictionary
         combined_data = {
@@ -81,17 +99,18 @@ lookup_stock = Tool.from_function(
     return_direct=False  # Return result to be processed by LLM
 )
 
-fetch_stock = Tool.from_function(
+# Structured, so the LLM can ask for longer periods ('3mo', '1y', '5y') than the default month
+fetch_stock = StructuredTool.from_function(
     func=fetch_stock_data_raw,
     name="fetch_stock_data_raw",
-    description="Fetches comprehensive stock data including general info and historical market data for a given stock symbol.",
+    description="Fetches comprehensive stock data including general info and historical market data over a period (default '1mo', e.g. '3mo', '1y', '5y') for a given stock symbol.",
     return_direct=False
 )
 
 toolbox = [lookup_stock, fetch_stock]
 
 # OPENAI_API_KEY environment variable must be set
-simple_llm = ChatOpenAI(model="gpt-4o-mini")
+simple_llm = ChatOpenAI(model="gpt-4o-mini", cache=llm_cache.for_graph("financial_advisor_intent_check"))
 llm_with_tools = simple_llm.bind_tools(toolbox)
 
 
@@ -127,11 +146,23 @@ Your goal is to help users make informed financial decisions quickly and confide
 
 # Node
 def assistant(state: MessagesState):
-   return {"messages": [llm_with_tools.invoke([assistant_system_message] + state["messages"])]}
+   messages = blob_store.default_store.resolve_messages(state["messages"])
+   return {"messages": [llm_with_tools.invoke([assistant_system_message] + messages)]}
 
-def intent_check(state: MessagesState):
-    user_request = state["messages"][-1].content
 
+tool_node = ToolNode(toolbox)
+
+# Large tool results stay out of the checkpoints, the messages keep a reference.
+# A replay or fork that makes the same calls reuses the results (with node_cache on)
+@node_cache.memoize(
+    key=node_cache.tool_calls_of, ttl=5 * 60, should_cache=node_cache.no_tool_errors, on_hit=node_cache.with_tool_call_ids
+)
+def tools(state: MessagesState, config: RunnableConfig):
+    threshold = configuration.Configuration.from_runnable_config(config).blob_threshold
+    result = tool_node.invoke(state, config)
+    return {"messages": blob_store.default_store.offload_messages(result["messages"], threshold)}
+
+def llm_intent_check(user_request: str) -> bool:
     financial_check_prompt = f"""
     You are an intent classifier. Your task is to determine if the user's request is specifically related to finance, investments, or financial advice.
 
@@ -145,8 +176,18 @@ def intent_check(state: MessagesState):
     Respond with only "True" or "False" and nothing else.
     """
 
-    llm_response = llm_with_tools.invoke([HumanMessage(content=financial_check_prompt)]).content
-    is_financial_question = llm_response.strip().lower() == 'true'
+    # no tool schemas needed for a True/False answer
+    llm_response = simple_llm.invoke([HumanMessage(content=financial_check_prompt)]).content
+    return llm_response.strip().lower() == 'true'
+
+
+# Local classifier decides the clear cases, only uncertain requests reach the LLM
+intent_gate = intent_classifier.IntentGate(intent_classifier.train_default_classifier())
+
+def intent_check(state: MessagesState):
+    user_request = state["messages"][-1].content
+
+    is_financial_question = intent_gate.is_financial(user_request, escalate=llm_intent_check)
 
     if not is_financial_question:
         raise NodeInterrupt("Please ask a question related to financial advice.")
@@ -162,7 +203,7 @@ builder = StateGraph(MessagesState)
 # Define nodes: these do the work
 builder.add_node("intent_check", intent_check)
 builder.add_node("assistant", assistant)
-builder.add_node("tools", ToolNode(toolbox))
+builder.add_node("tools", tools)
 
 # Define edges: these determine how the control flow moves
 builder.add_edge(START, "intent_check")
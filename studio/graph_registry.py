@@ -0,0 +1,53 @@
+# Lazy entry points for the graphs registered in langgraph.json.
+# Graph modules import their dependencies and compile at import time, so the server
+# points at these factories instead: a module is imported on the first use of its graph.
+import importlib
+import threading
+
+from langchain_core.runnables import RunnableConfig
+
+# graph id -> "module:attribute"
+GRAPHS = {
+    "chatbot": "chatbot:graph",
+    "financial_advisor": "financial_advisor:graph",
+    "financial_advisor_breakpoint": "financial_advisor_breakpoint:graph",
+    "financial_advisor_intent_check": "financial_advisor_intent_check:graph",
+    "map_reduce": "map_reduce:graph",
+    "chatbot_long_term_memory": "chatbot_long_term_memory:graph",
+    "directive_memory_bot": "directive_memory_bot:graph",
+    "dev_mentor": "devmentor:graph",
+}
+
+_loaded = {}
+_lock = threading.Lock()
+
+
+def load_graph(graph_id: str):
+    """Import and compile a registered graph on first use."""
+    graph = _loaded.get(graph_id)
+    if graph is None:
+        with _lock:
+            graph = _loaded.get(graph_id)
+            if graph is None:
+                module_name, attribute = GRAPHS[graph_id].split(":")
+                graph = getattr(importlib.import_module(module_name), attribute)
+                _loaded[graph_id] = graph
+    return graph
+
+
+def _factory(graph_id: str):
+    def make_graph(config: RunnableConfig):
+        return load_graph(graph_id)
+
+    make_graph.__name__ = graph_id
+    return make_graph
+
+
+chatbot = _factory("chatbot")
+financial_advisor = _factory("financial_advisor")
+financial_advisor_breakpoint = _factory("financial_advisor_breakpoint")
+financial_advisor_intent_check = _factory("financial_advisor_intent_check")
+map_reduce = _factory("map_reduce")
+chatbot_long_term_memory = _factory("chatbot_long_term_memory")
+directive_memory_bot = _factory("directive_memory_bot")
+dev_mentor = _factory("dev_mentor")
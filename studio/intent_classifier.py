@@ -0,0 +1,144 @@
+import csv
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import numpy as np
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9&$%]+", text.lower()))
+
+
+def features(text: str) -> list[str]:
+    words = normalize_text(text).split()
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class IntentClassifier:
+    """
+    TF-IDF over word unigrams and bigrams followed by logistic regression.
+
+    Small enough to train at startup on the bundled examples, scores a message
+    in microseconds without leaving the process.
+    """
+
+    def __init__(self, l2: float = 1e-3, epochs: int = 400, learning_rate: float = 2.0):
+        self.l2 = l2
+        self.epochs = epochs
+        self.learning_rate = learning_rate
+        self.vocabulary: dict[str, int] = {}
+        self.idf = np.zeros(0)
+        self.weights = np.zeros(0)
+        self.bias = 0.0
+
+    def fit(self, texts: list[str], labels: list[int]) -> "IntentClassifier":
+        documents = [set(features(text)) for text in texts]
+        self.vocabulary = {term: i for i, term in enumerate(sorted(set().union(*documents)))}
+
+        document_frequency = np.zeros(len(self.vocabulary))
+        for document in documents:
+            document_frequency[[self.vocabulary[t] for t in document]] += 1
+        self.idf = np.log((1 + len(texts)) / (1 + document_frequency)) + 1
+
+        x = np.vstack([self._vectorize(text) for text in texts])
+        y = np.asarray(labels, dtype=float)
+        self.weights = np.zeros(x.shape[1])
+        self.bias = 0.0
+
+        # plain batch gradient descent, the training set is tiny
+        for _ in range(self.epochs):
+            error = self._sigmoid(x @ self.weights + self.bias) - y
+            self.weights -= self.learning_rate * (x.T @ error / len(y) + self.l2 * self.weights)
+            self.bias -= self.learning_rate * error.mean()
+
+        return self
+
+    def predict_proba(self, text: str) -> float:
+        """Probability that the text is a finance-related request."""
+        return float(self._sigmoid(self._vectorize(text) @ self.weights + self.bias))
+
+    def _vectorize(self, text: str) -> np.ndarray:
+        vector = np.zeros(len(self.vocabulary))
+        for term in features(text):
+            index = self.vocabulary.get(term)
+            if index is not None:
+                vector[index] += 1
+        vector *= self.idf
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    @staticmethod
+    def _sigmoid(z):
+        return 1 / (1 + np.exp(-z))
+
+
+class IntentGate:
+    """
+    Tiered finance-intent check.
+
+    1. Verdicts cached by normalized text.
+    2. The local classifier decides when its score is outside [low, high].
+    3. Everything else is escalated to the given LLM check, and the verdict is cached.
+    """
+
+    def __init__(self, classifier: IntentClassifier, low: float = 0.3, high: float = 0.7, cache_size: int = 4096):
+        self.classifier = classifier
+        self.low = low
+        self.high = high
+        self.cache_size = cache_size
+        self.requests = 0
+        self.cache_hits = 0
+        self.local_decisions = 0
+        self.escalations = 0
+        self._cache: OrderedDict[str, bool] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def is_financial(self, text: str, escalate: Callable[[str], bool]) -> bool:
+        key = normalize_text(text)
+        with self._lock:
+            self.requests += 1
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return self._cache[key]
+
+        score = self.classifier.predict_proba(text)
+        if score >= self.high or score <= self.low:
+            verdict = score >= self.high
+            with self._lock:
+                self.local_decisions += 1
+        else:
+            verdict = escalate(text)
+            with self._lock:
+                self.escalations += 1
+
+        with self._lock:
+            self._cache[key] = verdict
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return verdict
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "local_decisions": self.local_decisions,
+            "escalations": self.escalations,
+            "escalation_rate": self.escalations / self.requests if self.requests else 0.0,
+        }
+
+
+def load_examples(path: str) -> tuple[list[str], list[int]]:
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    return [row["text"] for row in rows], [int(row["is_financial"]) for row in rows]
+
+
+def train_default_classifier(path: Optional[str] = None) -> IntentClassifier:
+    path = path or os.environ.get(
+        "INTENT_EXAMPLES", os.path.join(os.path.dirname(__file__), "data", "intent_examples.csv")
+    )
+    return IntentClassifier().fit(*load_examples(path))
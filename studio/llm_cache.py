@@ -0,0 +1,267 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+
+DEFAULT_TTL = 24 * 60 * 60  # seconds
+DEFAULT_MAX_ENTRIES = 100_000
+
+# readwrite: serve hits, store misses; record: always call the model and store the
+# response; replay: serve from the cache only (entries never expire), a miss is an error
+MODES = ("readwrite", "record", "replay")
+
+# Message fields that differ between two calls with the same prompt
+_VOLATILE_FIELDS = ("id", "response_metadata", "usage_metadata")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    The prompt as langchain serialized it (a JSON list of messages), without what
+    varies between otherwise identical conversations: message ids, provider
+    metadata, token usage, and tool call ids (numbered in order of appearance).
+    """
+    call_ids: dict[str, str] = {}
+
+    def call_id(value: Optional[str]) -> Optional[str]:
+        if value is None:
+            return None
+        return call_ids.setdefault(value, f"call_{len(call_ids)}")
+
+    def normalize(node: Any) -> Any:
+        if isinstance(node, list):
+            return [normalize(item) for item in node]
+        if not isinstance(node, dict):
+            return node
+        if node.get("type") == "constructor" and isinstance(node.get("kwargs"), dict):
+            kwargs = {k: v for k, v in node["kwargs"].items() if k not in _VOLATILE_FIELDS}
+            for field in ("tool_calls", "invalid_tool_calls"):
+                if field in kwargs:
+                    kwargs[field] = [{**call, "id": call_id(call.get("id"))} for call in kwargs[field]]
+            if "tool_calls" in kwargs.get("additional_kwargs", {}):
+                kwargs["additional_kwargs"] = {**kwargs["additional_kwargs"], "tool_calls": [
+                    {**call, "id": call_id(call.get("id"))} for call in kwargs["additional_kwargs"]["tool_calls"]
+                ]}
+            if "tool_call_id" in kwargs:
+                kwargs["tool_call_id"] = call_id(kwargs["tool_call_id"])
+            return {**node, "kwargs": normalize(kwargs)}
+        return {k: normalize(v) for k, v in node.items()}
+
+    try:
+        return json.dumps(normalize(json.loads(prompt)), sort_keys=True)
+    except ValueError:  # not JSON, e.g. a completion model's text prompt
+        return prompt
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """llm_string covers the model, its parameters and the bound tool schemas."""
+    return hashlib.sha256(llm_string.encode() + b"\0" + normalize_prompt(prompt).encode()).hexdigest()
+
+
+def _dump_generations(generations: Sequence[Generation]) -> str:
+    return json.dumps([
+        {"message": message_to_dict(g.message), "generation_info": g.generation_info}
+        if isinstance(g, ChatGeneration) else {"text": g.text, "generation_info": g.generation_info}
+        for g in generations
+    ])
+
+
+def _load_generations(value: str) -> list[Generation]:
+    return [
+        ChatGeneration(message=messages_from_dict([g["message"]])[0], generation_info=g["generation_info"])
+        if "message" in g else Generation(text=g["text"], generation_info=g["generation_info"])
+        for g in json.loads(value)
+    ]
+
+
+class ResponseStore:
+    """
+    Model responses by cache key: an in-memory LRU in front of a SQLite table.
+
+    Entries expire after their ttl; the table keeps at most max_entries rows, the
+    oldest go first. Safe to share between threads, and between processes through
+    the SQLite file.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_items: int = 1024, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_items = max_items
+        self.max_entries = max_entries
+        self._memory: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._db = None
+
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, graph TEXT NOT NULL, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS llm_cache_created_at ON llm_cache (created_at)")
+
+    def get(self, key: str, include_expired: bool = False) -> Optional[str]:
+        now = float("-inf") if include_expired else time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[0] > now:
+                self._memory.move_to_end(key)
+                return entry[1]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM llm_cache WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                if row:
+                    self._remember(key, row[0], row[1])
+                    return row[0]
+            return None
+
+    def set(self, key: str, value: str, ttl: float, graph: str = ""):
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now + ttl)
+            if self._db is None:
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, graph, value, created_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (key, graph, value, now, now + ttl)
+            )
+            self._writes += 1
+            if self._writes % 100 == 0:
+                self._prune(now)
+
+    def clear(self, graph: Optional[str] = None):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                if graph is None:
+                    self._db.execute("DELETE FROM llm_cache")
+                else:
+                    self._db.execute("DELETE FROM llm_cache WHERE graph = ?", (graph,))
+
+    def purge_expired(self):
+        with self._lock:
+            self._prune(time.time())
+
+    def __len__(self) -> int:
+        with self._lock:
+            if self._db is None:
+                return len(self._memory)
+            return self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def _prune(self, now: float):
+        for key in [k for k, (expires_at, _) in self._memory.items() if expires_at <= now]:
+            del self._memory[key]
+        if self._db is not None:
+            self._db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+            self._db.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def _remember(self, key: str, value: str, expires_at: float):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+
+class GraphCache(BaseCache):
+    """
+    The langchain cache of one graph's models (ChatOpenAI(cache=...)), backed by a
+    shared ResponseStore. Counts its hits and misses.
+    """
+
+    def __init__(self, graph: str, store: ResponseStore, mode: str = "readwrite", ttl: float = DEFAULT_TTL):
+        if mode not in MODES:
+            raise ValueError(f"Unknown LLM cache mode {mode!r}, expected one of {MODES}")
+        self.graph = graph
+        self.store = store
+        self.mode = mode
+        self.ttl = ttl
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[list[Generation]]:
+        if self.mode == "record":
+            self._count("miss")
+            return None
+        key = cache_key(prompt, llm_string)
+        value = self.store.get(key, include_expired=self.mode == "replay")
+        if value is None:
+            self._count("miss")
+            if self.mode == "replay":
+                raise LookupError(f"No recorded LLM response for graph {self.graph!r} (key {key[:12]})")
+            return None
+        self._count("hit")
+        return _load_generations(value)
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]):
+        if self.mode == "replay":
+            return
+        self.store.set(cache_key(prompt, llm_string), _dump_generations(return_val), self.ttl, self.graph)
+
+    def clear(self, **kwargs: Any):
+        self.store.clear(self.graph)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits, misses = self._counts["hit"], self._counts["miss"]
+        return {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses) if hits + misses else 0.0}
+
+    def _count(self, outcome: str):
+        with self._lock:
+            self._counts[outcome] += 1
+
+
+def _default_store() -> ResponseStore:
+    # LLM_CACHE_PATH="" keeps the responses in memory only
+    path = os.environ.get("LLM_CACHE_PATH", os.path.join(os.path.dirname(__file__), ".cache", "llm_cache.sqlite"))
+    return ResponseStore(path, max_entries=int(os.environ.get("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)))
+
+
+# Shared by every studio graph running in this process, opened when the first graph opts in
+default_store: Optional[ResponseStore] = None
+_graph_caches: dict[str, GraphCache] = {}
+_graph_caches_lock = threading.Lock()
+
+
+def enabled_graphs() -> set[str]:
+    # LLM_CACHE_GRAPHS="chatbot,map_reduce" opts graphs in (ids from langgraph.json), "*" all of them
+    return {graph.strip() for graph in os.environ.get("LLM_CACHE_GRAPHS", "").split(",") if graph.strip()}
+
+
+def for_graph(graph: str) -> Optional[GraphCache]:
+    """
+    The response cache for the models of a graph, None (no caching) unless the
+    graph is opted in. Mode and ttl come from LLM_CACHE_MODE and LLM_CACHE_TTL.
+    """
+    enabled = enabled_graphs()
+    if graph not in enabled and "*" not in enabled:
+        return None
+    global default_store
+    with _graph_caches_lock:
+        cache = _graph_caches.get(graph)
+        if cache is None:
+            if default_store is None:
+                default_store = _default_store()
+            cache = GraphCache(graph, default_store, mode=os.environ.get("LLM_CACHE_MODE", "readwrite"),
+                               ttl=float(os.environ.get("LLM_CACHE_TTL", DEFAULT_TTL)))
+            _graph_caches[graph] = cache
+        return cache
+
+
+def stats() -> dict:
+    """Hits, misses and hit rate per opted-in graph."""
+    with _graph_caches_lock:
+        caches = dict(_graph_caches)
+    return {graph: cache.stats() for graph, cache in sorted(caches.items())}
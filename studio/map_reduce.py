@@ -1,26 +1,43 @@
 from typing_extensions import TypedDict
 from langchain_openai import ChatOpenAI
+import asyncio
 import operator
-from typing import Annotated
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Annotated, Optional
 from pydantic import BaseModel
 import yfinance as yf
 from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langgraph.config import get_stream_writer
 from langgraph.graph import END, StateGraph, START
+import blob_store
+import configuration
+import llm_cache
+import market_data_cache
+import node_cache
+import price_store
+import stock_features
 
 class InvestmentAdvisorState(TypedDict):
     financial_area: str
     stock_number: int
     stock_tickers: list[str]
     stock_details: Annotated[list, operator.add]
+    failed_tickers: Annotated[list, operator.add]  # tickers that errored or hit the deadline
+    stock_analyses: list[str]  # tree reduce: one short analysis per ticker
+    group_rankings: list[str]  # tree reduce: rankings of fixed-size groups of analyses
     recommendation: str
 
-llm = ChatOpenAI(model="gpt-4o-mini")
+llm = ChatOpenAI(model="gpt-4o-mini", cache=llm_cache.for_graph("map_reduce"))
 
 
 class StockTickers(BaseModel):
     stock_tickers: list[str]
 
 
+@node_cache.memoize(fields=["financial_area", "stock_number"])
 def generate_list_of_stocks(state: InvestmentAdvisorState):
     prompt = f"""
     You are an experienced financial analyst. 
@@ -36,31 +53,192 @@ def generate_list_of_stocks(state: InvestmentAdvisorState):
 class StockState(TypedDict):
     ticker: str
 
-def fetch_stock_details(state: StockState) -> dict:
+def load_stock_data(stock_symbol: str) -> dict:
+    """Blocking call to the market data provider for one ticker."""
     period = "1mo"
-    stock_symbol = state["ticker"]
-    try:
-        stock = yf.Ticker(stock_symbol)
+    stock = yf.Ticker(stock_symbol)
+
+    # Retrieve general stock info and historical market data
+    stock_info = market_data_cache.get_stock_info(stock_symbol, stock)  # Basic company and stock data, cached
+    stock_history = price_store.get_stock_history(stock_symbol, period, stock)  # Historical OHLCV data, stored locally
+
+    # Combine both into a single dictionary
+    return {
+        "stock_symbol": stock_symbol,
+        "info": stock_info,
+        "history": stock_history
+    }
+
+
+# Info lookups of batch mode, shared by the batches running at the same time so they
+# don't multiply the requests in flight
+_info_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="market-data-info")
+
+
+def load_stocks_data(stock_symbols: list[str]) -> dict[str, dict]:
+    """
+    Blocking batched call to the market data provider.
+
+    History for all tickers comes from the local price store, which fetches what
+    it is missing in bulk downloads; info lookups share one session and run in a
+    small shared pool. Tickers without data are left out of the result.
+    """
+    period = "1mo"
+    stocks = yf.Tickers(" ".join(stock_symbols))
 
-        # Retrieve general stock info and historical market data
-        stock_info = stock.info  # Basic company and stock data
-        stock_history = stock.history(period=period).to_dict()  # Historical OHLCV data
+    histories = price_store.get_stock_histories(stock_symbols, period)  # Historical OHLCV data, stored locally
+    def lookup_info(stock_symbol: str):
+        try:
+            return market_data_cache.get_stock_info(stock_symbol, stocks.tickers[stock_symbol.upper()])
+        except Exception:
+            return None
 
-        # Combine both into a single dictionary
-        stock = {
+    infos = dict(zip(stock_symbols, _info_executor.map(lookup_info, stock_symbols)))
+
+    result = {}
+    for stock_symbol in stock_symbols:
+        stock_history = histories[stock_symbol]
+        if stock_history.empty or infos[stock_symbol] is None:
+            continue
+
+        result[stock_symbol] = {
             "stock_symbol": stock_symbol,
-            "info": stock_info,
+            "info": infos[stock_symbol],
             "history": stock_history
         }
-        
-        return {"stock_details": [str(stock)]}
-        
-    except Exception as e:
-        return {"error": f"Error fetching stock data for {stock_symbol}: {str(e)}"}
+
+    return result
+
+
+# yfinance is blocking, so fetches run in their own pool instead of the loop's default executor,
+# a ticker that missed its deadline keeps its thread until the provider answers
+_fetch_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="market-data")
+
+# Semaphores shared by all parallel fetch_stock_details tasks, one per event loop and limit
+# (ainvoke) or per limit (invoke), so runs still holding one keep their cap when another
+# run asks for a different fetch_concurrency
+_fetch_slots = weakref.WeakKeyDictionary()
+_fetch_thread_slots: dict[int, threading.BoundedSemaphore] = {}
+_fetch_slots_lock = threading.Lock()
+
+def _fetch_semaphore(limit: int) -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    with _fetch_slots_lock:
+        return _fetch_slots.setdefault(loop, {}).setdefault(limit, asyncio.Semaphore(limit))
+
+
+def _fetch_thread_semaphore(limit: int) -> threading.BoundedSemaphore:
+    with _fetch_slots_lock:
+        return _fetch_thread_slots.setdefault(limit, threading.BoundedSemaphore(limit))
+
+
+def _stock_details(stock: dict, configurable: configuration.Configuration) -> dict:
+    # compact indicators instead of the raw info/OHLCV dump keep the reduce prompt small
+    details = str(stock_features.summarize_stock(**stock))
+    return {"stock_details": [blob_store.default_store.offload(details, configurable.blob_threshold)]}
+
+
+def fetch_stock_details(state: StockState, config: RunnableConfig) -> dict:
+    configurable = configuration.Configuration.from_runnable_config(config)
+    stock_symbol = state["ticker"]
+
+    with _fetch_thread_semaphore(configurable.fetch_concurrency):
+        try:
+            # the deadline only bounds how long this ticker may hold up the superstep
+            stock = _fetch_executor.submit(load_stock_data, stock_symbol).result(timeout=configurable.fetch_timeout)
+            return _stock_details(stock, configurable)
+
+        except FutureTimeoutError:
+            return {"failed_tickers": [f"{stock_symbol}: no data within {configurable.fetch_timeout}s"]}
+
+        except Exception as e:
+            return {"failed_tickers": [f"{stock_symbol}: {str(e)}"]}
+
+
+async def afetch_stock_details(state: StockState, config: RunnableConfig) -> dict:
+    configurable = configuration.Configuration.from_runnable_config(config)
+    stock_symbol = state["ticker"]
+
+    async with _fetch_semaphore(configurable.fetch_concurrency):
+        try:
+            # the deadline only bounds how long this ticker may hold up the superstep
+            loop = asyncio.get_running_loop()
+            stock = await asyncio.wait_for(
+                loop.run_in_executor(_fetch_executor, load_stock_data, stock_symbol),
+                timeout=configurable.fetch_timeout
+            )
+            return _stock_details(stock, configurable)
+
+        except asyncio.TimeoutError:
+            return {"failed_tickers": [f"{stock_symbol}: no data within {configurable.fetch_timeout}s"]}
+
+        except Exception as e:
+            return {"failed_tickers": [f"{stock_symbol}: {str(e)}"]}
+
+
+def _batches(stock_symbols: list[str], size: int) -> list[list[str]]:
+    return [stock_symbols[i:i + size] for i in range(0, len(stock_symbols), size)]
+
+
+def _batch_details(fetched: list[tuple[list[str], dict, str]], configurable: configuration.Configuration) -> dict:
+    # split the batches back into one stock_details entry per ticker, a failed batch only fails its own tickers
+    stock_details, failed_tickers = [], []
+    for stock_symbols, stocks, error in fetched:
+        for s in stock_symbols:
+            if s in stocks:
+                stock_details += _stock_details(stocks[s], configurable)["stock_details"]
+            else:
+                failed_tickers.append(f"{s}: {error or 'no data returned'}")
+    return {"stock_details": stock_details, "failed_tickers": failed_tickers}
+
+
+def fetch_stock_details_batch(state: InvestmentAdvisorState, config: RunnableConfig) -> dict:
+    configurable = configuration.Configuration.from_runnable_config(config)
+    semaphore = _fetch_thread_semaphore(configurable.fetch_concurrency)
+
+    def fetch(stock_symbols: list[str]) -> tuple[list[str], dict, str]:
+        with semaphore:
+            try:
+                stocks = _fetch_executor.submit(load_stocks_data, stock_symbols).result(timeout=configurable.fetch_timeout)
+                return stock_symbols, stocks, ""
+            except FutureTimeoutError:
+                return stock_symbols, {}, f"no data within {configurable.fetch_timeout}s"
+            except Exception as e:
+                return stock_symbols, {}, str(e)
+
+    batches = _batches(state["stock_tickers"], configurable.fetch_batch_size)
+    with ThreadPoolExecutor(max_workers=len(batches) or 1, thread_name_prefix="market-data-batch") as pool:
+        return _batch_details(list(pool.map(fetch, batches)), configurable)
+
+
+async def afetch_stock_details_batch(state: InvestmentAdvisorState, config: RunnableConfig) -> dict:
+    configurable = configuration.Configuration.from_runnable_config(config)
+    semaphore = _fetch_semaphore(configurable.fetch_concurrency)
+    loop = asyncio.get_running_loop()
+
+    async def fetch(stock_symbols: list[str]) -> tuple[list[str], dict, str]:
+        async with semaphore:
+            try:
+                stocks = await asyncio.wait_for(
+                    loop.run_in_executor(_fetch_executor, load_stocks_data, stock_symbols),
+                    timeout=configurable.fetch_timeout
+                )
+                return stock_symbols, stocks, ""
+            except asyncio.TimeoutError:
+                return stock_symbols, {}, f"no data within {configurable.fetch_timeout}s"
+            except Exception as e:
+                return stock_symbols, {}, str(e)
+
+    batches = _batches(state["stock_tickers"], configurable.fetch_batch_size)
+    return _batch_details(list(await asyncio.gather(*(fetch(b) for b in batches))), configurable)
 
 
 def generate_stock_recommendations(state: InvestmentAdvisorState):
-    financial_data = "\n\n\n".join(state["stock_details"])
+    financial_data = "\n\n\n".join(blob_store.default_store.resolve(d) for d in state["stock_details"])
+
+    failed_tickers = state.get("failed_tickers", [])
+    if failed_tickers:
+        financial_data += "\n\n\nNo data could be retrieved for (do not rank these):\n" + "\n".join(failed_tickers)
 
     prompt = f"""
     You are a professional investment advisor.
@@ -89,12 +267,154 @@ def generate_stock_recommendations(state: InvestmentAdvisorState):
     return {"recommendation": recommendation.content}
 
 
+# Tree reduce
+# Analyze every company on its own, rank the analyses in fixed-size groups,
+# then merge the group rankings, so no single prompt grows with stock_number.
+
+def _analysis_prompt(stock_details: str) -> str:
+    return f"""
+        You are a professional investment advisor.
+
+        Below is the financial data of one company:
+
+        {blob_store.default_store.resolve(stock_details)}
+
+        In at most 80 words, write:
+        - The ticker and company name on the first line
+        - A brief description
+        - Why it may or may not be a good investment, based only on the data above
+        """
+
+
+def analyze_stocks(state: InvestmentAdvisorState, config: RunnableConfig):
+    configurable = configuration.Configuration.from_runnable_config(config)
+    writer = get_stream_writer()
+
+    def analyze(stock_details: str) -> str:
+        response = llm.invoke([HumanMessage(content=_analysis_prompt(stock_details))], config)
+        # stream each analysis to custom-mode subscribers as soon as it is ready
+        writer({"stock_analysis": response.content})
+        return response.content
+
+    with ThreadPoolExecutor(max_workers=configurable.reduce_concurrency, thread_name_prefix="analyze") as pool:
+        stock_analyses = list(pool.map(analyze, state["stock_details"]))
+
+    return {"stock_analyses": stock_analyses}
+
+
+async def aanalyze_stocks(state: InvestmentAdvisorState, config: RunnableConfig):
+    configurable = configuration.Configuration.from_runnable_config(config)
+    writer = get_stream_writer()
+    semaphore = asyncio.Semaphore(configurable.reduce_concurrency)
+
+    async def analyze(stock_details: str) -> str:
+        async with semaphore:
+            response = await llm.ainvoke([HumanMessage(content=_analysis_prompt(stock_details))])
+
+        # stream each analysis to custom-mode subscribers as soon as it is ready
+        writer({"stock_analysis": response.content})
+        return response.content
+
+    stock_analyses = await asyncio.gather(*(analyze(d) for d in state["stock_details"]))
+
+    return {"stock_analyses": list(stock_analyses)}
+
+
+def _rank_prompt(items: list[str], final: bool) -> str:
+    entries = "\n\n".join(items)
+
+    if final:
+        task = """Rank all companies from best to worst in terms of investment potential.
+        Return the result as a sorted list (highest priority first), where each item includes:
+        - Rank (starting from 1)
+        - Ticker
+        - Company name
+        - Short description
+        - Reason for its ranking"""
+    else:
+        task = """Rank all companies from best to worst in terms of investment potential.
+        Return only a sorted list (highest priority first) with one line per company:
+        ticker, company name and a reason for its position in at most 25 words."""
+
+    return f"""
+    You are a professional investment advisor.
+
+    Below are analyses or partial rankings of companies (consider only companies from the list below):
+
+    {entries}
+
+    {task}
+    """
+
+
+def _rank_group(items: list[str], final: bool, config: Optional[RunnableConfig] = None) -> str:
+    return llm.invoke([HumanMessage(content=_rank_prompt(items, final))], config).content
+
+
+async def _arank_group(items: list[str], final: bool) -> str:
+    response = await llm.ainvoke([HumanMessage(content=_rank_prompt(items, final))])
+    return response.content
+
+
+def rank_stock_groups(state: InvestmentAdvisorState, config: RunnableConfig):
+    configurable = configuration.Configuration.from_runnable_config(config)
+    group_size = configurable.reduce_group_size
+
+    # rank groups in parallel and repeat on the group rankings until one group is left
+    rankings = state["stock_analyses"]
+    with ThreadPoolExecutor(max_workers=8, thread_name_prefix="rank") as pool:
+        while len(rankings) > group_size:
+            groups = [rankings[i:i + group_size] for i in range(0, len(rankings), group_size)]
+            rankings = list(pool.map(lambda g: _rank_group(g, final=False, config=config), groups))
+
+    return {"group_rankings": rankings}
+
+
+async def arank_stock_groups(state: InvestmentAdvisorState, config: RunnableConfig):
+    configurable = configuration.Configuration.from_runnable_config(config)
+    group_size = configurable.reduce_group_size
+
+    # rank groups in parallel and repeat on the group rankings until one group is left
+    rankings = state["stock_analyses"]
+    while len(rankings) > group_size:
+        groups = [rankings[i:i + group_size] for i in range(0, len(rankings), group_size)]
+        rankings = list(await asyncio.gather(*(_arank_group(g, final=False) for g in groups)))
+
+    return {"group_rankings": rankings}
+
+
+def _with_failed_tickers(state: InvestmentAdvisorState) -> list[str]:
+    rankings = list(state["group_rankings"])
+
+    failed_tickers = state.get("failed_tickers", [])
+    if failed_tickers:
+        rankings.append("No data could be retrieved for (do not rank these):\n" + "\n".join(failed_tickers))
+
+    return rankings
+
+
+def merge_stock_rankings(state: InvestmentAdvisorState):
+    return {"recommendation": _rank_group(_with_failed_tickers(state), final=True)}
+
+
+async def amerge_stock_rankings(state: InvestmentAdvisorState):
+    return {"recommendation": await _arank_group(_with_failed_tickers(state), final=True)}
+
+
 
 builder = StateGraph(InvestmentAdvisorState)
 
 builder.add_node("generate_list_of_stocks", generate_list_of_stocks)
-builder.add_node("fetch_stock_details", fetch_stock_details)
+# invoke runs the fetches on threads, ainvoke on the event loop
+builder.add_node("fetch_stock_details", RunnableLambda(fetch_stock_details, afunc=afetch_stock_details, name="fetch_stock_details"))
+builder.add_node(
+    "fetch_stock_details_batch",
+    RunnableLambda(fetch_stock_details_batch, afunc=afetch_stock_details_batch, name="fetch_stock_details_batch")
+)
 builder.add_node("generate_stock_recommendations", generate_stock_recommendations)
+builder.add_node("analyze_stocks", RunnableLambda(analyze_stocks, afunc=aanalyze_stocks, name="analyze_stocks"))
+builder.add_node("rank_stock_groups", RunnableLambda(rank_stock_groups, afunc=arank_stock_groups, name="rank_stock_groups"))
+builder.add_node("merge_stock_rankings", RunnableLambda(merge_stock_rankings, afunc=amerge_stock_rankings, name="merge_stock_rankings"))
 
 
 builder.add_edge(START, "generate_list_of_stocks")
@@ -102,14 +422,34 @@ builder.add_edge(START, "generate_list_of_stocks")
 
 # Map - Reducing
 from langgraph.constants import Send
-def continue_to_details(state: InvestmentAdvisorState):
+def continue_to_details(state: InvestmentAdvisorState, config: RunnableConfig):
+    configurable = configuration.Configuration.from_runnable_config(config)
+
+    # Batch mode fetches every ticker in a single node instead of one Send per ticker
+    if configurable.fetch_mode == "batch":
+        return "fetch_stock_details_batch"
+
     return [Send("fetch_stock_details", {"ticker": ticker}) for ticker in state["stock_tickers"]]
 
-builder.add_conditional_edges("generate_list_of_stocks", continue_to_details, ["fetch_stock_details"])
+builder.add_conditional_edges(
+    "generate_list_of_stocks", continue_to_details, ["fetch_stock_details", "fetch_stock_details_batch"]
+)
+
+
+
+def continue_to_reduce(state: InvestmentAdvisorState, config: RunnableConfig):
+    configurable = configuration.Configuration.from_runnable_config(config)
 
+    if configurable.reduce_mode == "tree":
+        return "analyze_stocks"
 
+    return "generate_stock_recommendations"
 
-builder.add_edge("fetch_stock_details", "generate_stock_recommendations")
+builder.add_conditional_edges("fetch_stock_details", continue_to_reduce, ["generate_stock_recommendations", "analyze_stocks"])
+builder.add_conditional_edges("fetch_stock_details_batch", continue_to_reduce, ["generate_stock_recommendations", "analyze_stocks"])
 builder.add_edge("generate_stock_recommendations", END)
+builder.add_edge("analyze_stocks", "rank_stock_groups")
+builder.add_edge("rank_stock_groups", "merge_stock_rankings")
+builder.add_edge("merge_stock_rankings", END)
 
-graph = builder.compile(interrupt_before=["fetch_stock_details"])
\ No newline at end of file
+graph = builder.compile(interrupt_before=["fetch_stock_details", "fetch_stock_details_batch"])
\ No newline at end of file
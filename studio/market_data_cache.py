@@ -0,0 +1,204 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+import yfinance as yf
+
+# Freshness rules for the two halves of stock.info
+PROFILE_TTL = 24 * 60 * 60  # company profile: name, sector, business summary, earnings, averages, ...
+QUOTE_TTL = 60  # quote: the day's prices and volume
+
+# Quote fields and the column of the latest daily bar (stock.history) they are refreshed from,
+# a much smaller request than stock.info
+BAR_FIELDS = {
+    "currentPrice": "Close", "regularMarketPrice": "Close", "open": "Open", "regularMarketOpen": "Open",
+    "dayHigh": "High", "regularMarketDayHigh": "High", "dayLow": "Low", "regularMarketDayLow": "Low",
+    "volume": "Volume", "regularMarketVolume": "Volume",
+}
+PREVIOUS_CLOSE_FIELDS = ("previousClose", "regularMarketPreviousClose")
+
+# Recomputed from the fresh price and a profile field (price * field, price / field) when it
+# has one, the profile keeps the values of the last stock.info otherwise
+PRICE_MULTIPLES = {"marketCap": "sharesOutstanding"}
+PRICE_RATIOS = {"trailingPE": "trailingEps", "forwardPE": "forwardEps", "priceToBook": "bookValue"}
+
+# Intraday snapshots stock.info has no cheaper source for: kept neither in the profile
+# (a day-old bid is misleading) nor in the quote
+INTRADAY_FIELDS = {"bid", "ask", "bidSize", "askSize", "lastPrice"}
+INTRADAY_PREFIXES = ("regularMarket", "preMarket", "postMarket")
+
+
+def is_quote_field(key: str) -> bool:
+    return key in BAR_FIELDS or key in PREVIOUS_CLOSE_FIELDS
+
+
+def is_profile_field(key: str) -> bool:
+    return not is_quote_field(key) and key not in INTRADAY_FIELDS and not key.startswith(INTRADAY_PREFIXES)
+
+
+def quote_from_bars(bars) -> dict:
+    """Quote fields from the latest daily bars (a stock.history frame), {} without bars."""
+    if bars is None or bars.empty:
+        return {}
+    last = bars.iloc[-1]
+    quote = {field: float(last[column]) for field, column in BAR_FIELDS.items()}
+    if len(bars) > 1:
+        quote.update({field: float(bars["Close"].iloc[-2]) for field in PREVIOUS_CLOSE_FIELDS})
+    return quote
+
+
+def with_quote(profile: dict, quote: dict) -> dict:
+    info = {**profile, **quote}
+    price = quote.get("currentPrice")
+    if price:
+        info.update({field: price * profile[base] for field, base in PRICE_MULTIPLES.items() if profile.get(base)})
+        info.update({field: price / profile[base] for field, base in PRICE_RATIOS.items() if profile.get(base)})
+    return info
+
+
+class MarketDataCache:
+    """
+    Two-level TTL cache: an in-memory LRU in front of a SQLite table.
+
+    Safe to share between threads, and between processes through the SQLite file,
+    so every graph served from the same deployment reuses the same entries.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_items: int = 1024):
+        self.max_items = max_items
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.quote_refreshes = 0
+        self._memory: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def get(self, key: str) -> Optional[Any]:
+        value, from_disk = self._lookup(key)
+        self._count(value is not None, from_disk)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float):
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._remember(key, value, expires_at)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value, default=str), expires_at)
+                )
+
+    def get_or_load(self, key: str, ttl: float, loader: Callable[[], Any]) -> Any:
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            self.set(key, value, ttl)
+        return value
+
+    def get_stock_info(self, stock_symbol: str, loader: Callable[[], dict],
+                       quote_loader: Optional[Callable[[], dict]] = None) -> dict:
+        """
+        stock.info assembled from a profile entry (fresh for a day) and a quote entry
+        (fresh for a minute). `loader` (all of stock.info) only runs when the profile
+        is stale; a stale quote alone is refreshed with `quote_loader` (the latest
+        bars), and the price ratios are recomputed from the new price.
+        """
+        stock_symbol = stock_symbol.upper()
+        # one hit or miss per call: a hit needs both halves
+        profile, profile_from_disk = self._lookup(f"profile:{stock_symbol}")
+        quote, quote_from_disk = self._lookup(f"quote:{stock_symbol}") if profile is not None else (None, False)
+        self._count(quote is not None, profile_from_disk or quote_from_disk)
+        if quote is not None:
+            return with_quote(profile, quote)
+
+        if profile is not None and quote_loader is not None:
+            quote = quote_loader()
+            if quote:
+                with self._lock:
+                    self.quote_refreshes += 1
+                self.set(f"quote:{stock_symbol}", quote, QUOTE_TTL)
+                return with_quote(profile, quote)
+
+        info = loader()
+        self.set(f"profile:{stock_symbol}", {k: v for k, v in info.items() if is_profile_field(k)}, PROFILE_TTL)
+        self.set(f"quote:{stock_symbol}", {k: v for k, v in info.items() if is_quote_field(k)}, QUOTE_TTL)
+        return info
+
+    def purge_expired(self):
+        now = time.time()
+        with self._lock:
+            for key in [k for k, (expires_at, _) in self._memory.items() if expires_at <= now]:
+                del self._memory[key]
+            if self._db is not None:
+                self._db.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "quote_refreshes": self.quote_refreshes,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "memory_items": len(self._memory),
+        }
+
+    def _lookup(self, key: str) -> tuple[Optional[Any], bool]:
+        """The live value of key (None if missing or expired) and whether it was read from disk."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[0] > now:
+                self._memory.move_to_end(key)
+                return entry[1], False
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM cache WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                if row:
+                    value = json.loads(row[0])
+                    self._remember(key, value, row[1])
+                    return value, True
+            return None, False
+
+    def _count(self, hit: bool, from_disk: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+                self.disk_hits += from_disk
+            else:
+                self.misses += 1
+
+    def _remember(self, key: str, value: Any, expires_at: float):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+
+# Shared by every studio graph running in this process; MARKET_DATA_CACHE="" keeps it in memory only
+default_cache = MarketDataCache(
+    os.environ.get("MARKET_DATA_CACHE", os.path.join(os.path.dirname(__file__), ".cache", "market_data.sqlite"))
+)
+
+
+def get_stock_info(stock_symbol: str, stock: Optional[yf.Ticker] = None) -> dict:
+    """Cached replacement for yf.Ticker(stock_symbol).info."""
+    stock = stock or yf.Ticker(stock_symbol)
+    return default_cache.get_stock_info(
+        stock_symbol, lambda: stock.info, quote_loader=lambda: quote_from_bars(stock.history(period="5d"))
+    )
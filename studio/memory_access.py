@@ -0,0 +1,141 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterable, Optional
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.runtime import get_runtime
+from langgraph.store.base import BaseStore, GetOp, Item, SearchOp
+
+import configuration
+
+
+# Page size used to read whole namespaces (limit=None)
+PAGE_SIZE = 10_000
+
+# Called as listener(store, namespace, key, item) after a put through a RunMemory,
+# item is None after a delete (memory_retrieval keeps its indexes current with it)
+write_listeners: list[Callable] = []
+
+
+class RunMemory:
+    """
+    Store access for the nodes of one graph run.
+
+    Reads of several namespaces go to the store in a single batch() call and are
+    served from memory for the rest of the run; a put or delete through this
+    object drops the cached reads it affects. The run's Configuration is
+    resolved once, on creation.
+    """
+
+    def __init__(self, store: BaseStore, config: Optional[RunnableConfig] = None):
+        self.store = store
+        self.configurable = configuration.Configuration.from_runnable_config(config)
+        self.round_trips = 0
+        self._items: dict[tuple, Optional[Item]] = {}
+        self._searches: dict[tuple, list[Item]] = {}
+        self._lock = threading.Lock()
+
+    def prefetch(self, gets: Iterable[tuple[tuple, str]] = (), searches: Iterable[tuple] = (),
+                 limit: Optional[int] = 10):
+        """
+        Load the (namespace, key) items and namespace searches not cached yet in one round-trip.
+        With limit=None searches read whole namespaces, pages past the first need further calls.
+        """
+        with self._lock:
+            gets = [(tuple(ns), key) for ns, key in gets if (tuple(ns), key) not in self._items]
+            # a whole namespace read already covers any limited one
+            searches = [(tuple(ns), limit) for ns in searches
+                        if (tuple(ns), limit) not in self._searches and (tuple(ns), None) not in self._searches]
+        if not gets and not searches:
+            return
+
+        page_size = limit or PAGE_SIZE
+        ops = [GetOp(ns, key) for ns, key in gets] + [SearchOp(ns, limit=page_size) for ns, _ in searches]
+        results = self.store.batch(ops)
+        round_trips = 1
+
+        found = results[len(gets):]
+        if limit is None:
+            for items, (ns, _) in zip(found, searches):
+                while len(items) % page_size == 0 and items:
+                    page = self.store.search(ns, limit=page_size, offset=len(items))
+                    round_trips += 1
+                    if not page:
+                        break
+                    items.extend(page)
+
+        with self._lock:
+            self.round_trips += round_trips
+            for get, item in zip(gets, results[:len(gets)]):
+                self._items[get] = item
+            for search, items in zip(searches, found):
+                self._searches[search] = items
+
+    def get(self, namespace: tuple, key: str) -> Optional[Item]:
+        self.prefetch(gets=[(namespace, key)])
+        return self._items.get((tuple(namespace), key))
+
+    def search(self, namespace: tuple, limit: Optional[int] = 10) -> list[Item]:
+        self.prefetch(searches=[namespace], limit=limit)
+        with self._lock:
+            if (tuple(namespace), limit) in self._searches:
+                return self._searches[(tuple(namespace), limit)]
+            # the store's first `limit` items, in the order the whole read paged them
+            return self._searches.get((tuple(namespace), None), [])[:limit]
+
+    def put(self, namespace: tuple, key: str, value: dict[str, Any]):
+        self.store.put(namespace, key, value)
+        self._invalidate(tuple(namespace), key)
+        now = datetime.now(timezone.utc)
+        item = Item(value=value, key=key, namespace=tuple(namespace), created_at=now, updated_at=now)
+        for listener in write_listeners:
+            listener(self.store, tuple(namespace), key, item)
+
+    def delete(self, namespace: tuple, key: str):
+        self.store.delete(namespace, key)
+        self._invalidate(tuple(namespace), key)
+        for listener in write_listeners:
+            listener(self.store, tuple(namespace), key, None)
+
+    def _invalidate(self, namespace: tuple, key: str):
+        with self._lock:
+            self._items.pop((namespace, key), None)
+            # searches cover every namespace under their prefix
+            for search in [s for s in self._searches if namespace[:len(s[0])] == s[0]]:
+                del self._searches[search]
+
+
+# Open runs, keyed by store and run. A run's end isn't observable from its nodes,
+# so the oldest ones are dropped instead.
+MAX_RUNS = 256
+_runs: OrderedDict[tuple, tuple[Any, RunMemory]] = OrderedDict()
+_runs_lock = threading.Lock()
+
+
+def run_memory(config: RunnableConfig, store: BaseStore) -> RunMemory:
+    """
+    RunMemory shared by the nodes of the current run.
+
+    Runs are identified by their RunControl, which LangGraph creates once per
+    invoke/stream (the server's runs included) and hands to every node and
+    subgraph of the run; outside of a graph run the RunMemory only lives as long
+    as the caller.
+    """
+    try:
+        control = get_runtime().control
+    except RuntimeError:  # called outside of a graph run
+        control = None
+    if control is None:
+        return RunMemory(store, config)
+
+    # the entry holds the control, so its id isn't reused by another run while cached
+    scope = (id(store), id(control))
+    with _runs_lock:
+        entry = _runs.get(scope)
+        if entry is None or entry[0] is not control or entry[1].store is not store:
+            entry = _runs[scope] = (control, RunMemory(store, config))
+        _runs.move_to_end(scope)
+        while len(_runs) > MAX_RUNS:
+            _runs.popitem(last=False)
+    return entry[1]
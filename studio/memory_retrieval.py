@@ -0,0 +1,200 @@
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import numpy as np
+from langgraph.store.base import Item
+
+import memory_access
+from memory_access import RunMemory
+
+
+# Words too common to tell memories apart
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "if", "of", "to", "in", "on", "at", "for", "with", "by", "from", "as",
+    "is", "are", "was", "were", "be", "been", "it", "its", "this", "that", "these", "those", "i", "me", "my", "we",
+    "our", "you", "your", "do", "does", "did", "can", "could", "should", "would", "will", "how", "what", "when",
+    "where", "why", "which", "who", "not", "no", "so", "than", "then", "there", "about", "into", "out", "up",
+}
+
+
+def tokenize(text: str) -> list[str]:
+    return [w for w in re.findall(r"[a-z0-9]+", text.lower()) if w not in STOPWORDS]
+
+
+def approximate_tokens(text: str) -> int:
+    # same chars/4 estimate as langchain_core's count_tokens_approximately
+    return len(text) // 4 + 1
+
+
+class HashingVectorizer:
+    """
+    Signed feature hashing of word unigrams and bigrams into `dim` buckets.
+
+    Needs no vocabulary or fitting, so any memory can be vectorized as soon as it
+    is stored, and the buckets are stable across processes (crc32, not hash()).
+    """
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+
+    def transform(self, texts: list[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = tokenize(text)
+            for term in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                bucket = zlib.crc32(term.encode())
+                vectors[row, bucket % self.dim] += 1.0 if bucket & 0x80000000 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+
+class MemoryIndex:
+    """
+    Vectors of the items of one namespace.
+
+    sync() re-vectorizes only items that are new or changed since the last call
+    (by updated_at) and forgets deleted ones, so ranking a large namespace on
+    every turn costs one matrix-vector product. upsert() and remove() apply a
+    single write without reading the namespace again.
+    """
+
+    def __init__(self, vectorizer: HashingVectorizer, text_of: Callable[[dict], str]):
+        self.vectorizer = vectorizer
+        self.text_of = text_of
+        self.keys: list[str] = []
+        self.items: list[Item] = []
+        self.vectors = np.zeros((0, vectorizer.dim), dtype=np.float32)
+        self._versions: dict[str, object] = {}
+        self.synced_at: Optional[float] = None  # time.monotonic() of the last sync
+        self._lock = threading.Lock()
+
+    def stale(self, max_age: float) -> bool:
+        return self.synced_at is None or time.monotonic() - self.synced_at > max_age
+
+    def sync(self, items: list[Item]):
+        with self._lock:
+            if len(items) == len(self.keys) and all(self._versions.get(i.key) == i.updated_at for i in items):
+                self.items = items
+                return
+
+            rows = dict(zip(self.keys, self.vectors))
+            changed = [i for i in items if self._versions.get(i.key) != i.updated_at]
+            if changed:
+                rows.update(zip((i.key for i in changed), self.vectorizer.transform([self.text_of(i.value) for i in changed])))
+
+            self.items = items
+            self.keys = [i.key for i in items]
+            self.vectors = np.vstack([rows[k] for k in self.keys]) if items else self.vectors[:0]
+            self._versions = {i.key: i.updated_at for i in items}
+            self.synced_at = time.monotonic()
+
+    def upsert(self, item: Item):
+        vector = self.vectorizer.transform([self.text_of(item.value)])
+        with self._lock:
+            # new lists and arrays, top_k may be ranking the previous ones
+            if item.key in self._versions:
+                row = self.keys.index(item.key)
+                self.items = self.items[:row] + [item] + self.items[row + 1:]
+                self.vectors = self.vectors.copy()
+                self.vectors[row] = vector[0]
+            else:
+                self.items = self.items + [item]
+                self.keys = self.keys + [item.key]
+                self.vectors = np.vstack([self.vectors, vector])
+            self._versions[item.key] = item.updated_at
+
+    def remove(self, key: str):
+        with self._lock:
+            if key not in self._versions:
+                return
+            row = self.keys.index(key)
+            self.items = self.items[:row] + self.items[row + 1:]
+            self.keys = self.keys[:row] + self.keys[row + 1:]
+            self.vectors = np.delete(self.vectors, row, axis=0)
+            del self._versions[key]
+
+    def top_k(self, query: str, k: int, token_budget: int, where: Optional[Callable[[dict], bool]] = None) -> list[Item]:
+        """
+        Best matching items for the query, at most k and within token_budget.
+        Ties (e.g. no word in common) go to the most recently updated items.
+        """
+        with self._lock:
+            items, vectors = self.items, self.vectors
+        if not items:
+            return []
+
+        scores = vectors @ self.vectorizer.transform([query])[0]
+        recency = np.argsort(np.argsort([i.updated_at for i in items]))
+        selected, used = [], 0
+        for row in np.lexsort((-recency, -scores)):
+            item = items[row]
+            if where is not None and not where(item.value):
+                continue
+            cost = approximate_tokens(self.text_of(item.value))
+            if used + cost > token_budget:
+                continue
+            selected.append(item)
+            used += cost
+            if len(selected) == k:
+                break
+        return selected
+
+
+# Indexes of the namespaces read in this process, oldest dropped first. Writes through a
+# RunMemory in this process update them in place; the namespace is read again (for
+# writes from other processes) once an index is older than MEMORY_INDEX_REFRESH seconds.
+MAX_INDEXES = 1024
+INDEX_REFRESH = float(os.environ.get("MEMORY_INDEX_REFRESH", 300))
+vectorizer = HashingVectorizer()
+# (id(store), namespace) -> (store, index), the store kept so its id isn't reused by another
+_indexes: OrderedDict[tuple, tuple[object, MemoryIndex]] = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def _index(store, namespace: tuple) -> Optional[MemoryIndex]:
+    entry = _indexes.get((id(store), tuple(namespace)))
+    return entry[1] if entry and entry[0] is store else None
+
+
+def needs_sync(store, namespace: tuple) -> bool:
+    """Whether the next retrieve() on the namespace reads it whole from the store."""
+    with _indexes_lock:
+        index = _index(store, namespace)
+    return index is None or index.stale(INDEX_REFRESH)
+
+
+def retrieve(memory: RunMemory, namespace: tuple, query: str, text_of: Callable[[dict], str], k: int,
+             token_budget: int, where: Optional[Callable[[dict], bool]] = None) -> list[Item]:
+    """Top-k items of a whole namespace ranked against the query, see MemoryIndex.top_k."""
+    scope = (id(memory.store), tuple(namespace))
+    with _indexes_lock:
+        index = _index(memory.store, namespace)
+        if index is None:
+            index = MemoryIndex(vectorizer, text_of)
+            _indexes[scope] = (memory.store, index)
+        _indexes.move_to_end(scope)
+        while len(_indexes) > MAX_INDEXES:
+            _indexes.popitem(last=False)
+
+    if index.stale(INDEX_REFRESH):
+        index.sync(memory.search(namespace, limit=None))
+    return index.top_k(query, k, token_budget, where)
+
+
+def _on_write(store, namespace: tuple, key: str, item: Optional[Item]):
+    with _indexes_lock:
+        index = _index(store, namespace)
+    if index is None:
+        return
+    if item is None:
+        index.remove(key)
+    else:
+        index.upsert(item)
+
+
+memory_access.write_listeners.append(_on_write)
@@ -0,0 +1,145 @@
+import dataclasses
+import functools
+import hashlib
+import inspect
+import os
+import threading
+from collections import Counter
+from typing import Any, Callable, Optional, Sequence
+
+from langgraph.cache.base import BaseCache, FullKey
+from langgraph.cache.memory import InMemoryCache
+from langgraph.cache.sqlite import SqliteCache
+from langgraph.config import get_config
+
+import configuration
+
+DEFAULT_TTL = 15 * 60  # seconds
+
+
+def tool_calls_of(state: dict) -> list:
+    """
+    Cache key slice of a tools node: name and arguments of the calls of the last
+    assistant message. Call ids are left out, a regenerated message has new ones.
+    """
+    return [(call["name"], call["args"]) for call in state["messages"][-1].tool_calls]
+
+
+def with_tool_call_ids(state: dict, output: dict) -> dict:
+    """A cached tools output answering the current calls (results are in call order)."""
+    calls = state["messages"][-1].tool_calls
+    return {**output, "messages": [
+        m.model_copy(update={"tool_call_id": call["id"]}) for m, call in zip(output["messages"], calls)
+    ]}
+
+
+def no_tool_errors(output: dict) -> bool:
+    return all(getattr(m, "status", None) != "error" for m in output["messages"])
+
+
+def _default_cache() -> BaseCache:
+    # NODE_CACHE_PATH="" keeps the entries in memory only
+    path = os.environ.get("NODE_CACHE_PATH", os.path.join(os.path.dirname(__file__), ".cache", "node_cache.sqlite"))
+    if not path:
+        return InMemoryCache()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    return SqliteCache(path=path)
+
+
+# Shared by every memoized node in this process
+default_cache = _default_cache()
+_stats: Counter = Counter()
+_stats_lock = threading.Lock()
+
+
+def _count(node: str, outcome: str):
+    with _stats_lock:
+        _stats[(node, outcome)] += 1
+
+
+def stats() -> dict:
+    """Hits and misses per memoized node."""
+    with _stats_lock:
+        nodes = sorted({node for node, _ in _stats})
+        return {node: {"hits": _stats[(node, "hit")], "misses": _stats[(node, "miss")]} for node in nodes}
+
+
+def memoize(fields: Optional[Sequence[str]] = None, key: Optional[Callable[[Any], Any]] = None,
+            config_keys: Optional[Sequence[str]] = None, ttl: Optional[int] = DEFAULT_TTL, cache: Optional[BaseCache] = None,
+            should_cache: Optional[Callable[[Any], bool]] = None, on_hit: Optional[Callable[[Any, Any], Any]] = None,
+            name: Optional[str] = None):
+    """
+    Reuse a node's output when it runs again on the same input, e.g. on a replay,
+    a fork that didn't change what the node reads, or a retry after a breakpoint.
+
+    The cache key is a hash of the state slice the node depends on (`fields`, or
+    whatever `key(state)` returns, the whole state by default) and of the run's
+    Configuration (every field by default, or only `config_keys`). Entries expire after `ttl` seconds;
+    outputs for which `should_cache(output)` is false (e.g. errors) aren't stored.
+    `on_hit(state, output)` adapts a cached output to the current state.
+    Only active in runs with the node_cache configuration field set. Entries and
+    stats are per `name` (the function's by default), so the sync and async
+    versions of a node can share them.
+    """
+    def decorate(node: Callable) -> Callable:
+        node_name = name or node.__name__
+        namespace = ("nodes", node_name)
+
+        def cache_key(state: Any, backend: BaseCache) -> Optional[FullKey]:
+            try:
+                config = get_config()
+            except RuntimeError:  # called outside of a graph run
+                return None
+            settings = configuration.Configuration.from_runnable_config(config)
+            if not settings.node_cache:
+                return None
+            if config_keys is None:
+                depends_on_config = dataclasses.asdict(settings)
+            else:
+                configurable = config.get("configurable", {})
+                depends_on_config = {k: getattr(settings, k, configurable.get(k)) for k in config_keys}
+            if key is not None:
+                depends_on = key(state)
+            elif fields is not None:
+                depends_on = {field: state.get(field) for field in fields}
+            else:
+                depends_on = state
+            type_, data = backend.serde.dumps_typed([depends_on, depends_on_config])
+            return namespace, hashlib.sha256(type_.encode() + data).hexdigest()
+
+        if inspect.iscoroutinefunction(node):
+            @functools.wraps(node)
+            async def memoized(state, *args, **kwargs):
+                backend = cache or default_cache
+                full_key = cache_key(state, backend)
+                if full_key is None:
+                    return await node(state, *args, **kwargs)
+                cached = await backend.aget([full_key])
+                if full_key in cached:
+                    _count(node_name, "hit")
+                    return on_hit(state, cached[full_key]) if on_hit else cached[full_key]
+                _count(node_name, "miss")
+                output = await node(state, *args, **kwargs)
+                if should_cache is None or should_cache(output):
+                    await backend.aset({full_key: (output, ttl)})
+                return output
+        else:
+            @functools.wraps(node)
+            def memoized(state, *args, **kwargs):
+                backend = cache or default_cache
+                full_key = cache_key(state, backend)
+                if full_key is None:
+                    return node(state, *args, **kwargs)
+                cached = backend.get([full_key])
+                if full_key in cached:
+                    _count(node_name, "hit")
+                    return on_hit(state, cached[full_key]) if on_hit else cached[full_key]
+                _count(node_name, "miss")
+                output = node(state, *args, **kwargs)
+                if should_cache is None or should_cache(output):
+                    backend.set({full_key: (output, ttl)})
+                return output
+
+        return memoized
+
+    return decorate
@@ -0,0 +1,219 @@
+import contextlib
+import json
+import os
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+# yfinance period strings that map to a calendar offset; anything else bypasses the store
+PERIOD_OFFSETS = {
+    "d": lambda n: pd.DateOffset(days=n),
+    "wk": lambda n: pd.DateOffset(weeks=n),
+    "mo": lambda n: pd.DateOffset(months=n),
+    "y": lambda n: pd.DateOffset(years=n),
+}
+
+
+def period_start(period: str, today: Optional[pd.Timestamp] = None) -> Optional[pd.Timestamp]:
+    today = today or pd.Timestamp.today().normalize()
+    for suffix, offset in PERIOD_OFFSETS.items():
+        count = period[:-len(suffix)]
+        if period.endswith(suffix) and count.isdigit():
+            return today - offset(int(count))
+    return None
+
+
+class PriceStore:
+    """
+    Local columnar store of daily OHLCV bars, one directory per ticker.
+
+    Each ticker keeps a dates array (datetime64[D]) and an (n, 5) float64 OHLCV
+    array as .npy files. Reads memory-map them and slice the requested period
+    without copying; only the date range missing from disk is requested from the
+    provider, plus the latest bar, which keeps changing during the trading day.
+    """
+
+    def __init__(self, root: str, refresh_interval: float = 60):
+        self.root = root
+        self.refresh_interval = refresh_interval
+        self.downloads = 0
+        self._locks: dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def history(self, stock_symbol: str, period: str = "1mo", stock: Optional[yf.Ticker] = None) -> pd.DataFrame:
+        """Drop-in replacement for stock.history(period=period) with daily bars."""
+        stock = stock or yf.Ticker(stock_symbol)
+        start = period_start(period)
+        if start is None:
+            return stock.history(period=period)
+
+        stock_symbol = stock_symbol.upper()
+        with self._lock(stock_symbol):
+            self._sync(stock_symbol, stock, start)
+            return self._slice(stock_symbol, start)
+
+    def histories(self, stock_symbols: list[str], period: str = "1mo") -> dict[str, pd.DataFrame]:
+        """
+        history() of several tickers, by the symbols as given. What is missing on
+        disk comes from one yf.download per distinct date range instead of one
+        request per ticker. Tickers without data get an empty frame.
+        """
+        start = period_start(period)
+        if start is None:
+            frame = yf.download(stock_symbols, period=period, group_by="ticker", multi_level_index=True, progress=False)
+            return {s: _ticker_frame(frame, s.upper()) for s in stock_symbols}
+
+        symbols = sorted({s.upper() for s in stock_symbols})
+        with contextlib.ExitStack() as locks:
+            # always in the same order, two batches can't wait on each other
+            for stock_symbol in symbols:
+                locks.enter_context(self._lock(stock_symbol))
+
+            by_range: dict[tuple, list[str]] = {}
+            missing = {stock_symbol: self._missing(stock_symbol, start) for stock_symbol in symbols}
+            for stock_symbol, downloads in missing.items():
+                for download in downloads:
+                    by_range.setdefault(download, []).append(stock_symbol)
+
+            frames: dict[str, list[pd.DataFrame]] = {stock_symbol: [] for stock_symbol in symbols}
+            for (download_start, download_end), group in by_range.items():
+                self.downloads += 1
+                frame = yf.download(group, start=download_start, end=download_end, interval="1d",
+                                    group_by="ticker", multi_level_index=True, progress=False)
+                for stock_symbol in group:
+                    history = _ticker_frame(frame, stock_symbol)
+                    if not history.empty:
+                        frames[stock_symbol].append(history)
+
+            for stock_symbol, downloads in missing.items():
+                if downloads:
+                    self._merge(stock_symbol, frames[stock_symbol], start)
+            return {s: self._slice(s.upper(), start) for s in stock_symbols}
+
+    def _missing(self, stock_symbol: str, start: pd.Timestamp) -> list[tuple]:
+        """(start, end) date ranges to download before the store covers start until today."""
+        meta = self._read_meta(stock_symbol)
+        today = pd.Timestamp.today().normalize()
+        if not meta:
+            return [(start, None)]
+
+        downloads = []
+        covered_from = pd.Timestamp(meta["covered_from"])
+        last_date = pd.Timestamp(meta["last_date"]) if meta["last_date"] else covered_from
+        # earlier days than ever requested before
+        if start < covered_from:
+            downloads.append((start, covered_from))
+        # new bars since the last refresh, starting at the last stored one
+        if time.time() - meta["checked_at"] > self.refresh_interval:
+            downloads.append((min(last_date, today), None))
+        return downloads
+
+    def _sync(self, stock_symbol: str, stock: yf.Ticker, start: pd.Timestamp):
+        downloads = self._missing(stock_symbol, start)
+        if not downloads:
+            return
+
+        frames = []
+        for download_start, download_end in downloads:
+            self.downloads += 1
+            frame = stock.history(start=download_start, end=download_end, interval="1d")
+            if not frame.empty:
+                frames.append(frame)
+        self._merge(stock_symbol, frames, start)
+
+    def _slice(self, stock_symbol: str, start: pd.Timestamp) -> pd.DataFrame:
+        # under the ticker's lock: _merge swaps dates.npy and ohlcv.npy one after the other
+        dates, ohlcv = self._load(stock_symbol)
+        first = np.searchsorted(dates, np.datetime64(start.date(), "D"), side="left")
+        return pd.DataFrame(ohlcv[first:], columns=COLUMNS, index=pd.DatetimeIndex(dates[first:], name="Date"), copy=False)
+
+    def _merge(self, stock_symbol: str, frames: list[pd.DataFrame], start: pd.Timestamp):
+        meta = self._read_meta(stock_symbol)
+        covered_from = min(start, pd.Timestamp(meta["covered_from"])) if meta else start
+        dates, ohlcv = self._load(stock_symbol)
+        frames = [pd.DataFrame(ohlcv, index=dates, columns=COLUMNS)] + [
+            pd.DataFrame(f[COLUMNS].to_numpy(dtype=float), index=_trading_days(f.index), columns=COLUMNS)
+            for f in frames
+        ]
+        merged = pd.concat(frames)
+        # later downloads win, so the refreshed latest bar replaces the stored one
+        merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+
+        directory = self._directory(stock_symbol)
+        os.makedirs(directory, exist_ok=True)
+        self._replace(os.path.join(directory, "dates.npy"), merged.index.values.astype("datetime64[D]"))
+        self._replace(os.path.join(directory, "ohlcv.npy"), merged.to_numpy(dtype=float))
+        meta = {
+            "covered_from": covered_from.date().isoformat(),
+            "last_date": str(merged.index[-1])[:10] if len(merged) else None,
+            "checked_at": time.time(),
+        }
+        with open(os.path.join(directory, "meta.json.tmp"), "w") as f:
+            json.dump(meta, f)
+        os.replace(os.path.join(directory, "meta.json.tmp"), os.path.join(directory, "meta.json"))
+
+    def _load(self, stock_symbol: str) -> tuple[np.ndarray, np.ndarray]:
+        directory = self._directory(stock_symbol)
+        try:
+            return (
+                np.load(os.path.join(directory, "dates.npy"), mmap_mode="r"),
+                np.load(os.path.join(directory, "ohlcv.npy"), mmap_mode="r"),
+            )
+        except FileNotFoundError:
+            return np.empty(0, dtype="datetime64[D]"), np.empty((0, len(COLUMNS)))
+
+    def _read_meta(self, stock_symbol: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(self._directory(stock_symbol), "meta.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _replace(self, path: str, array: np.ndarray):
+        # write aside and swap, readers holding the old memory map keep a valid file
+        with open(f"{path}.tmp", "wb") as f:
+            np.save(f, array)
+        os.replace(f"{path}.tmp", path)
+
+    def _directory(self, stock_symbol: str) -> str:
+        return os.path.join(self.root, stock_symbol)
+
+    def _lock(self, stock_symbol: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(stock_symbol, threading.Lock())
+
+
+def _ticker_frame(frame: pd.DataFrame, stock_symbol: str) -> pd.DataFrame:
+    # yf.download(group_by="ticker") columns are (ticker, field) pairs, one group per downloaded ticker
+    if stock_symbol not in frame.columns.get_level_values(0):
+        return pd.DataFrame(columns=COLUMNS)
+    return frame[stock_symbol].dropna(how="all")
+
+
+def _trading_days(index: pd.DatetimeIndex) -> np.ndarray:
+    # provider timestamps are midnight in the exchange time zone, keep the local date
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.values.astype("datetime64[D]")
+
+
+# Shared by every studio graph running in this process
+default_store = PriceStore(
+    os.environ.get("PRICE_STORE", os.path.join(os.path.dirname(__file__), ".cache", "prices"))
+)
+
+
+def get_stock_history(stock_symbol: str, period: str = "1mo", stock: Optional[yf.Ticker] = None) -> pd.DataFrame:
+    """Stored replacement for yf.Ticker(stock_symbol).history(period=period)."""
+    return default_store.history(stock_symbol, period, stock)
+
+
+def get_stock_histories(stock_symbols: list[str], period: str = "1mo") -> dict[str, pd.DataFrame]:
+    """Stored replacement for yf.download(stock_symbols, period=period, group_by="ticker")."""
+    return default_store.histories(stock_symbols, period)
@@ -0,0 +1,266 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Iterable, Optional
+
+import aiosqlite
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from langgraph.store.base import (
+    BaseStore,
+    GetOp,
+    Item,
+    ListNamespacesOp,
+    Op,
+    PutOp,
+    Result,
+    SearchItem,
+    SearchOp,
+)
+
+# Namespaces are stored as one dotted string ("adrs.alice"), labels can't contain "."
+# so every namespace under a prefix sorts between "prefix." and "prefix/"
+SEPARATOR = "."
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS store (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS store_namespace_updated_at ON store (namespace, updated_at DESC);
+"""
+
+# Prepared once per connection by sqlite3's statement cache, parameters only
+UPSERT = """
+INSERT INTO store (namespace, key, value, created_at, updated_at) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+"""
+DELETE = "DELETE FROM store WHERE namespace = ? AND key = ?"
+GET = "SELECT namespace, key, value, created_at, updated_at FROM store WHERE namespace = ? AND key = ?"
+SEARCH = "SELECT namespace, key, value, created_at, updated_at FROM store{where} ORDER BY updated_at DESC LIMIT ? OFFSET ?"
+IN_PREFIX = "(namespace = ? OR (namespace >= ? AND namespace < ?))"
+NAMESPACES = "SELECT DISTINCT namespace FROM store ORDER BY namespace"
+
+FILTER_OPERATORS = {"$eq": "=", "$ne": "!=", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+
+def connect(path: str) -> sqlite3.Connection:
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, cached_statements=256)
+    # readers don't block the writer and commits skip the fsync of the rollback journal
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+
+async def aconnect(path: str) -> aiosqlite.Connection:
+    conn = await aiosqlite.connect(path)
+    # journal_mode=WAL is kept in the file, the other pragmas are per connection
+    await conn.execute("PRAGMA synchronous=NORMAL")
+    await conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+
+class DualSqliteSaver(SqliteSaver):
+    """
+    SqliteSaver for graphs run both ways: the sync methods use its sqlite3
+    connection, the async ones an AsyncSqliteSaver (aiosqlite) on the same file.
+    The AsyncSqliteSaver lives on an event loop of its own, in a daemon thread
+    started on first use, so it serves every caller's loop and never holds up
+    interpreter exit.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(connect(path))
+        self.path = path
+        self._aio: Optional[tuple[asyncio.AbstractEventLoop, AsyncSqliteSaver]] = None
+        self._aio_lock = threading.Lock()
+
+    def _async_saver(self) -> tuple[asyncio.AbstractEventLoop, AsyncSqliteSaver]:
+        with self._aio_lock:
+            if self._aio is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="sqlite-checkpointer", daemon=True).start()
+
+                # aiosqlite's worker thread is created here, in the daemon thread, and is a daemon too
+                async def open_saver() -> AsyncSqliteSaver:
+                    saver = AsyncSqliteSaver(await aconnect(self.path), serde=self.serde)
+                    await saver.setup()
+                    return saver
+
+                self._aio = loop, asyncio.run_coroutine_threadsafe(open_saver(), loop).result()
+            return self._aio
+
+    async def _run(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        loop, saver = self._async_saver()
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(getattr(saver, method)(*args, **kwargs), loop))
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await self._run("aget_tuple", config)
+
+    async def alist(self, config: Optional[RunnableConfig], **kwargs: Any) -> AsyncIterator[CheckpointTuple]:
+        loop, saver = self._async_saver()
+
+        async def collect() -> list[CheckpointTuple]:
+            return [checkpoint async for checkpoint in saver.alist(config, **kwargs)]
+
+        for checkpoint in await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(collect(), loop)):
+            yield checkpoint
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return await self._run("aput", config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Any, task_id: str, task_path: str = "") -> None:
+        await self._run("aput_writes", config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self._run("adelete_thread", thread_id)
+
+    async def aget_delta_channel_history(self, *, config: RunnableConfig, channels: Any) -> Any:
+        return await self._run("aget_delta_channel_history", config=config, channels=channels)
+
+
+def sqlite_saver(path: str) -> DualSqliteSaver:
+    """Checkpointer on a WAL-mode SQLite file, for invoke/stream and ainvoke/astream alike."""
+    saver = DualSqliteSaver(path)
+    saver.setup()
+    return saver
+
+
+class SQLiteStore(BaseStore):
+    """
+    BaseStore on a single WAL-mode SQLite file.
+
+    Every batch() runs in one transaction: reads first, then the writes grouped
+    into executemany calls (the last write of a key wins). Namespace-prefix
+    search is a range scan on the primary key; value filters become json_extract
+    conditions. Semantic queries and TTLs are not supported, `query` is ignored.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = connect(path)
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def batch(self, ops: Iterable[Op]) -> list[Result]:
+        ops = list(ops)
+        results: list[Result] = [None] * len(ops)
+        writes: dict[tuple, Optional[str]] = {}
+        now = datetime.now(timezone.utc).isoformat()
+
+        with self._lock:
+            cursor = self._conn.cursor()
+            cursor.execute("BEGIN")
+            try:
+                for i, op in enumerate(ops):
+                    if isinstance(op, GetOp):
+                        row = cursor.execute(GET, (_join(op.namespace), op.key)).fetchone()
+                        results[i] = _item(row) if row else None
+                    elif isinstance(op, SearchOp):
+                        results[i] = self._search(cursor, op)
+                    elif isinstance(op, ListNamespacesOp):
+                        results[i] = self._list_namespaces(cursor, op)
+                    elif isinstance(op, PutOp):
+                        writes[(_join(op.namespace), op.key)] = None if op.value is None else json.dumps(op.value)
+                    else:
+                        raise ValueError(f"Unknown operation type: {type(op)}")
+
+                deletes = [key for key, value in writes.items() if value is None]
+                upserts = [(*key, value, now, now) for key, value in writes.items() if value is not None]
+                if deletes:
+                    cursor.executemany(DELETE, deletes)
+                if upserts:
+                    cursor.executemany(UPSERT, upserts)
+                cursor.execute("COMMIT")
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+        return results
+
+    async def abatch(self, ops: Iterable[Op]) -> list[Result]:
+        return await asyncio.get_running_loop().run_in_executor(None, self.batch, list(ops))
+
+    def _search(self, cursor: sqlite3.Cursor, op: SearchOp) -> list[SearchItem]:
+        conditions, parameters = [], []
+        prefix = _join(op.namespace_prefix)
+        if prefix:
+            conditions.append(IN_PREFIX)
+            parameters += [prefix, prefix + SEPARATOR, prefix + chr(ord(SEPARATOR) + 1)]
+
+        for field, condition in (op.filter or {}).items():
+            operators = condition if isinstance(condition, dict) else {"$eq": condition}
+            for operator, value in operators.items():
+                conditions.append(f"json_extract(value, ?) {FILTER_OPERATORS[operator]} ?")
+                parameters += [f"$.{field}", json.dumps(value) if isinstance(value, (dict, list)) else value]
+
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        rows = cursor.execute(SEARCH.format(where=where), (*parameters, op.limit, op.offset)).fetchall()
+        return [SearchItem(**_fields(row)) for row in rows]
+
+    def _list_namespaces(self, cursor: sqlite3.Cursor, op: ListNamespacesOp) -> list[tuple[str, ...]]:
+        namespaces = [tuple(row[0].split(SEPARATOR)) for row in cursor.execute(NAMESPACES)]
+        for condition in op.match_conditions or ():
+            namespaces = [ns for ns in namespaces if _matches(condition.match_type, tuple(condition.path), ns)]
+        if op.max_depth is not None:
+            namespaces = sorted({ns[:op.max_depth] for ns in namespaces})
+        return namespaces[op.offset:op.offset + op.limit]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _join(namespace: tuple) -> str:
+    return SEPARATOR.join(namespace)
+
+
+def _fields(row) -> dict:
+    return {
+        "namespace": tuple(row[0].split(SEPARATOR)),
+        "key": row[1],
+        "value": json.loads(row[2]),
+        "created_at": datetime.fromisoformat(row[3]),
+        "updated_at": datetime.fromisoformat(row[4]),
+    }
+
+
+def _item(row) -> Item:
+    return Item(**_fields(row))
+
+
+def _matches(match_type: str, path: tuple, namespace: tuple) -> bool:
+    if len(path) > len(namespace):
+        return False
+    part = namespace[:len(path)] if match_type == "prefix" else namespace[len(namespace) - len(path):]
+    return all(p == "*" or p == n for p, n in zip(path, part))
+
+
+# Opt-in durable persistence for running the graphs outside the LangGraph server
+# (which brings its own checkpointer and store): set STUDIO_SQLITE to a file path.
+_persistence: Optional[dict[str, Any]] = None
+_persistence_lock = threading.Lock()
+
+
+def local_persistence() -> dict[str, Any]:
+    """compile() arguments for the process-wide SQLite checkpointer and store, {} when not configured."""
+    global _persistence
+    path = os.environ.get("STUDIO_SQLITE")
+    if not path:
+        return {}
+    with _persistence_lock:
+        if _persistence is None:
+            _persistence = {"checkpointer": sqlite_saver(path), "store": SQLiteStore(path)}
+    return _persistence
@@ -0,0 +1,271 @@
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.mongodb import MongoDBSaver
+from langgraph.checkpoint.mongodb.utils import loads_metadata
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.types import StateSnapshot
+
+# Channel whose writes carry the message ids, MessagesState's
+MESSAGES = "messages"
+PULL_PREFIX = "~__pregel_pull, "
+
+
+@dataclass(frozen=True)
+class CheckpointDescriptor:
+    """What identifies a checkpoint for replay and fork, read without its channel values."""
+    checkpoint_id: str
+    parent_id: Optional[str]
+    step: int
+    source: str  # "input", "loop", "update" or "fork"
+    nodes: tuple[str, ...] = ()  # nodes whose writes produced the checkpoint
+    message_ids: tuple[str, ...] = ()  # messages those writes added
+    config: Optional[RunnableConfig] = None
+
+
+def _node_of(task_path: str) -> Optional[str]:
+    # pull tasks are named in their path, Send tasks only carry an index
+    return task_path[len(PULL_PREFIX):] if task_path.startswith(PULL_PREFIX) else None
+
+
+def _message_ids(value: Any) -> list[str]:
+    ids = []
+    for message in value if isinstance(value, list) else [value]:
+        message_id = message.get("id") if isinstance(message, dict) else getattr(message, "id", None)
+        if message_id and getattr(message, "type", None) != "remove":
+            ids.append(message_id)
+    return ids
+
+
+# Rows of the checkpoints and writes tables, per saver type. Only metadata, task paths
+# and the writes to the messages channel are deserialized.
+##################################################################################
+class _InMemoryRows:
+    def __init__(self, saver: InMemorySaver):
+        self.saver = saver
+
+    def checkpoints(self, thread_id: str, checkpoint_ns: str, after: str) -> list[tuple[str, Optional[str], dict]]:
+        stored = list(self.saver.storage.get(thread_id, {}).get(checkpoint_ns, {}).items())
+        return sorted(
+            (checkpoint_id, parent, self.saver.serde.loads_typed(metadata))
+            for checkpoint_id, (_, metadata, parent) in stored if checkpoint_id > after
+        )
+
+    def writes(self, thread_id: str, checkpoint_ns: str, checkpoint_ids: list[str]) -> list[tuple[str, str, str, Any]]:
+        rows = []
+        for checkpoint_id in checkpoint_ids:
+            for _, channel, value, task_path in list(self.saver.writes.get((thread_id, checkpoint_ns, checkpoint_id), {}).values()):
+                rows.append((checkpoint_id, task_path, channel, self.saver.serde.loads_typed(value) if channel == MESSAGES else None))
+        return rows
+
+
+class _MongoRows:
+    def __init__(self, saver: MongoDBSaver):
+        self.saver = saver
+
+    def checkpoints(self, thread_id: str, checkpoint_ns: str, after: str) -> list[tuple[str, Optional[str], dict]]:
+        docs = self.saver.checkpoint_collection.find(
+            {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": {"$gt": after}},
+            projection={"checkpoint_id": 1, "parent_checkpoint_id": 1, "metadata": 1},
+        ).sort("checkpoint_id", 1)
+        return [(d["checkpoint_id"], d.get("parent_checkpoint_id"), loads_metadata(self.saver.serde, d["metadata"])) for d in docs]
+
+    def writes(self, thread_id: str, checkpoint_ns: str, checkpoint_ids: list[str]) -> list[tuple[str, str, str, Any]]:
+        query = {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": {"$in": checkpoint_ids}}
+        rows = [
+            (d["checkpoint_id"], d.get("task_path", ""), d["channel"], None)
+            for d in self.saver.writes_collection.find(
+                {**query, "channel": {"$ne": MESSAGES}}, projection={"checkpoint_id": 1, "task_path": 1, "channel": 1}
+            )
+        ]
+        for d in self.saver.writes_collection.find({**query, "channel": MESSAGES}):
+            rows.append((d["checkpoint_id"], d.get("task_path", ""), MESSAGES, self.saver.serde.loads_typed((d["type"], d["value"]))))
+        return rows
+
+
+class _SqliteRows:
+    def __init__(self, saver: SqliteSaver):
+        self.saver = saver
+
+    def checkpoints(self, thread_id: str, checkpoint_ns: str, after: str) -> list[tuple[str, Optional[str], dict]]:
+        with self.saver.cursor(transaction=False) as cursor:
+            rows = cursor.execute(
+                "SELECT checkpoint_id, parent_checkpoint_id, metadata FROM checkpoints "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id > ? ORDER BY checkpoint_id",
+                (thread_id, checkpoint_ns, after),
+            ).fetchall()
+        return [(checkpoint_id, parent, json.loads(metadata) if metadata else {}) for checkpoint_id, parent, metadata in rows]
+
+    def writes(self, thread_id: str, checkpoint_ns: str, checkpoint_ids: list[str]) -> list[tuple[str, str, str, Any]]:
+        if not checkpoint_ids:
+            return []
+        task_path = "task_path" if self.saver._has_task_path else "''"
+        with self.saver.cursor(transaction=False) as cursor:
+            rows = cursor.execute(
+                f"SELECT checkpoint_id, {task_path}, channel, type, CASE WHEN channel = ? THEN value END FROM writes "
+                f"WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id IN ({', '.join('?' * len(checkpoint_ids))})",
+                (MESSAGES, thread_id, checkpoint_ns, *checkpoint_ids),
+            ).fetchall()
+        return [
+            (checkpoint_id, path, channel, self.saver.serde.loads_typed((type_, value)) if channel == MESSAGES else None)
+            for checkpoint_id, path, channel, type_, value in rows
+        ]
+
+
+def _rows_of(saver: BaseCheckpointSaver):
+    if isinstance(saver, InMemorySaver):
+        return _InMemoryRows(saver)
+    if isinstance(saver, MongoDBSaver):
+        return _MongoRows(saver)
+    if isinstance(saver, SqliteSaver):
+        return _SqliteRows(saver)
+    raise TypeError(f"Indexed history is not supported for {type(saver).__name__}")
+
+
+class ThreadHistory:
+    """
+    Index of the checkpoints of one thread (and namespace).
+
+    refresh() reads only the checkpoints created since the previous call: their
+    metadata, and the pending writes of their parents, which name the nodes that
+    ran and carry the ids of the messages they added. Channel values are never
+    loaded; lookups return CheckpointDescriptors and the caller loads the one
+    it picked (graph.get_state(descriptor.config)).
+
+    Lookups follow one branch, the lineage of `head` (default: the newest checkpoint).
+    """
+
+    def __init__(self, saver: BaseCheckpointSaver, thread_id: str, checkpoint_ns: str = ""):
+        self.thread_id = thread_id
+        self.checkpoint_ns = checkpoint_ns
+        self.descriptors: dict[str, CheckpointDescriptor] = {}
+        self._rows = _rows_of(saver)
+        self._messages: dict[str, str] = {}  # message id -> checkpoint id that added it
+        self._lineages: dict[str, list[CheckpointDescriptor]] = {}
+        self._last = ""
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        with self._lock:
+            rows = self._rows.checkpoints(self.thread_id, self.checkpoint_ns, self._last)
+            if not rows:
+                return
+            # writes saved on a checkpoint belong to the step that produced its "loop" child
+            parents = sorted({parent for _, parent, metadata in rows if parent and metadata.get("source") == "loop"})
+            nodes: dict[str, list[str]] = {}
+            messages: dict[str, list[str]] = {}
+            for checkpoint_id, task_path, channel, value in self._rows.writes(self.thread_id, self.checkpoint_ns, parents):
+                node = _node_of(task_path)
+                if node and node not in nodes.setdefault(checkpoint_id, []):
+                    nodes[checkpoint_id].append(node)
+                if channel == MESSAGES:
+                    messages.setdefault(checkpoint_id, []).extend(_message_ids(value))
+
+            for checkpoint_id, parent, metadata in rows:
+                produced = metadata.get("source") == "loop" and parent
+                descriptor = CheckpointDescriptor(
+                    checkpoint_id=checkpoint_id,
+                    parent_id=parent,
+                    step=metadata.get("step", -1),
+                    source=metadata.get("source", ""),
+                    nodes=tuple(nodes.get(parent, ())) if produced else (),
+                    message_ids=tuple(messages.get(parent, ())) if produced else (),
+                    config={"configurable": {
+                        "thread_id": self.thread_id, "checkpoint_ns": self.checkpoint_ns, "checkpoint_id": checkpoint_id,
+                    }},
+                )
+                self.descriptors[checkpoint_id] = descriptor
+                for message_id in descriptor.message_ids:
+                    self._messages.setdefault(message_id, checkpoint_id)
+            self._last = rows[-1][0]
+            self._lineages.clear()
+
+    def lineage(self, head: Optional[str] = None) -> list[CheckpointDescriptor]:
+        """Checkpoints from the first one to `head`, following parents."""
+        with self._lock:
+            head = head or max(self.descriptors, default=None)
+            if head is None:
+                return []
+            lineage = self._lineages.get(head)
+            if lineage is None:
+                lineage, checkpoint_id = [], head
+                while checkpoint_id in self.descriptors:
+                    lineage.append(self.descriptors[checkpoint_id])
+                    checkpoint_id = self.descriptors[checkpoint_id].parent_id
+                lineage = self._lineages[head] = lineage[::-1]
+            return lineage
+
+    def at_step(self, step: int, head: Optional[str] = None) -> Optional[CheckpointDescriptor]:
+        return next((d for d in self.lineage(head) if d.step == step), None)
+
+    def produced_by(self, node: str, occurrence: int = -1, head: Optional[str] = None) -> Optional[CheckpointDescriptor]:
+        """Checkpoint written after `node` ran, the last time by default (0 for the first, -2 for the one before last...)."""
+        matches = [d for d in self.lineage(head) if node in d.nodes]
+        try:
+            return matches[occurrence]
+        except IndexError:
+            return None
+
+    def adding_message(self, message_id: str) -> Optional[CheckpointDescriptor]:
+        """Checkpoint in which the message first appears."""
+        with self._lock:
+            checkpoint_id = self._messages.get(message_id)
+            return self.descriptors.get(checkpoint_id) if checkpoint_id else None
+
+
+# Histories of the threads looked up in this process, oldest dropped first
+MAX_HISTORIES = 1024
+_histories: OrderedDict[tuple, ThreadHistory] = OrderedDict()
+_histories_lock = threading.Lock()
+
+
+def thread_history(saver: BaseCheckpointSaver, config: RunnableConfig) -> ThreadHistory:
+    """The up to date ThreadHistory of the config's thread."""
+    configurable = config["configurable"]
+    scope = (id(saver), configurable["thread_id"], configurable.get("checkpoint_ns", ""))
+    with _histories_lock:
+        history = _histories.get(scope)
+        if history is None:
+            history = _histories[scope] = ThreadHistory(saver, scope[1], scope[2])
+        _histories.move_to_end(scope)
+        while len(_histories) > MAX_HISTORIES:
+            _histories.popitem(last=False)
+    history.refresh()
+    return history
+
+
+def forget(saver: BaseCheckpointSaver, thread_id: str):
+    """Drop the cached histories of a thread, e.g. after its checkpoints were compacted or deleted."""
+    with _histories_lock:
+        for scope in [s for s in _histories if s[:2] == (id(saver), thread_id)]:
+            del _histories[scope]
+
+
+def find_checkpoint(graph, config: RunnableConfig, step: Optional[int] = None, node: Optional[str] = None,
+                    message_id: Optional[str] = None, occurrence: int = -1) -> Optional[CheckpointDescriptor]:
+    """
+    Checkpoint of the thread by step number, by the node that produced it or by
+    the message it added (exactly one of them), on the branch of config's
+    checkpoint_id or the newest one.
+    """
+    history = thread_history(graph.checkpointer, config)
+    head = config["configurable"].get("checkpoint_id")
+    if step is not None:
+        return history.at_step(step, head)
+    if node is not None:
+        return history.produced_by(node, occurrence, head)
+    if message_id is not None:
+        return history.adding_message(message_id)
+    raise ValueError("find_checkpoint needs a step, node or message_id")
+
+
+def state_at(graph, config: RunnableConfig, **lookup) -> Optional[StateSnapshot]:
+    """Full state of the checkpoint picked by find_checkpoint, the only one deserialized."""
+    descriptor = find_checkpoint(graph, config, **lookup)
+    return graph.get_state(descriptor.config) if descriptor else None
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+# Trading days per year, used to annualize daily volatility
+TRADING_DAYS = 252
+
+# The only stock.info keys passed on to the LLM, the rest is noise for the analysis
+INFO_FIELDS = (
+    "shortName",
+    "sector",
+    "industry",
+    "currency",
+    "currentPrice",
+    "marketCap",
+    "trailingPE",
+    "forwardPE",
+    "priceToBook",
+    "dividendYield",
+    "beta",
+    "fiftyTwoWeekHigh",
+    "fiftyTwoWeekLow",
+    "profitMargins",
+    "revenueGrowth",
+    "debtToEquity",
+    "recommendationKey",
+    "targetMeanPrice",
+)
+
+
+def project_info(info: dict) -> dict:
+    """Keep only the whitelisted, non-empty fields of stock.info."""
+    return {key: info[key] for key in INFO_FIELDS if info.get(key) is not None}
+
+
+def summarize_history(history) -> dict:
+    """
+    Compute compact technical indicators from OHLCV history.
+
+    Accepts the DataFrame returned by stock.history() or its to_dict() form.
+    """
+    if isinstance(history, dict):
+        history = pd.DataFrame(history)
+
+    history = history.dropna(subset=["Close"])
+    if history.empty:
+        return {}
+
+    close = history["Close"].to_numpy(dtype=float)
+    volume = history["Volume"].to_numpy(dtype=float) if "Volume" in history else np.zeros_like(close)
+
+    daily_returns = np.diff(close) / close[:-1]
+    running_max = np.maximum.accumulate(close)
+    drawdowns = close / running_max - 1
+
+    summary = {
+        "start": str(history.index[0])[:10],
+        "end": str(history.index[-1])[:10],
+        "trading_days": int(close.size),
+        "last_close": close[-1],
+        "period_high": (history["High"].to_numpy(dtype=float) if "High" in history else close).max(),
+        "period_low": (history["Low"].to_numpy(dtype=float) if "Low" in history else close).min(),
+        "period_return": close[-1] / close[0] - 1,
+        "max_drawdown": drawdowns.min(),
+    }
+
+    if daily_returns.size > 1:
+        daily_volatility = daily_returns.std(ddof=1)
+        summary["daily_volatility"] = daily_volatility
+        summary["annualized_volatility"] = daily_volatility * np.sqrt(TRADING_DAYS)
+
+    for window in (5, 20, 50, 200):
+        if close.size >= window:
+            moving_average = close[-window:].mean()
+            summary[f"sma_{window}"] = moving_average
+            summary[f"close_vs_sma_{window}"] = close[-1] / moving_average - 1
+
+    if volume.any():
+        summary["average_volume"] = volume.mean()
+        # ratio of the last week's volume to the period average, > 0 means rising interest
+        summary["volume_trend"] = volume[-5:].mean() / volume.mean() - 1
+
+    return {key: _compact(value) for key, value in summary.items()}
+
+
+def summarize_stock(stock_symbol: str, info: dict, history) -> dict:
+    """Prompt-sized replacement for the raw {"info": ..., "history": ...} dump."""
+    return {
+        "stock_symbol": stock_symbol,
+        "info": project_info(info),
+        "indicators": summarize_history(history),
+    }
+
+
+def _compact(value):
+    if isinstance(value, (float, np.floating)):
+        return round(float(value), 4)
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
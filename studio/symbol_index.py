@@ -0,0 +1,193 @@
+import csv
+import os
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Optional
+
+# Words that don't help telling companies apart
+NAME_STOPWORDS = {
+    "inc", "incorporated", "corp", "corporation", "co", "company", "ltd", "limited", "plc", "sa", "se", "nv", "ag",
+    "holding", "holdings", "group", "the", "class", "a", "b", "c",
+}
+
+# Words many company names share: a query made only of these ("Bank", "General") is too
+# vague to guess a company from, it goes to the remote lookup
+GENERIC_WORDS = {
+    "american", "and", "bancorp", "bank", "capital", "communications", "energy", "financial", "first", "general",
+    "global", "health", "healthcare", "industries", "insurance", "international", "motors", "national", "of",
+    "partners", "pharmaceuticals", "resources", "semiconductor", "services", "software", "systems", "technologies",
+    "technology", "trust", "united",
+}
+
+# Primary listings win over OTC and foreign duplicates of the same name
+EXCHANGE_PRIORITY = {"NASDAQ": 0, "NYSE": 0, "NYSE ARCA": 1, "NYSE MKT": 1, "BATS": 1}
+
+
+def normalize_name(name: str) -> str:
+    words = re.sub(r"[^a-z0-9]+", " ", name.lower().replace("&", " and ")).split()
+    significant = [w for w in words if w not in NAME_STOPWORDS]
+    return " ".join(significant or words)
+
+
+def trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass(frozen=True)
+class Listing:
+    symbol: str
+    name: str
+    exchange: str = ""
+
+    @property
+    def rank(self) -> tuple:
+        return (EXCHANGE_PRIORITY.get(self.exchange.upper(), 2), len(self.name))
+
+
+class SymbolIndex:
+    """
+    In-memory company name -> ticker index.
+
+    Resolves by exact normalized name, exact symbol, name prefix (trie) and
+    finally trigram similarity for misspellings. A prefix or similar name only
+    counts when it accounts for every word of the query, and queries made only
+    of generic words are never guessed; both are misses, for the remote API. Entries learned from the remote
+    API are appended to `learned_path` so they survive restarts.
+    """
+
+    def __init__(self, listing_path: Optional[str] = None, learned_path: Optional[str] = None,
+                 fuzzy_cutoff: float = 0.6):
+        self.learned_path = learned_path
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self._names: dict[str, list[Listing]] = {}
+        self._symbols: dict[str, Listing] = {}
+        self._trie: dict = {}
+        self._trigrams: dict[str, set[str]] = {}
+        self._trigram_counts: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        for path in (listing_path, learned_path):
+            if path and os.path.exists(path):
+                self.load(path)
+
+    def __len__(self) -> int:
+        return len(self._symbols)
+
+    def load(self, path: str):
+        """Load a CSV with symbol, name and (optional) exchange columns."""
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                if row.get("symbol") and row.get("name"):
+                    self.add(row["symbol"], row["name"], row.get("exchange") or "", alias=row.get("alias") or None)
+
+    def add(self, symbol: str, name: str, exchange: str = "", alias: Optional[str] = None):
+        listing = Listing(symbol.upper(), name, exchange)
+        with self._lock:
+            self._symbols.setdefault(listing.symbol, listing)
+            for key in {normalize_name(name), normalize_name(alias) if alias else None} - {None, ""}:
+                entries = self._names.setdefault(key, [])
+                if listing not in entries:
+                    entries.append(listing)
+                    entries.sort(key=lambda l: l.rank)
+
+                node = self._trie
+                for char in key:
+                    node = node.setdefault(char, {})
+                node.setdefault("", set()).add(key)
+
+                key_grams = trigrams(key)
+                self._trigram_counts[key] = len(key_grams)
+                for gram in key_grams:
+                    self._trigrams.setdefault(gram, set()).add(key)
+
+    def remember(self, company_name: str, symbol: str, name: str, exchange: str = ""):
+        """Add a remote lookup result, keyed by both its name and the name the user asked for."""
+        self.add(symbol, name, exchange, alias=company_name)
+        if self.learned_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.learned_path)), exist_ok=True)
+            new_file = not os.path.exists(self.learned_path)
+            with self._lock, open(self.learned_path, "a", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                if new_file:
+                    writer.writerow(["symbol", "name", "exchange", "alias"])
+                writer.writerow([symbol, name, exchange, company_name])
+
+    def resolve(self, company_name: str) -> Optional[str]:
+        """Best matching ticker for a company name (or ticker), None on a miss."""
+        query = normalize_name(company_name)
+        if not query:
+            return None
+
+        entries = self._names.get(query)
+        if entries:
+            return entries[0].symbol
+
+        listing = self._symbols.get(company_name.strip().upper())
+        if listing:
+            return listing.symbol
+
+        if all(word in GENERIC_WORDS for word in query.split()):
+            return None
+
+        for search in (self.prefix, self.fuzzy):
+            match = search(query)
+            if match:
+                return min((l for key in match for l in self._names[key]), key=lambda l: l.rank).symbol
+
+        return None
+
+    def prefix(self, query: str, limit: int = 1, scan: int = 500) -> list[str]:
+        """Normalized names starting with the query at a word boundary, shortest first."""
+        node = self._trie
+        for char in query:
+            node = node.get(char)
+            if node is None:
+                return []
+
+        found, stack = [], [node]
+        while stack and len(found) < scan:
+            node = stack.pop()
+            found.extend(node.get("", ()))
+            stack.extend(child for char, child in node.items() if char)
+
+        matches = [key for key in found if len(key) == len(query) or key[len(query)] == " "]
+        matches.sort(key=len)
+        return matches[:limit]
+
+    def fuzzy(self, query: str) -> list[str]:
+        """
+        Closest normalized name by trigram Dice similarity, if above the cutoff and
+        every word of the query matches one of its words (spelling mistakes aside).
+        """
+        query_grams = trigrams(query)
+        counts = Counter(key for gram in query_grams for key in self._trigrams.get(gram, ()))
+        best, best_score = None, self.fuzzy_cutoff
+        for key, shared in counts.most_common(50):
+            score = 2 * shared / (len(query_grams) + self._trigram_counts[key])
+            if score >= best_score and self._covers(key, query):
+                best, best_score = key, score
+        return [best] if best else []
+
+    def _covers(self, key: str, query: str) -> bool:
+        # "general mills" is not "general motors", nor "coca cola europacific" "coca cola"
+        words = key.split()
+        return all(any(_same_word(query_word, word, self.fuzzy_cutoff) for word in words) for query_word in query.split())
+
+
+def _same_word(query_word: str, word: str, cutoff: float) -> bool:
+    if word.startswith(query_word):
+        return True
+    query_grams, grams = trigrams(query_word), trigrams(word)
+    return 2 * len(query_grams & grams) / (len(query_grams) + len(grams)) >= cutoff
+
+
+_studio_dir = os.path.dirname(__file__)
+
+# Shared by every studio graph running in this process
+default_index = SymbolIndex(
+    listing_path=os.environ.get("SYMBOL_LISTING", os.path.join(_studio_dir, "data", "listing.csv")),
+    learned_path=os.environ.get("SYMBOL_LEARNED", os.path.join(_studio_dir, ".cache", "learned_symbols.csv")),
+)
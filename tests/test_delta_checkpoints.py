@@ -0,0 +1,41 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "studio"))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+import pytest
+from langgraph.checkpoint.base import empty_checkpoint
+
+from delta_checkpoints import DeltaMongoDBSaver
+from fake_mongo import mongo_client, mongomock_compat
+
+
+@pytest.fixture
+def saver():
+    with mongomock_compat():
+        yield DeltaMongoDBSaver(mongo_client())
+
+
+def put(saver, **configurable):
+    config = {"configurable": {"thread_id": "1", "checkpoint_ns": "", **configurable}}
+    return saver.put(config, empty_checkpoint(), {"source": "input", "step": -1}, {})
+
+
+def test_put_stores_plain_identifiers(saver):
+    stored = put(saver)
+    assert saver.get_tuple(stored).config["configurable"]["thread_id"] == "1"
+
+
+@pytest.mark.parametrize("field", ["thread_id", "checkpoint_ns", "checkpoint_id"])
+@pytest.mark.parametrize("value", [{"$ne": ""}, {"$gt": ""}, {"thread": "1"}, ["1"]])
+def test_put_rejects_operator_identifiers(saver, field, value):
+    with pytest.raises(ValueError, match=f"Invalid {field}"):
+        put(saver, **{field: value})
+    assert saver.checkpoint_collection.count_documents({}) == 0
+
+
+def test_reroot_rejects_operator_parent(saver):
+    stored = put(saver)
+    with pytest.raises(ValueError, match="Invalid checkpoint_id"):
+        saver.reroot(stored, {"$ne": ""})